@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+Module d'agrégation des alertes
+Les alertes répétées (un paquet QUIC, une connexion vers un port malveillant...)
+sont regroupées par clé (type, src, dst, port): la mémoire et le rapport
+dépendent du nombre de constats distincts, pas du nombre de paquets.
+Chaque constat est un enregistrement compact; son texte (détail, adresses)
+n'est produit qu'à la lecture des alertes (rapport, exports, affichage live).
+"""
+
+from conversations import formater_adresse
+
+
+class Alerte:
+    """
+    Enregistrement compact d'une alerte agrégée
+
+    Les alertes signalées par paquet (signaler) ne conservent que leur sévérité
+    et le modèle de leur détail, formaté à partir de la clé à la lecture; les
+    autres conservent leur dictionnaire d'origine (champs).
+    """
+    __slots__ = ('occurrences', 'bytes', 'premier_ts', 'dernier_ts', 'severite', 'modele', 'champs')
+
+    def __init__(self, timestamp, taille, occurrences, severite=None, modele=None, champs=None):
+        self.occurrences = occurrences
+        self.bytes = taille
+        self.premier_ts = self.dernier_ts = timestamp
+        self.severite = severite
+        self.modele = modele
+        self.champs = champs
+
+    def copie(self):
+        alerte = Alerte(self.premier_ts, self.bytes, self.occurrences, self.severite, self.modele,
+                        self.champs)
+        alerte.dernier_ts = self.dernier_ts
+        return alerte
+
+
+def _texte_adresse(valeur):
+    """Adresse entière de la clé d'une alerte signalée (voir conversations.adresses_couche)"""
+    return formater_adresse(valeur) if isinstance(valeur, int) else valeur
+
+
+def rendre_alerte(cle, alerte):
+    """
+    Dictionnaire d'une alerte: {'type', 'detail', 'severite', 'timestamp', 'src',
+    'dst', 'port', 'occurrences', 'premier_ts', 'dernier_ts', 'bytes'}
+    """
+    if alerte.champs is not None:
+        resultat = dict(alerte.champs)
+    else:
+        type_alerte, src, dst, port = cle
+        src, dst = _texte_adresse(src), _texte_adresse(dst)
+        resultat = {
+            'type': type_alerte,
+            'detail': alerte.modele.format(src=src, dst=dst, port=port),
+            'severite': alerte.severite,
+            'src': src,
+            'dst': dst,
+            'port': port,
+        }
+    resultat['timestamp'] = alerte.premier_ts
+    resultat['occurrences'] = alerte.occurrences
+    resultat['premier_ts'] = alerte.premier_ts
+    resultat['dernier_ts'] = alerte.dernier_ts
+    resultat['bytes'] = alerte.bytes
+    return resultat
+
+
+class AgregatAlertes:
+    """
+    Alertes agrégées, dans l'ordre de première apparition
+
+    L'itération produit chaque alerte sous forme de dictionnaire (voir
+    rendre_alerte). 'timestamp' est l'horodatage de la première occurrence.
+
+    Usage dans un détecteur appelé pour chaque paquet (le détail est un modèle
+    formaté à la lecture avec les champs src, dst et port de la clé; les
+    adresses entières y sont écrites en texte):
+        cle = ('QUIC en arrière-plan', src, dst, 443)
+        if not alertes.mettre_a_jour(cle, timestamp, taille):
+            alertes.signaler(cle, 'MOYENNE', "{src} → {dst} (UDP 443)", timestamp, taille)
+
+    Les alertes issues d'une analyse globale passent leur dictionnaire complet
+    à ajouter().
+
+    Args:
+        rappel: Fonction (cle) appelée à chaque occurrence (mode live, voir alerte())
+    """
+
+    def __init__(self, rappel=None):
+        self._alertes = {}
+        self.rappel = rappel
+        self.occurrences = 0
+
+    def __len__(self):
+        return len(self._alertes)
+
+    def __iter__(self):
+        return (rendre_alerte(cle, alerte) for cle, alerte in self._alertes.items())
+
+    def alerte(self, cle):
+        """Dictionnaire de l'alerte d'une clé (voir rendre_alerte)"""
+        return rendre_alerte(cle, self._alertes[cle])
+
+    def mettre_a_jour(self, cle, timestamp, taille=0, occurrences=1):
+        """
+        Comptabilise une nouvelle occurrence d'une alerte existante
+
+        Returns:
+            False si la clé est inconnue (l'alerte doit être créée avec signaler ou ajouter)
+        """
+        alerte = self._alertes.get(cle)
+        if alerte is None:
+            return False
+        alerte.occurrences += occurrences
+        alerte.bytes += taille
+        if timestamp < alerte.premier_ts:
+            alerte.premier_ts = timestamp
+        if timestamp > alerte.dernier_ts:
+            alerte.dernier_ts = timestamp
+        self.occurrences += occurrences
+        if self.rappel is not None:
+            self.rappel(cle)
+        return True
+
+    def _creer(self, cle, alerte):
+        self._alertes[cle] = alerte
+        self.occurrences += alerte.occurrences
+        if self.rappel is not None:
+            self.rappel(cle)
+
+    def signaler(self, cle, severite, modele, timestamp, taille=0, occurrences=1):
+        """
+        Crée une alerte compacte (détail formaté à la lecture à partir du modèle)
+        ou comptabilise une occurrence si la clé existe déjà
+        """
+        if not self.mettre_a_jour(cle, timestamp, taille, occurrences):
+            self._creer(cle, Alerte(timestamp, taille, occurrences, severite, modele))
+
+    def ajouter(self, cle, alerte, taille=0, occurrences=1):
+        """
+        Crée une alerte à partir de son dictionnaire (type, detail, severite, timestamp)
+        ou comptabilise une occurrence si la clé existe déjà
+        """
+        if self.mettre_a_jour(cle, alerte['timestamp'], taille, occurrences):
+            return
+        _, src, dst, port = cle
+        champs = {nom: valeur for nom, valeur in alerte.items()
+                  if nom not in ('timestamp', 'occurrences', 'premier_ts', 'dernier_ts', 'bytes')}
+        champs.setdefault('src', src)
+        champs.setdefault('dst', dst)
+        champs.setdefault('port', port)
+        self._creer(cle, Alerte(alerte['timestamp'], taille, occurrences, champs=champs))
+
+    def append(self, alerte):
+        """
+        Ajoute une alerte au format dictionnaire (compatibilité avec l'ancienne liste)
+        Sans 'src'/'dst'/'port', le détail sert de clé.
+        """
+        cle = (alerte['type'], alerte.get('src'), alerte.get('dst', alerte['detail']),
+               alerte.get('port'))
+        self.ajouter(cle, alerte, alerte.get('bytes', 0), alerte.get('occurrences', 1))
+
+    def etat(self):
+        """Paires (clé, alerte) sérialisables, pour fusionner()"""
+        return list(self._alertes.items())
+
+    def fusionner(self, paires):
+        """Fusionne des alertes (voir etat), dans l'ordre de la capture"""
+        for cle, alerte in paires:
+            existante = self._alertes.get(cle)
+            if existante is None:
+                self._alertes[cle] = alerte.copie()
+                self.occurrences += alerte.occurrences
+                continue
+            self.mettre_a_jour(cle, alerte.premier_ts, alerte.bytes, alerte.occurrences)
+            existante.dernier_ts = max(existante.dernier_ts, alerte.dernier_ts)
+
+    def limiter(self, nombre):
+        """Ne conserve que les `nombre` alertes vues le plus récemment"""
+        if len(self._alertes) <= nombre:
+            return
+        conservees = sorted(self._alertes, key=lambda cle: self._alertes[cle].dernier_ts,
+                            reverse=True)[:nombre]
+        conservees = set(conservees)
+        self._alertes = {cle: alerte for cle, alerte in self._alertes.items() if cle in conservees}
@@ -4,22 +4,195 @@ Module d'analyse de trafic PCAP
 Contient toute la logique de détection des flux suspects
 """
 
-import pyshark
 from collections import defaultdict
 from datetime import datetime
+import heapq
+import math
 import sys
 from rapport_generator import generer_rapport_html
+from decodeur import CaptureNative
+from lecteur_pcap import format_fichier
+from conversations import (DEBUT_SYN, TCP_ACK, TCP_SYN, StatsConversation, StatsConversationIAT,
+                           adresses_couche, adresses_flux, cle_capture, cle_flux, formater_adresse,
+                           formater_flux, quantile_classes)
+from filtre_domaines import charger_filtre_domaines, domaine_parent
+from esquisses import EchantillonMinimal, FrequencesApprochees, HyperLogLog, hacher
+from tunnel_dns import caracteriser, caracteriser_lot, sous_domaine
+from alertes import AgregatAlertes
+from gros_emetteurs import GrosEmetteurs, port_service
+from symboles import RequetesDNS
+from detecteurs import DETECTEURS, TableDispatch, enregistrer_detecteur
+from prefiltre import Interet, Prefiltre
+from pipeline import paquets_en_pipeline
+from table_flux import (SEUIL_VECTORISATION, TableFlux, indices_top,
+                        np, numpy_disponible)
+
+try:
+    import pyshark
+except ImportError:
+    pyshark = None
+
+# Backends de décodage disponibles
+BACKENDS = ('auto', 'natif', 'pyshark')
+
+# Seuils de détection
+SEUIL_PAQUETS_PERSISTANT = 50
+SEUIL_DUREE_PERSISTANT = 20
+SEUIL_FREQUENCE_DNS = 10
+# Sous-domaines distincts (estimés par HyperLogLog) d'un même domaine parent
+SEUIL_SOUS_DOMAINES = 50
+# Alertes d'analyser_frequence_dns, calculées sur les esquisses DNS de toute l'analyse
+TYPES_ALERTES_DNS = ('DNS Fréquent', 'DNS Sous-domaines', 'DNS Tunneling')
+PORTS_MALVEILLANTS = (4444, 5555, 6666, 7777, 8080, 9999, 31337)
+
+# Tunnels DNS: un sous-domaine est suspect lorsqu'il remplit au moins SCORE_TUNNEL critères
+# parmi entropie (bits par caractère), plus longue étiquette, longueur (caractères du
+# sous-domaine, hors points), et proportion de chiffres ou casse mélangée (hexadécimal,
+# base32, base64); un domaine parent d'au moins MIN_SOUS_DOMAINES_TUNNEL sous-domaines
+# distincts l'est lorsque PROPORTION_TUNNEL de son échantillon de sous-domaines est suspect.
+# Au-delà de MIN_SOUS_DOMAINES_FORT_TUNNEL sous-domaines distincts, un critère de moins suffit
+# (base32 minuscule d'iodine: peu de chiffres, noms courts pour tenir dans une requête)
+SEUIL_ENTROPIE_TUNNEL = 3.5
+SEUIL_ETIQUETTE_TUNNEL = 24
+SEUIL_LONGUEUR_TUNNEL = 40
+SEUIL_CHIFFRES_TUNNEL = 0.25
+SEUIL_CASSE_TUNNEL = 0.2
+SCORE_TUNNEL = 3
+MIN_SOUS_DOMAINES_TUNNEL = 20
+MIN_SOUS_DOMAINES_FORT_TUNNEL = 200
+PROPORTION_TUNNEL = 0.5
+
+# Beaconing (--beaconing): au moins MIN_INTERVALLES_BEACONING intervalles entre salves,
+# d'écart interquartile relatif (q75 - q25) / médiane et de coefficient de variation
+# (écart-type / moyenne) sous les seuils. L'écart interquartile tolère la gigue et les
+# salves manquées, le coefficient de variation écarte les flux aux intervalles épars.
+MIN_INTERVALLES_BEACONING = 6
+SEUIL_DISPERSION_BEACONING = 0.2
+SEUIL_CV_BEACONING = 0.5
+QUANTILES_BEACONING = (0.25, 0.5, 0.75)
+
+# Table des flux (secondes de capture): un flux sans paquet depuis DELAI_INACTIVITE,
+# ou terminé (FIN des deux côtés, RST) depuis DELAI_FERMETURE, est expiré
+DELAI_INACTIVITE = 120
+DELAI_FERMETURE = 10
+INTERVALLE_EXPIRATION = 10
+
+# Détecteurs intégrés: besoins déclarés (table de dispatch et pré-filtre) et méthode appelée
+enregistrer_detecteur('protocoles', Interet(couches=('trame',), champs=('highest_layer',)),
+                      '_compter_protocole')
+enregistrer_detecteur('conversations', Interet(couches=('ip',),
+                                               champs=('ip.src', 'ip.dst', 'length', 'tcp.srcport',
+                                                       'tcp.dstport', 'tcp.flags', 'udp.srcport',
+                                                       'udp.dstport')),
+                      '_analyser_conversation')
+enregistrer_detecteur('dns', Interet(couches=('dns',), champs=('dns.qry_name',)), '_analyser_dns')
+enregistrer_detecteur('quic', Interet(couches=('udp',), ports_udp=(443,), champs=('udp.dstport',)),
+                      '_detecter_quic')
+enregistrer_detecteur('ports', Interet(couches=('tcp',), ports_tcp=PORTS_MALVEILLANTS,
+                                       champs=('tcp.dstport',)),
+                      '_detecter_ports_suspects')
+
+
+def choisir_backend(fichier_pcap, backend='auto'):
+    """
+    Détermine le backend de décodage à utiliser
+
+    Le décodeur natif est choisi dès que le fichier est un PCAP/PCAPNG lisible
+    directement; pyshark (tshark) n'est utilisé que sur demande ou pour les
+    formats que le lecteur natif ne reconnaît pas.
+    """
+    if backend != 'auto':
+        return backend
+    try:
+        if format_fichier(fichier_pcap) is not None:
+            return 'natif'
+    except OSError:
+        return 'natif'
+    return 'pyshark' if pyshark is not None else 'natif'
+
+
+def couche_ip(paquet):
+    """Retourne la couche IPv4 du paquet, ou à défaut sa couche IPv6"""
+    return paquet.ip if hasattr(paquet, 'ip') else paquet.ipv6
+
+
+def score_tunnel(longueur, entropie, etiquette_max, chiffres, majuscules, minuscules):
+    """Nombre de critères de tunnel DNS remplis par un sous-domaine (valeurs ou colonnes NumPy)"""
+    return ((entropie >= SEUIL_ENTROPIE_TUNNEL) * 1
+            + (etiquette_max >= SEUIL_ETIQUETTE_TUNNEL) * 1
+            + (longueur >= SEUIL_LONGUEUR_TUNNEL) * 1
+            + ((chiffres >= SEUIL_CHIFFRES_TUNNEL * longueur)
+               | ((majuscules >= SEUIL_CASSE_TUNNEL * longueur)
+                  & (minuscules >= SEUIL_CASSE_TUNNEL * longueur))) * 1)
+
+
+def score_requis_tunnel(sous_domaines):
+    """Critères qu'un sous-domaine doit remplir, selon le nombre de sous-domaines distincts du parent"""
+    return SCORE_TUNNEL - 1 if sous_domaines >= MIN_SOUS_DOMAINES_FORT_TUNNEL else SCORE_TUNNEL
+
 
 class AnalyseurTraficSuspect:
     """Classe principale pour l'analyse de fichiers PCAP"""
     
-    def __init__(self, fichier_pcap):
+    def __init__(self, fichier_pcap, backend='auto', plage_temps=None, inter_arrivees=False,
+                 listes_domaines=(), listes_mots=(), detecteurs=None, chronometrer=False,
+                 delai_inactivite=DELAI_INACTIVITE, delai_actif=None, conserver_requetes_dns=False,
+                 pipeline=False):
         self.fichier_pcap = fichier_pcap
-        self.flux_suspects = []
+        self.backend = backend
+        self.plage_temps = plage_temps
+        self.inter_arrivees = inter_arrivees
+        # Expiration des flux: inactivité, et durée maximale d'un enregistrement (None: illimitée)
+        self.delai_inactivite = delai_inactivite
+        self.delai_actif = delai_actif
+        # Liste complète des requêtes DNS (exports); sinon seules les esquisses sont tenues
+        self.conserver_requetes_dns = conserver_requetes_dns
+        # Décodage dans un thread producteur relié à la détection par une file bornée
+        self.pipeline = pipeline
+        self.listes_domaines = tuple(listes_domaines)
+        self.listes_mots = tuple(listes_mots)
+        # Filtre compilé une seule fois (et partagé entre analyseurs d'un même processus)
+        self.filtre_domaines = charger_filtre_domaines(self.listes_domaines, self.listes_mots)
+        self.detecteurs = tuple(DETECTEURS) if detecteurs is None else tuple(detecteurs)
+        inconnus = set(self.detecteurs) - set(DETECTEURS)
+        if inconnus:
+            raise ValueError(f"détecteurs inconnus: {', '.join(sorted(inconnus))}")
+        self.prefiltre = Prefiltre(DETECTEURS[nom].interet for nom in self.detecteurs)
+        self.chronometrer = chronometrer
+        self._dispatch = TableDispatch(self, self.detecteurs, chronometrer)
+        # Alertes agrégées par (type, src, dst, port)
+        self.flux_suspects = AgregatAlertes()
         self.stats_protocoles = defaultdict(int)
-        self.conversations = defaultdict(lambda: {'paquets': 0, 'bytes': 0, 'timestamps': []})
-        self.requetes_dns = []
+        # Flux en cours, indexés par clé canonique bidirectionnelle (voir conversations.cle_flux)
+        self.conversations = {}
+        self._classe_conversation = StatsConversationIAT if inter_arrivees else StatsConversation
+        self.nb_flux_termines = 0
+        self._horloge_flux = None
+        self._prochaine_expiration = float('-inf')
+        # Mode shard (analyser_segments): premiers enregistrements de chaque clé, provisoires
+        self._chaines = None
+        self._hors_chaine = None
+        # Flux encore en table déjà évalués par detecter_flux_persistants
+        self._flux_evalues = False
+        # Journal des requêtes DNS (--dns-queries): colonnes d'identifiants de domaines et d'adresses
+        self.requetes_dns = RequetesDNS()
+        # Requêtes DNS en mémoire bornée: fréquence par domaine (Count-Min Sketch et
+        # domaines les plus fréquents), sous-domaines distincts par domaine parent
+        self.nb_requetes_dns = 0
+        self.frequences_dns = FrequencesApprochees()
+        self.sous_domaines_dns = {}
+        # Échantillon uniforme des sous-domaines distincts de chaque domaine parent (tunnels)
+        self.echantillons_dns = {}
         self.flux_arriere_plan = []
+        # Plus gros émetteurs (sources, destinations, conversations, ports) en mémoire bornée
+        self.gros_emetteurs = GrosEmetteurs()
+        # Flux réguliers retenus par la détection du beaconing (inter_arrivees)
+        self.flux_beaconing = []
+        self.nb_paquets = 0
+        # Paquets écartés par le pré-filtre sans décodage complet (None si inconnu)
+        self.nb_rejetes = 0
+        # instrumentation.Instrumentation (--profile), None par défaut: aucun surcoût
+        self.instrumentation = None
         
     def analyser(self):
         """Analyse principale du fichier PCAP"""
@@ -27,18 +200,31 @@ class AnalyseurTraficSuspect:
         print("[*] Chargement des paquets...")
         
         try:
-            capture = pyshark.FileCapture(self.fichier_pcap, keep_packets=False)
+            capture = self._ouvrir_capture()
+            paquets, traiter = self._boucle_instrumentee(capture)
+            if self.pipeline:
+                if isinstance(capture, CaptureNative):
+                    # Décodage et détection partagent le verrou global: rien à recouvrir
+                    print("[!] --pipeline est sans effet avec le décodeur natif "
+                          "(utiliser --workers), analyse sans pipeline")
+                else:
+                    paquets = paquets_en_pipeline(paquets)
             
             compteur = 0
-            for paquet in capture:
+            for paquet in paquets:
                 compteur += 1
                 if compteur % 1000 == 0:
                     print(f"[*] {compteur} paquets analysés...")
                 
-                self._analyser_paquet(paquet)
+                traiter(paquet)
             
             capture.close()
+            self._compter_rejetes(capture)
+            self.expirer_flux()
+            self.nb_paquets += compteur
             print(f"[✓] Analyse terminée: {compteur} paquets traités")
+            if self.nb_rejetes:
+                print(f"[*] {self.nb_rejetes} paquets écartés par le pré-filtre")
             
         except FileNotFoundError:
             print(f"[!] Erreur: Fichier '{self.fichier_pcap}' introuvable")
@@ -47,49 +233,459 @@ class AnalyseurTraficSuspect:
             print(f"[!] Erreur lors de l'analyse: {e}")
             sys.exit(1)
     
+    def analyser_segments(self, segments):
+        """
+        Analyse une partie de la capture (décodeur natif, sans affichage)
+        Utilisé par les workers du mode parallèle
+
+        Args:
+            segments: Liste de segments (offset, nombre d'enregistrements)
+        """
+        capture = CaptureNative(self.fichier_pcap, plage=self.plage_temps, segments=segments,
+                                prefiltre=self.prefiltre)
+        # Le début de chaque flux peut prolonger un flux du shard précédent: voir fusionner()
+        self._chaines = {}
+        self._hors_chaine = set()
+        try:
+            for paquet in capture:
+                self.nb_paquets += 1
+                self._analyser_paquet(paquet)
+        finally:
+            capture.close()
+        self._compter_rejetes(capture)
+        self.expirer_flux()
+    
+    def analyser_suite(self, fichier, offset=None):
+        """
+        Analyse les enregistrements d'un fichier à partir d'un offset (décodeur natif)
+        Prolonge l'état courant comme si la lecture ne s'était pas interrompue:
+        utilisé par la reprise incrémentale (voir reprise.py)
+
+        Returns:
+            Tuple (paquets lus, offset suivant le dernier enregistrement complet)
+        """
+        capture = CaptureNative(fichier, plage=self.plage_temps, segments=[(offset, None)],
+                                prefiltre=self.prefiltre)
+        paquets, traiter = self._boucle_instrumentee(capture)
+        compteur = 0
+        try:
+            for paquet in paquets:
+                compteur += 1
+                traiter(paquet)
+        finally:
+            capture.close()
+        self.nb_paquets += compteur
+        self._compter_rejetes(capture)
+        return compteur, capture.position_fin
+    
+    def parametres(self):
+        """Paramètres d'analyse permettant de recréer un analyseur équivalent (workers)"""
+        return {
+            'backend': self.backend,
+            'plage_temps': self.plage_temps,
+            'inter_arrivees': self.inter_arrivees,
+            'listes_domaines': self.listes_domaines,
+            'listes_mots': self.listes_mots,
+            'detecteurs': self.detecteurs,
+            'chronometrer': self.chronometrer,
+            'delai_inactivite': self.delai_inactivite,
+            'delai_actif': self.delai_actif,
+            'conserver_requetes_dns': self.conserver_requetes_dns,
+            'pipeline': self.pipeline,
+        }
+    
+    def etat_partiel(self):
+        """Retourne l'état accumulé par l'analyse sous une forme sérialisable"""
+        return {
+            'nb_paquets': self.nb_paquets,
+            'nb_rejetes': self.nb_rejetes,
+            'stats_protocoles': dict(self.stats_protocoles),
+            'conversations': dict(self.conversations),
+            'chaines': self._chaines or {},
+            'nb_flux_termines': self.nb_flux_termines,
+            'flux_arriere_plan': list(self.flux_arriere_plan),
+            'flux_beaconing': list(self.flux_beaconing),
+            'gros_emetteurs': self.gros_emetteurs,
+            'flux_evalues': self._flux_evalues,
+            'horloge_flux': self._horloge_flux,
+            'requetes_dns': self.requetes_dns,
+            'nb_requetes_dns': self.nb_requetes_dns,
+            'frequences_dns': self.frequences_dns,
+            'sous_domaines_dns': self.sous_domaines_dns,
+            'echantillons_dns': self.echantillons_dns,
+            'flux_suspects': self.flux_suspects.etat(),
+            'compteurs_detecteurs': self._dispatch.compteurs,
+        }
+    
+    def fusionner(self, etat, capture=0):
+        """
+        Fusionne un état partiel (voir etat_partiel) dans cet analyseur
+        Les états doivent être fusionnés dans l'ordre de la capture pour
+        reproduire exactement le résultat d'une analyse séquentielle.
+        
+        Args:
+            capture: Indice de la capture d'origine (synthèse d'un lot): les flux
+                de captures différentes restent distincts (voir cle_capture)
+        """
+        if capture:
+            etat = dict(etat, conversations={cle_capture(cle, capture): stats
+                                             for cle, stats in etat['conversations'].items()},
+                        chaines={cle_capture(cle, capture): pieces
+                                 for cle, pieces in etat.get('chaines', {}).items()})
+        self.nb_paquets += etat['nb_paquets']
+        if self.nb_rejetes is None or etat['nb_rejetes'] is None:
+            self.nb_rejetes = None
+        else:
+            self.nb_rejetes += etat['nb_rejetes']
+        for proto, count in etat['stats_protocoles'].items():
+            self.stats_protocoles[proto] += count
+        self._fusionner_flux(etat)
+        self.gros_emetteurs.fusionner(etat['gros_emetteurs'])
+        self.requetes_dns.fusionner(etat['requetes_dns'])
+        self.nb_requetes_dns += etat['nb_requetes_dns']
+        self.frequences_dns.fusionner(etat['frequences_dns'])
+        for parent, esquisse in etat['sous_domaines_dns'].items():
+            if parent in self.sous_domaines_dns:
+                self.sous_domaines_dns[parent].fusionner(esquisse)
+            else:
+                self.sous_domaines_dns[parent] = esquisse
+        for parent, echantillon in etat['echantillons_dns'].items():
+            if parent in self.echantillons_dns:
+                self.echantillons_dns[parent].fusionner(echantillon)
+            else:
+                self.echantillons_dns[parent] = echantillon
+        self.flux_suspects.fusionner(etat['flux_suspects'])
+        for nom, (appels, secondes) in etat.get('compteurs_detecteurs', {}).items():
+            compteur = self._dispatch.compteurs.setdefault(nom, [0, 0.0])
+            compteur[0] += appels
+            compteur[1] += secondes
+    
+    def _ouvrir_capture(self):
+        """Ouvre la capture avec le backend de décodage sélectionné"""
+        backend = choisir_backend(self.fichier_pcap, self.backend)
+        print(f"[*] Backend de décodage: {backend}")
+        
+        if backend == 'pyshark':
+            if pyshark is None:
+                raise RuntimeError("pyshark n'est pas installé (pip install pyshark)")
+            filtre = self._filtre_affichage()
+            if filtre:
+                print(f"[*] Filtre d'affichage: {filtre}")
+            return pyshark.FileCapture(self.fichier_pcap, keep_packets=False,
+                                       display_filter=filtre)
+        return CaptureNative(self.fichier_pcap, plage=self.plage_temps, prefiltre=self.prefiltre)
+    
+    def _compter_rejetes(self, capture):
+        """Relève les paquets écartés par le pré-filtre (inconnu avec tshark)"""
+        if isinstance(capture, CaptureNative):
+            self.nb_paquets += capture.rejetes
+            if self.nb_rejetes is not None:
+                self.nb_rejetes += capture.rejetes
+        elif not self.prefiltre.toutes_trames:
+            self.nb_rejetes = None
+    
+    def _filtre_affichage(self):
+        """Traduit la plage temporelle et le pré-filtre en filtre d'affichage tshark"""
+        conditions = []
+        if self.plage_temps is not None:
+            debut, fin = self.plage_temps
+            if debut is not None:
+                conditions.append(f"frame.time_epoch >= {debut}")
+            if fin is not None:
+                conditions.append(f"frame.time_epoch <= {fin}")
+        filtre = self.prefiltre.filtre_affichage()
+        if filtre is not None:
+            conditions.append(f"({filtre})")
+        return ' && '.join(conditions) or None
+    
+    def _boucle_instrumentee(self, capture):
+        """
+        Paquets de la capture et traitement par paquet, chronométrés si une
+        instrumentation est active (décodage, _analyser_paquet et hooks de profilage)
+        """
+        if self.instrumentation is None:
+            return capture, self._analyser_paquet
+        return (self.instrumentation.iterer('decodage', capture),
+                self.instrumentation.envelopper_paquet(self._analyser_paquet))
+    
     def _analyser_paquet(self, paquet):
-        """Analyse un paquet individuel"""
+        """Transmet un paquet aux seuls détecteurs concernés (voir detecteurs.TableDispatch)"""
+        table = self._dispatch
         try:
-            # Statistiques des protocoles
-            if hasattr(paquet, 'highest_layer'):
-                self.stats_protocoles[paquet.highest_layer] += 1
+            for traiter in table.trame:
+                traiter(paquet)
             
-            # Analyse TCP/UDP
-            if hasattr(paquet, 'ip'):
-                self._analyser_conversation(paquet)
+            if table.ip and (hasattr(paquet, 'ip') or hasattr(paquet, 'ipv6')):
+                for traiter in table.ip:
+                    traiter(paquet)
             
-            # Analyse DNS
-            if hasattr(paquet, 'dns') and hasattr(paquet.dns, 'qry_name'):
-                self._analyser_dns(paquet)
+            if table.dns and hasattr(paquet, 'dns'):
+                for traiter in table.dns:
+                    traiter(paquet)
             
-            # Détection QUIC
-            if hasattr(paquet, 'udp') and hasattr(paquet.udp, 'dstport'):
-                if paquet.udp.dstport == '443':
-                    self._detecter_quic(paquet)
+            # Une seule recherche par port de destination
+            if (table.udp or table.udp_defaut) and hasattr(paquet, 'udp'):
+                for traiter in table.udp.get(int(paquet.udp.dstport), table.udp_defaut):
+                    traiter(paquet)
             
-            # Détection ports suspects
-            if hasattr(paquet, 'tcp'):
-                self._detecter_ports_suspects(paquet)
+            if (table.tcp or table.tcp_defaut) and hasattr(paquet, 'tcp'):
+                for traiter in table.tcp.get(int(paquet.tcp.dstport), table.tcp_defaut):
+                    traiter(paquet)
                 
-        except AttributeError:
+        except (AttributeError, ValueError):
             pass
     
+    def temps_detecteurs(self):
+        """Compteurs par détecteur (nom, appels, secondes), du plus coûteux au moins coûteux"""
+        return sorted(((nom, appels, secondes)
+                       for nom, (appels, secondes) in self._dispatch.compteurs.items()),
+                      key=lambda x: x[2], reverse=True)
+    
+    def _compter_protocole(self, paquet):
+        """Statistiques des protocoles"""
+        if hasattr(paquet, 'highest_layer'):
+            self.stats_protocoles[paquet.highest_layer] += 1
+    
     def _analyser_conversation(self, paquet):
-        """Analyse les conversations IP"""
+        """
+        Met à jour le flux bidirectionnel (5-tuple) du paquet
+
+        Un paquet arrivant après l'expiration de son flux (inactivité, fermeture
+        TCP, durée maximale) ou un SYN seul sur une connexion établie ouvre un
+        nouvel enregistrement; l'ancien est transmis à la détection des flux
+        persistants puis libéré.
+
+        Returns:
+            Tuple (clé, StatsConversation) du flux mis à jour, ou None
+        """
         try:
-            src = paquet.ip.src
-            dst = paquet.ip.dst
-            cle = f"{src} → {dst}"
-            
-            self.conversations[cle]['paquets'] += 1
-            if hasattr(paquet, 'length'):
-                self.conversations[cle]['bytes'] += int(paquet.length)
-            
-            if hasattr(paquet, 'sniff_timestamp'):
-                self.conversations[cle]['timestamps'].append(float(paquet.sniff_timestamp))
-                
-        except AttributeError:
-            pass
+            src, dst = adresses_couche(couche_ip(paquet))
+            drapeaux = None
+            if hasattr(paquet, 'tcp'):
+                proto, couche = 6, paquet.tcp
+                drapeaux = couche.flags
+                if isinstance(drapeaux, str):
+                    drapeaux = int(drapeaux, 16)
+            elif hasattr(paquet, 'udp'):
+                proto, couche = 17, paquet.udp
+            else:
+                proto = couche = None
+            if couche is None:
+                cle, bas = cle_flux(0, src, 0, dst, 0)
+                port = None
+            else:
+                sport, dport = int(couche.srcport), int(couche.dstport)
+                cle, bas = cle_flux(proto, src, sport, dst, dport)
+                port = port_service(proto, sport, dport)
+            timestamp = float(paquet.sniff_timestamp) if hasattr(paquet, 'sniff_timestamp') else None
+            taille = int(paquet.length) if hasattr(paquet, 'length') else 0
+        except (AttributeError, ValueError):
+            return None
+        self.gros_emetteurs.ajouter(src, dst, cle, port, taille)
+        
+        stats = self.conversations.get(cle)
+        if stats is not None and timestamp is not None and stats.dernier_ts is not None:
+            if self._flux_termine(stats, timestamp, drapeaux):
+                del self.conversations[cle]
+                self._cloturer_flux(cle, stats)
+                stats = None
+            elif self._chaines is not None and cle not in self._hors_chaine and (
+                    timestamp - stats.dernier_ts > DELAI_FERMETURE or (
+                        drapeaux is not None and drapeaux & (TCP_SYN | TCP_ACK) == TCP_SYN)):
+                del self.conversations[cle]
+                self._couper_chaine(cle, stats, False)
+                stats = None
+        if stats is None:
+            stats = self.conversations[cle] = self._nouveau_flux(cle, bas, drapeaux)
+        stats.ajouter(timestamp, taille, not bas, drapeaux)
+        
+        if timestamp is not None:
+            if self._horloge_flux is None or timestamp > self._horloge_flux:
+                self._horloge_flux = timestamp
+            if timestamp >= self._prochaine_expiration:
+                self.expirer_flux(timestamp)
+        return cle, stats
+    
+    def _nouveau_flux(self, cle, bas, drapeaux):
+        """Enregistrement d'un flux ouvert par un paquet (l'initiateur reçoit un SYN-ACK)"""
+        stats = self._classe_conversation()
+        syn_ack = drapeaux is not None and drapeaux & (TCP_SYN | TCP_ACK) == TCP_SYN | TCP_ACK
+        stats.initiateur_bas = bas != syn_ack
+        return stats
+    
+    def _flux_termine(self, stats, timestamp, drapeaux=None):
+        """Indique si un paquet à `timestamp` ouvre un nouveau flux au lieu de prolonger `stats`"""
+        delai = DELAI_FERMETURE if stats.ferme else self.delai_inactivite
+        if timestamp - stats.dernier_ts > delai:
+            return True
+        if drapeaux is not None and drapeaux & (TCP_SYN | TCP_ACK) == TCP_SYN \
+                and stats.etablie:
+            return True
+        return self.delai_actif is not None and timestamp - stats.premier_ts > self.delai_actif
+    
+    def _cloturer_flux(self, cle, stats, evaluer=True):
+        """Flux terminé et retiré de la table: comptage et détection des flux persistants"""
+        if self._chaines is not None and cle not in self._hors_chaine:
+            self._couper_chaine(cle, stats, True)
+            return
+        self.nb_flux_termines += 1
+        if evaluer:
+            flux = self._evaluer_flux(cle, stats)
+            if flux is not None:
+                self.flux_arriere_plan.append(flux)
+            if self.inter_arrivees:
+                self._retenir_beaconing(cle, stats)
+    
+    def _couper_chaine(self, cle, stats, terminee):
+        """
+        Mode shard: conserve sans l'évaluer un enregistrement ouvert par le
+        premier paquet d'une clé (il peut prolonger un flux du shard précédent)
+
+        L'état TCP du flux du shard précédent est inconnu (fermé, établi): le
+        premier enregistrement est donc aussi découpé, à titre provisoire,
+        après DELAI_FERMETURE sans paquet et à chaque SYN seul. fusionner()
+        recolle ou sépare les morceaux comme l'aurait fait une analyse
+        séquentielle.
+        """
+        self._chaines.setdefault(cle, []).append((stats, terminee))
+        if terminee:
+            self._hors_chaine.add(cle)
+    
+    def expirer_flux(self, horloge=None, evaluer=True):
+        """
+        Expire les flux inactifs, fermés ou trop longs à l'instant `horloge`
+        (défaut: dernier horodatage vu) pour borner la mémoire aux flux actifs
+        """
+        horloge = self._horloge_flux if horloge is None else horloge
+        if horloge is None:
+            return
+        self._prochaine_expiration = horloge + INTERVALLE_EXPIRATION
+        limite_inactivite = horloge - self.delai_inactivite
+        limite_fermeture = horloge - DELAI_FERMETURE
+        limite_active = None if self.delai_actif is None else horloge - self.delai_actif
+        expires, coupes = [], []
+        for cle, stats in self.conversations.items():
+            dernier = stats.dernier_ts
+            if dernier is None:
+                continue
+            if dernier < limite_inactivite or (dernier < limite_fermeture and stats.ferme) \
+                    or (limite_active is not None and stats.premier_ts < limite_active):
+                expires.append(cle)
+            elif dernier < limite_fermeture and self._chaines is not None \
+                    and cle not in self._hors_chaine:
+                coupes.append(cle)
+        for cle in expires:
+            self._cloturer_flux(cle, self.conversations.pop(cle), evaluer)
+        for cle in coupes:
+            self._couper_chaine(cle, self.conversations.pop(cle), False)
+    
+    def _fusionner_flux(self, etat):
+        """
+        Fusionne les flux d'un état partiel: les enregistrements provisoires
+        des shards sont recollés au flux en cours de même clé ou le terminent
+        """
+        # Flux d'analyses déjà évaluées (traitement par lot): pas de seconde évaluation
+        evaluer = not etat.get('flux_evalues', False)
+        self.nb_flux_termines += etat.get('nb_flux_termines', 0)
+        self.flux_arriere_plan.extend(etat.get('flux_arriere_plan', ()))
+        self.flux_beaconing.extend(etat.get('flux_beaconing', ()))
+        for cle, pieces in etat.get('chaines', {}).items():
+            for stats, terminee in pieces:
+                stats = self._raccorder_flux(cle, stats, evaluer)
+                if terminee:
+                    del self.conversations[cle]
+                    self._cloturer_flux(cle, stats, evaluer)
+        for cle, stats in etat['conversations'].items():
+            self._raccorder_flux(cle, stats, evaluer)
+        horloge = etat.get('horloge_flux')
+        if horloge is not None:
+            if self._horloge_flux is None or horloge > self._horloge_flux:
+                self._horloge_flux = horloge
+            if evaluer:
+                self.expirer_flux(horloge)
+    
+    def _raccorder_flux(self, cle, suivant, evaluer=True):
+        """Prolonge le flux en cours de clé `cle` par l'enregistrement postérieur `suivant`"""
+        courant = self.conversations.get(cle)
+        if courant is not None:
+            if suivant.premier_ts is None or courant.dernier_ts is None or not self._flux_termine(
+                    courant, suivant.premier_ts, TCP_SYN if suivant.etat & DEBUT_SYN else None):
+                courant.fusionner(suivant)
+                return courant
+            del self.conversations[cle]
+            self._cloturer_flux(cle, courant, evaluer)
+        self.conversations[cle] = suivant
+        return suivant
+    
+    def _decrire_flux(self, cle, stats):
+        """Entrée de flux_arriere_plan décrivant un flux"""
+        duree = stats.duree
+        return {
+            'conversation': formater_flux(cle, stats.initiateur_bas),
+            'paquets': stats.paquets,
+            'bytes': stats.bytes,
+            'duree': round(duree, 2),
+            'debit': round(stats.bytes / duree, 2) if duree > 0 else 0,
+            'premier_ts': stats.premier_ts,
+        }
+    
+    def _evaluer_flux(self, cle, stats):
+        """Description du flux s'il est persistant (plus de 50 paquets sur plus de 20 s), sinon None"""
+        if stats.paquets > SEUIL_PAQUETS_PERSISTANT and stats.duree > SEUIL_DUREE_PERSISTANT:
+            return self._decrire_flux(cle, stats)
+        return None
+    
+    def _evaluer_beaconing(self, cle, stats):
+        """Description du flux si ses intervalles entre salves sont réguliers, sinon None"""
+        if stats.iat_n < MIN_INTERVALLES_BEACONING:
+            return None
+        q25, mediane, q75 = (quantile_classes(stats.iat_classes, stats.iat_n, q)
+                             for q in QUANTILES_BEACONING)
+        dispersion = (q75 - q25) / mediane
+        cv = math.sqrt(stats.iat_m2 / stats.iat_n) / stats.iat_moyenne
+        if dispersion > SEUIL_DISPERSION_BEACONING or cv > SEUIL_CV_BEACONING:
+            return None
+        return self._decrire_beaconing(cle, stats.initiateur_bas, stats.iat_n, mediane, cv,
+                                       dispersion, stats.premier_ts, stats.bytes)
+    
+    def _decrire_beaconing(self, cle, initiateur_bas, intervalles, periode, cv, dispersion,
+                           premier_ts, octets):
+        """Entrée de flux_beaconing décrivant un flux régulier"""
+        _, src, _, dst, dport = adresses_flux(cle, initiateur_bas)
+        return {
+            'conversation': formater_flux(cle, initiateur_bas),
+            'src': formater_adresse(src),
+            'dst': formater_adresse(dst),
+            'port': dport,
+            'intervalles': intervalles,
+            'periode': round(periode, 2),
+            'cv': round(cv, 3),
+            'dispersion': round(dispersion, 3),
+            'premier_ts': premier_ts,
+            'bytes': octets,
+        }
+    
+    def _retenir_beaconing(self, cle, stats):
+        """Évalue un flux terminé pour la détection du beaconing"""
+        balise = self._evaluer_beaconing(cle, stats)
+        if balise is not None:
+            self.flux_beaconing.append(balise)
+        return balise
+    
+    def _alerter_beaconing(self, balise):
+        """Alerte agrégée par (initiateur, répondeur, port) pour un flux régulier"""
+        self.flux_suspects.ajouter(('Beaconing', balise['src'], balise['dst'], balise['port']), {
+            'type': 'Beaconing',
+            'detail': f"{balise['conversation']}: {balise['intervalles']} intervalles réguliers "
+                      f"d'environ {balise['periode']}s (CV {balise['cv']}, "
+                      f"dispersion {balise['dispersion']})",
+            'severite': 'HAUTE',
+            'timestamp': balise['premier_ts'] or 0,
+        }, balise['bytes'])
+    
+    def nb_flux(self):
+        """Nombre total de flux vus: terminés et encore en table"""
+        return self.nb_flux_termines + len(self.conversations)
     
     def _analyser_dns(self, paquet):
         """Analyse les requêtes DNS"""
@@ -97,24 +693,30 @@ class AnalyseurTraficSuspect:
             domaine = paquet.dns.qry_name
             timestamp = float(paquet.sniff_timestamp) if hasattr(paquet, 'sniff_timestamp') else 0
             
-            self.requetes_dns.append({
-                'domaine': domaine,
-                'timestamp': timestamp,
-                'src': paquet.ip.src if hasattr(paquet, 'ip') else 'Unknown'
-            })
-            
-            # Domaines suspects
-            tlds_suspects = ['.tk', '.ml', '.ga', '.cf', '.gq']
-            mots_suspects = ['temp', 'tmp', 'test', 'malware', 'c2', 'cmd']
+            self.nb_requetes_dns += 1
+            hachage = hacher(domaine)
+            self.frequences_dns.ajouter(domaine, hachage)
+            parent = domaine_parent(domaine)
+            esquisse = self.sous_domaines_dns.get(parent)
+            if esquisse is None:
+                esquisse = self.sous_domaines_dns[parent] = HyperLogLog()
+            esquisse.ajouter(hachage)
+            if domaine.strip().strip('.').count('.') > parent.count('.'):
+                echantillon = self.echantillons_dns.get(parent)
+                if echantillon is None:
+                    echantillon = self.echantillons_dns[parent] = EchantillonMinimal()
+                echantillon.ajouter(domaine, hachage)
+            if self.conserver_requetes_dns:
+                ip = hasattr(paquet, 'ip') or hasattr(paquet, 'ipv6')
+                self.requetes_dns.ajouter(domaine, timestamp,
+                                          adresses_couche(couche_ip(paquet))[0] if ip else None)
             
-            if any(tld in domaine for tld in tlds_suspects) or \
-               any(mot in domaine.lower() for mot in mots_suspects):
-                self.flux_suspects.append({
-                    'type': 'DNS Suspect',
-                    'detail': f"Domaine suspect: {domaine}",
-                    'severite': 'HAUTE',
-                    'timestamp': timestamp
-                })
+            # Domaines suspects (TLD/domaines listés ou mots-clés), vérifiés une seule fois
+            cle = ('DNS Suspect', None, domaine, None)
+            taille = int(paquet.length) if hasattr(paquet, 'length') else 0
+            if not self.flux_suspects.mettre_a_jour(cle, timestamp, taille) \
+               and self.filtre_domaines.verifier(domaine) is not None:
+                self.flux_suspects.signaler(cle, 'HAUTE', "Domaine suspect: {dst}", timestamp, taille)
                 
         except AttributeError:
             pass
@@ -122,89 +724,293 @@ class AnalyseurTraficSuspect:
     def _detecter_quic(self, paquet):
         """Détecte le trafic QUIC"""
         try:
-            src = paquet.ip.src
-            dst = paquet.ip.dst
+            src, dst = adresses_couche(couche_ip(paquet))
+            timestamp = float(paquet.sniff_timestamp) if hasattr(paquet, 'sniff_timestamp') else 0
+            taille = int(paquet.length) if hasattr(paquet, 'length') else 0
             
-            # QUIC utilise UDP port 443
-            self.flux_suspects.append({
-                'type': 'QUIC en arrière-plan',
-                'detail': f"{src} → {dst} (UDP 443)",
-                'severite': 'MOYENNE',
-                'timestamp': float(paquet.sniff_timestamp) if hasattr(paquet, 'sniff_timestamp') else 0
-            })
+            # QUIC utilise UDP port 443: une alerte par couple d'adresses
+            cle = ('QUIC en arrière-plan', src, dst, 443)
+            if not self.flux_suspects.mettre_a_jour(cle, timestamp, taille):
+                self.flux_suspects.signaler(cle, 'MOYENNE', "{src} → {dst} (UDP 443)",
+                                            timestamp, taille)
             
         except AttributeError:
             pass
     
     def _detecter_ports_suspects(self, paquet):
-        """Détecte les ports suspects"""
-        ports_malveillants = [4444, 5555, 6666, 7777, 8080, 9999, 31337]
-        
+        """Détecte les ports suspects (la table de dispatch ne transmet que ces ports)"""
         try:
             dstport = int(paquet.tcp.dstport)
-            if dstport in ports_malveillants:
-                self.flux_suspects.append({
-                    'type': 'Port Malveillant',
-                    'detail': f"Connexion vers port {dstport} ({paquet.ip.src} → {paquet.ip.dst})",
-                    'severite': 'CRITIQUE',
-                    'timestamp': float(paquet.sniff_timestamp) if hasattr(paquet, 'sniff_timestamp') else 0
-                })
+            if dstport in PORTS_MALVEILLANTS:
+                src, dst = adresses_couche(couche_ip(paquet))
+                timestamp = float(paquet.sniff_timestamp) if hasattr(paquet, 'sniff_timestamp') else 0
+                taille = int(paquet.length) if hasattr(paquet, 'length') else 0
+                cle = ('Port Malveillant', src, dst, dstport)
+                if not self.flux_suspects.mettre_a_jour(cle, timestamp, taille):
+                    self.flux_suspects.signaler(cle, 'CRITIQUE',
+                                                "Connexion vers port {port} ({src} → {dst})",
+                                                timestamp, taille)
         except (AttributeError, ValueError):
             pass
     
+    def to_numpy(self):
+        """Exporte les conversations sous forme de table de flux en colonnes (NumPy)"""
+        return TableFlux.depuis_conversations(self.conversations)
+    
+    def from_numpy(self, table):
+        """Remplace les conversations par celles d'une table de flux (voir to_numpy)"""
+        self.conversations = table.vers_conversations()
+    
+    def _vectoriser(self, taille):
+        """Indique si une passe vectorisée est préférable pour `taille` éléments"""
+        return numpy_disponible() and taille >= SEUIL_VECTORISATION
+    
     def detecter_flux_persistants(self):
-        """Détecte les flux persistants en arrière-plan"""
+        """
+        Détecte les flux persistants en arrière-plan
+
+        Les flux expirés pendant l'analyse ont été évalués à leur expiration;
+        restent les flux encore en table à la fin de la capture.
+        """
         print("[*] Détection des flux persistants...")
         
-        count = 0
-        for conv, stats in self.conversations.items():
-            # Flux avec plus de 50 paquets
-            if stats['paquets'] > 50:
-                # Calculer la durée
-                if len(stats['timestamps']) > 1:
-                    duree = stats['timestamps'][-1] - stats['timestamps'][0]
-                    
-                    # Flux persistant > 20 secondes
-                    if duree > 20:
-                        self.flux_arriere_plan.append({
-                            'conversation': conv,
-                            'paquets': stats['paquets'],
-                            'bytes': stats['bytes'],
-                            'duree': round(duree, 2),
-                            'debit': round(stats['bytes'] / duree, 2) if duree > 0 else 0
-                        })
-                        count += 1
-        
-        print(f"[✓] {count} flux persistants détectés")
+        termines = len(self.flux_arriere_plan)
+        if self._vectoriser(len(self.conversations)):
+            self._detecter_flux_persistants_vectorise(self.to_numpy())
+        else:
+            for cle, stats in self.conversations.items():
+                # Flux de plus de 50 paquets durant plus de 20 secondes
+                flux = self._evaluer_flux(cle, stats)
+                if flux is not None:
+                    self.flux_arriere_plan.append(flux)
+        self._flux_evalues = True
+        
+        # Ordre de début des flux, indépendant du moment de leur expiration
+        self.flux_arriere_plan.sort(key=lambda flux: (flux['premier_ts'] or 0, flux['conversation']))
+        print(f"[✓] {len(self.flux_arriere_plan)} flux persistants détectés "
+              f"(dont {termines} parmi les {self.nb_flux_termines} flux terminés)")
+    
+    def _detecter_flux_persistants_vectorise(self, table):
+        """Détection des flux persistants par masques sur la table de flux"""
+        durees = table.durees()
+        debits = table.debits(durees)
+        persistants = np.flatnonzero(
+            table.masque_persistants(SEUIL_PAQUETS_PERSISTANT, SEUIL_DUREE_PERSISTANT, durees))
+        
+        paquets = table['packets']
+        octets = table['bytes']
+        premiers = table['first_ts']
+        for i in persistants.tolist():
+            self.flux_arriere_plan.append({
+                'conversation': table.libelle(i),
+                'paquets': int(paquets[i]),
+                'bytes': int(octets[i]),
+                'duree': round(float(durees[i]), 2),
+                'debit': round(float(debits[i]), 2),
+                'premier_ts': float(premiers[i]),
+            })
+        return len(persistants)
+    
+    def detecter_beaconing(self):
+        """
+        Détecte les flux aux intervalles réguliers (balises de C2 « low and slow »)
+        Nécessite les statistiques d'intervalles (inter_arrivees, --beaconing).
+
+        Les flux expirés pendant l'analyse ont été évalués à leur expiration;
+        les flux encore en table sont évalués ici, en une passe vectorisée sur
+        les esquisses lorsque NumPy est disponible. Une alerte est émise par
+        flux retenu.
+        """
+        print("[*] Détection du beaconing...")
+        if not self.inter_arrivees:
+            print("[!] Statistiques d'intervalles non collectées (inter_arrivees), détection ignorée")
+            return
+        
+        if self._vectoriser(len(self.conversations)):
+            self._detecter_beaconing_vectorise(self.to_numpy())
+        else:
+            for cle, stats in self.conversations.items():
+                self._retenir_beaconing(cle, stats)
+        self._flux_evalues = True
+        
+        self.flux_beaconing.sort(key=lambda balise: (balise['premier_ts'] or 0, balise['conversation']))
+        for balise in self.flux_beaconing:
+            self._alerter_beaconing(balise)
+        print(f"[✓] {len(self.flux_beaconing)} flux de beaconing détectés")
+    
+    def _detecter_beaconing_vectorise(self, table):
+        """Évaluation du beaconing par masques sur la table de flux"""
+        q25, medianes, q75 = table.quantiles_iat(QUANTILES_BEACONING)
+        intervalles = table['iat_n']
+        moyennes = table['iat_moyenne']
+        candidats = np.flatnonzero(intervalles >= MIN_INTERVALLES_BEACONING)
+        
+        dispersions = (q75[candidats] - q25[candidats]) / medianes[candidats]
+        cvs = np.sqrt(table['iat_m2'][candidats] / intervalles[candidats]) / moyennes[candidats]
+        retenus = (dispersions <= SEUIL_DISPERSION_BEACONING) & (cvs <= SEUIL_CV_BEACONING)
+        
+        premiers = table['first_ts']
+        octets = table['bytes']
+        initiateurs = table['initiateur_bas']
+        for j in np.flatnonzero(retenus).tolist():
+            i = int(candidats[j])
+            premier = float(premiers[i])
+            self.flux_beaconing.append(self._decrire_beaconing(
+                table.cle(i), bool(initiateurs[i]), int(intervalles[i]), float(medianes[i]),
+                float(cvs[j]), float(dispersions[j]), None if premier != premier else premier,
+                int(octets[i])))
+        return int(retenus.sum())
     
     def analyser_frequence_dns(self):
         """Analyse la fréquence des requêtes DNS"""
         print("[*] Analyse des requêtes DNS...")
         
-        domaines = defaultdict(int)
-        for req in self.requetes_dns:
-            domaines[req['domaine']] += 1
+        if not self.conserver_requetes_dns:
+            # Comptes exacts tant que les domaines distincts tiennent dans le tas, sinon majorants
+            domaines = ((domaine, freq if exact else f"≈{freq}", freq)
+                        for domaine, freq, exact in self.frequences_dns.frequents(SEUIL_FREQUENCE_DNS))
+        else:
+            # Comptes exacts par identifiant de domaine (voir symboles.RequetesDNS)
+            domaines = ((domaine, freq, freq) for domaine, freq in self.requetes_dns.effectifs())
         
         count = 0
         # Domaines contactés plus de 10 fois
-        for domaine, freq in domaines.items():
-            if freq > 10:
-                self.flux_suspects.append({
+        for domaine, libelle, freq in domaines:
+            if freq > SEUIL_FREQUENCE_DNS:
+                self.flux_suspects.ajouter(('DNS Fréquent', None, domaine, None), {
                     'type': 'DNS Fréquent',
-                    'detail': f"{domaine} contacté {freq} fois (possible DNS tunneling)",
+                    'detail': f"{domaine} contacté {libelle} fois (possible DNS tunneling)",
                     'severite': 'MOYENNE',
                     'timestamp': 0
-                })
+                }, occurrences=freq)
                 count += 1
         
-        print(f"[✓] {len(self.requetes_dns)} requêtes DNS analysées, {count} domaines suspects")
+        # Domaines parents aux nombreux sous-domaines distincts (données encodées dans les requêtes)
+        parents = 0
+        for parent, esquisse in self.sous_domaines_dns.items():
+            distincts = esquisse.estimer()
+            if distincts > SEUIL_SOUS_DOMAINES:
+                self.flux_suspects.ajouter(('DNS Sous-domaines', None, parent, None), {
+                    'type': 'DNS Sous-domaines',
+                    'detail': f"{parent}: environ {distincts} sous-domaines distincts "
+                              f"(possible DNS tunneling)",
+                    'severite': 'MOYENNE',
+                    'timestamp': 0
+                })
+                parents += 1
+        
+        print(f"[✓] {self.nb_requetes_dns} requêtes DNS analysées, {count} domaines suspects, "
+              f"{parents} domaines aux sous-domaines multiples")
+        self.detecter_tunnels_dns()
+    
+    def detecter_tunnels_dns(self):
+        """Détecte les tunnels DNS d'après les sous-domaines échantillonnés de chaque domaine parent"""
+        print("[*] Détection des tunnels DNS...")
+        tunnels = self._evaluer_tunnels_dns()
+        for tunnel in tunnels:
+            self._alerter_tunnel_dns(tunnel)
+        print(f"[✓] {len(tunnels)} tunnels DNS probables")
+    
+    def _evaluer_tunnels_dns(self, parents=None):
+        """
+        Évalue les domaines parents (tous si parents vaut None) aux sous-domaines nombreux
+        Les sous-domaines échantillonnés des candidats forment une seule table de noms,
+        caractérisée en une passe (vectorisée au-delà de SEUIL_VECTORISATION noms).
+        
+        Returns:
+            Liste de dictionnaires (domaine, sous_domaines, suspects, echantillon,
+            entropie, etiquette_max) des tunnels probables
+        """
+        candidats = []
+        noms = []
+        groupes = []
+        for parent in self.echantillons_dns if parents is None else parents:
+            echantillon = self.echantillons_dns.get(parent)
+            if echantillon is None:
+                continue
+            distincts = self.sous_domaines_dns[parent].estimer()
+            if distincts < MIN_SOUS_DOMAINES_TUNNEL:
+                continue
+            for domaine in echantillon.elements():
+                noms.append(sous_domaine(domaine, parent))
+                groupes.append(len(candidats))
+            candidats.append((parent, distincts))
+        
+        if self._vectoriser(len(noms)):
+            caracteristiques = caracteriser_lot(noms)
+            groupes = np.asarray(groupes, dtype=np.int64)
+            requis = np.fromiter((score_requis_tunnel(distincts) for _, distincts in candidats),
+                                 dtype=np.int64, count=len(candidats))
+            suspects = score_tunnel(*caracteristiques.T) >= requis[groupes]
+            n = len(candidats)
+            effectifs = np.bincount(groupes, minlength=n)
+            agregats = zip(np.bincount(groupes, weights=suspects, minlength=n).astype(np.int64).tolist(),
+                           effectifs.tolist(),
+                           (np.bincount(groupes, weights=caracteristiques[:, 1], minlength=n)
+                            / effectifs).tolist(),
+                           np.maximum.reduceat(caracteristiques[:, 2],
+                                               np.cumsum(effectifs) - effectifs).astype(np.int64).tolist())
+        else:
+            agregats = [[0, 0, 0.0, 0] for _ in candidats]
+            for nom, groupe in zip(noms, groupes):
+                caracteristiques = caracteriser(nom)
+                agregat = agregats[groupe]
+                agregat[0] += score_tunnel(*caracteristiques) >= score_requis_tunnel(
+                    candidats[groupe][1])
+                agregat[1] += 1
+                agregat[2] += caracteristiques[1]
+                agregat[3] = max(agregat[3], caracteristiques[2])
+            agregats = [(suspects, effectif, entropie / effectif, etiquette)
+                        for suspects, effectif, entropie, etiquette in agregats]
+        
+        return [{'domaine': parent, 'sous_domaines': distincts, 'suspects': suspects,
+                 'echantillon': effectif, 'entropie': round(entropie, 2), 'etiquette_max': etiquette}
+                for (parent, distincts), (suspects, effectif, entropie, etiquette)
+                in zip(candidats, agregats) if suspects >= PROPORTION_TUNNEL * effectif]
     
-    def generer_rapport_html(self, fichier_sortie='rapport_analyse.html'):
-        """Génère un rapport HTML détaillé"""
+    def _alerter_tunnel_dns(self, tunnel, timestamp=0):
+        """Ajoute l'alerte 'DNS Tunneling' d'un tunnel retenu par _evaluer_tunnels_dns"""
+        self.flux_suspects.ajouter(('DNS Tunneling', None, tunnel['domaine'], None), {
+            'type': 'DNS Tunneling',
+            'detail': f"{tunnel['domaine']}: environ {tunnel['sous_domaines']} sous-domaines distincts, "
+                      f"{tunnel['suspects']}/{tunnel['echantillon']} échantillonnés suspects "
+                      f"(entropie moyenne {tunnel['entropie']} bits, étiquettes jusqu'à "
+                      f"{tunnel['etiquette_max']} caractères)",
+            'severite': 'HAUTE',
+            'timestamp': timestamp
+        })
+    
+    def top_flux_arriere_plan(self, n=None):
+        """Les n flux persistants ayant le plus de paquets (tous si n vaut None)"""
+        if n is None:
+            n = len(self.flux_arriere_plan)
+        if self._vectoriser(len(self.flux_arriere_plan)):
+            paquets = np.fromiter((flux['paquets'] for flux in self.flux_arriere_plan),
+                                  dtype=np.int64, count=len(self.flux_arriere_plan))
+            return [self.flux_arriere_plan[i] for i in indices_top(paquets, n).tolist()]
+        # Sélection partielle: tas de n éléments, sans trier toute la liste
+        return heapq.nlargest(n, self.flux_arriere_plan, key=lambda x: x['paquets'])
+    
+    def top_protocoles(self, n=None):
+        """Les n protocoles les plus fréquents (tous si n vaut None), en paires (protocole, paquets)"""
+        if n is None:
+            return sorted(self.stats_protocoles.items(), key=lambda x: x[1], reverse=True)
+        return heapq.nlargest(n, self.stats_protocoles.items(), key=lambda x: x[1])
+    
+    def top_emetteurs(self, dimension='sources', mesure='bytes', n=None):
+        """
+        Les n premiers éléments d'une dimension des plus gros émetteurs
+        ('sources', 'destinations', 'conversations' ou 'ports'), par 'paquets'
+        ou 'bytes', en triplets (texte, valeur, erreur)
+        """
+        return self.gros_emetteurs.classement(dimension, mesure, n)
+    
+    def generer_rapport_html(self, fichier_sortie='rapport_analyse.html', complet=False):
+        """Génère un rapport HTML détaillé (complet: sans limite de lignes par section)"""
         print(f"[*] Génération du rapport HTML: {fichier_sortie}")
         
         # Appeler la fonction du module rapport_generator
-        generer_rapport_html(self, fichier_sortie)
+        generer_rapport_html(self, fichier_sortie, complet)
         
         print(f"[✓] Rapport généré: {fichier_sortie}")
     
@@ -214,19 +1020,40 @@ class AnalyseurTraficSuspect:
         print("                  RÉSUMÉ DE L'ANALYSE")
         print("="*70)
         print(f"\n📊 Statistiques Globales:")
-        print(f"   - Flux suspects détectés: {len(self.flux_suspects)}")
+        print(f"   - Flux suspects détectés: {len(self.flux_suspects)} "
+              f"({self.flux_suspects.occurrences:,} occurrences)")
         print(f"   - Flux persistants en arrière-plan: {len(self.flux_arriere_plan)}")
-        print(f"   - Requêtes DNS: {len(self.requetes_dns)}")
-        print(f"   - Conversations IP: {len(self.conversations)}")
+        if self.inter_arrivees:
+            print(f"   - Flux de beaconing: {len(self.flux_beaconing)}")
+        print(f"   - Requêtes DNS: {self.nb_requetes_dns}")
+        print(f"   - Flux IP (5-tuple): {self.nb_flux()} ({len(self.conversations)} encore actifs)")
+        if self.nb_rejetes:
+            print(f"   - Paquets écartés par le pré-filtre: {self.nb_rejetes}")
+        
+        if self._dispatch.compteurs:
+            print(f"\n⏱  Temps par détecteur:")
+            for nom, appels, secondes in self.temps_detecteurs():
+                moyenne = secondes / appels * 1e6 if appels else 0
+                print(f"   - {nom}: {appels:,} appels, {secondes:.3f}s ({moyenne:.2f} µs/appel)")
         
         if self.flux_arriere_plan:
             print(f"\n🔴 Top 5 Flux Arrière-plan:")
-            for flux in sorted(self.flux_arriere_plan, key=lambda x: x['paquets'], reverse=True)[:5]:
+            for flux in self.top_flux_arriere_plan(5):
                 print(f"   - {flux['conversation']}: {flux['paquets']} paquets en {flux['duree']}s")
         
+        if self.gros_emetteurs:
+            print(f"\n📶 Top 5 Émetteurs (octets):")
+            for source, octets, erreur in self.top_emetteurs('sources', 'bytes', 5):
+                marge = f" (±{erreur:,})" if erreur else ""
+                print(f"   - {source}: {octets:,} bytes{marge}")
+            print(f"\n🔁 Top 5 Conversations (octets):")
+            for conversation, octets, erreur in self.top_emetteurs('conversations', 'bytes', 5):
+                marge = f" (±{erreur:,})" if erreur else ""
+                print(f"   - {conversation}: {octets:,} bytes{marge}")
+        
         if self.stats_protocoles:
             print(f"\n📡 Top 5 Protocoles:")
-            for proto, count in sorted(self.stats_protocoles.items(), key=lambda x: x[1], reverse=True)[:5]:
+            for proto, count in self.top_protocoles(5):
                 print(f"   - {proto}: {count:,} paquets")
         
         print("\n" + "="*70 + "\n")
\ No newline at end of file
@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+"""
+Banc de mesure des étapes de l'analyse
+Génère (ou réutilise) une capture synthétique déterministe, chronomètre chaque
+étape (analyser, detecter_flux_persistants, analyser_frequence_dns,
+generer_rapport_html) et relève le débit en paquets/s et la mémoire résidente
+maximale. Les résultats sont écrits en JSON et peuvent être comparés à une
+référence enregistrée.
+
+Exemples:
+    python bench/bench_analyse.py --packets 200000 --output resultats.json
+    python bench/bench_analyse.py --save-baseline bench/baseline.json
+    python bench/bench_analyse.py --baseline bench/baseline.json --tolerance 0.15
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+RACINE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RACINE)
+
+from generateur_pcap import MELANGE_DEFAUT, generer_capture, lire_melange  # noqa: E402
+from analyseur import AnalyseurTraficSuspect  # noqa: E402
+from table_flux import numpy_disponible  # noqa: E402
+from instrumentation import rss_courant, rss_maximal_processus  # noqa: E402
+
+ETAPES = ('analyser', 'detecter_flux_persistants', 'analyser_frequence_dns', 'generer_rapport_html')
+
+# Période d'échantillonnage de la mémoire résidente
+PERIODE_RSS = 0.01
+
+# En dessous de cet écart absolu (secondes), une étape n'est jamais en régression
+ECART_MINIMAL = 0.005
+
+
+class SuiviMemoire:
+    """
+    Relève le pic de mémoire résidente pendant un bloc
+
+    Un fil échantillonne /proc/self/statm; sans /proc, le maximum du processus
+    (getrusage) sert de borne supérieure.
+    """
+
+    def __init__(self, periode=PERIODE_RSS):
+        self.periode = periode
+        self.pic = 0
+        self._arret = threading.Event()
+        self._fil = None
+
+    def _echantillonner(self):
+        while not self._arret.wait(self.periode):
+            self.pic = max(self.pic, rss_courant())
+
+    def __enter__(self):
+        self.pic = rss_courant()
+        if self.pic:
+            self._fil = threading.Thread(target=self._echantillonner, daemon=True)
+            self._fil.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._arret.set()
+        if self._fil is not None:
+            self._fil.join()
+            self.pic = max(self.pic, rss_courant())
+        else:
+            self.pic = rss_maximal_processus()
+        return False
+
+
+def mesurer(fonction, nb_paquets):
+    """Exécute une étape (sortie console masquée) et retourne ses mesures"""
+    with SuiviMemoire() as memoire, contextlib.redirect_stdout(io.StringIO()):
+        debut = time.perf_counter()
+        fonction()
+        secondes = time.perf_counter() - debut
+    return {
+        'secondes': round(secondes, 6),
+        'paquets_par_seconde': round(nb_paquets / secondes, 1) if secondes > 0 else None,
+        'rss_max_mo': round(memoire.pic / (1 << 20), 1),
+    }
+
+
+def executer_iteration(fichier_pcap, nb_paquets, backend, dossier):
+    """Une analyse complète, étape par étape"""
+    analyseur = AnalyseurTraficSuspect(fichier_pcap, backend=backend)
+    rapport = os.path.join(dossier, 'rapport_bench.html')
+    fonctions = {
+        'analyser': analyseur.analyser,
+        'detecter_flux_persistants': analyseur.detecter_flux_persistants,
+        'analyser_frequence_dns': analyseur.analyser_frequence_dns,
+        'generer_rapport_html': lambda: analyseur.generer_rapport_html(rapport),
+    }
+    mesures = {etape: mesurer(fonctions[etape], nb_paquets) for etape in ETAPES}
+    volumes = {
+        'conversations': len(analyseur.conversations),
+        'flux_termines': analyseur.nb_flux_termines,
+        'requetes_dns': analyseur.nb_requetes_dns,
+        'flux_suspects': len(analyseur.flux_suspects),
+        'flux_arriere_plan': len(analyseur.flux_arriere_plan),
+    }
+    return mesures, volumes
+
+
+def commit_git():
+    """Commit courant du dépôt (None hors dépôt git)"""
+    try:
+        sortie = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=RACINE,
+                                capture_output=True, text=True, timeout=10)
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return sortie.stdout.strip() or None
+
+
+def executer_bench(args, dossier):
+    """Prépare la capture, exécute les itérations et retourne les résultats"""
+    if args.capture:
+        fichier_pcap = args.capture
+        nb_paquets = None
+    else:
+        extension = '.pcapng' if args.pcapng else '.pcap'
+        fichier_pcap = os.path.join(dossier, f"synthetique_{args.packets}_{args.seed}{extension}")
+        print(f"[*] Génération de la capture synthétique ({args.packets:,} paquets)...")
+        nb_paquets = generer_capture(fichier_pcap, args.packets, args.mix, args.flows, args.seed,
+                                     args.pcapng)
+
+    iterations = []
+    for numero in range(1, args.repeat + 1):
+        print(f"[*] Itération {numero}/{args.repeat}...")
+        mesures, volumes = executer_iteration(fichier_pcap, nb_paquets or 0, args.backend, dossier)
+        iterations.append(mesures)
+
+    if nb_paquets is None:
+        # Capture fournie: le débit est calculé sur le nombre de paquets réellement lus
+        analyseur = AnalyseurTraficSuspect(fichier_pcap, backend=args.backend)
+        with contextlib.redirect_stdout(io.StringIO()):
+            analyseur.analyser()
+        nb_paquets = analyseur.nb_paquets
+        for mesures in iterations:
+            for mesure in mesures.values():
+                if mesure['secondes'] > 0:
+                    mesure['paquets_par_seconde'] = round(nb_paquets / mesure['secondes'], 1)
+
+    # Meilleure itération par étape (la moins perturbée par le reste du système)
+    etapes = {}
+    for etape in ETAPES:
+        meilleure = min((mesures[etape] for mesures in iterations), key=lambda m: m['secondes'])
+        etapes[etape] = dict(meilleure, rss_max_mo=max(m[etape]['rss_max_mo'] for m in iterations))
+
+    return {
+        'date': datetime.now().isoformat(timespec='seconds'),
+        'commit': commit_git(),
+        'environnement': {
+            'python': platform.python_version(),
+            'plateforme': platform.platform(),
+            'processeur': platform.machine(),
+            'numpy': numpy_disponible(),
+        },
+        'parametres': {
+            'capture': args.capture,
+            'paquets': nb_paquets,
+            'melange': None if args.capture else args.mix,
+            'flux': None if args.capture else args.flows,
+            'graine': None if args.capture else args.seed,
+            'pcapng': args.pcapng,
+            'backend': args.backend,
+            'iterations': args.repeat,
+        },
+        'volumes': volumes,
+        'etapes': etapes,
+        'total_secondes': round(sum(m['secondes'] for m in etapes.values()), 6),
+    }
+
+
+def comparer(resultats, reference, tolerance):
+    """
+    Compare les temps de chaque étape à la référence
+
+    Returns:
+        Liste des étapes en régression: plus lentes que la référence au-delà de
+        la tolérance relative et d'ECART_MINIMAL (bruit de mesure)
+    """
+    parametres = dict(resultats['parametres'], iterations=None)
+    parametres_reference = dict(reference.get('parametres', {}), iterations=None)
+    differents = sorted(cle for cle in parametres
+                        if parametres[cle] != parametres_reference.get(cle))
+    if differents:
+        print(f"[!] Paramètres différents de la référence ({', '.join(differents)}): "
+              f"comparaison indicative")
+
+    regressions = []
+    print(f"\n{'Étape':<28}{'Référence':>12}{'Actuel':>12}{'Écart':>10}")
+    for etape in ETAPES:
+        actuel = resultats['etapes'][etape]['secondes']
+        avant = reference.get('etapes', {}).get(etape, {}).get('secondes')
+        if not avant:
+            print(f"{etape:<28}{'-':>12}{actuel:>11.3f}s{'':>10}")
+            continue
+        ecart = actuel / avant - 1
+        marque = ''
+        if ecart > tolerance and actuel - avant > ECART_MINIMAL:
+            regressions.append(etape)
+            marque = '  [!] régression'
+        print(f"{etape:<28}{avant:>11.3f}s{actuel:>11.3f}s{ecart:>+9.1%}{marque}")
+    return regressions
+
+
+def construire_parseur():
+    parseur = argparse.ArgumentParser(description="Banc de mesure des étapes de l'analyse")
+    parseur.add_argument('--capture', help="Capture existante à mesurer (au lieu d'une capture générée)")
+    parseur.add_argument('--packets', type=int, default=200000, help="Nombre de paquets générés (défaut: 200000)")
+    parseur.add_argument('--mix', type=lire_melange, default=MELANGE_DEFAUT,
+                         help="Proportions tcp=..,quic=..,dns=..,ports=.. (défaut: 55/20/20/5)")
+    parseur.add_argument('--flows', type=int, default=1000, help="Nombre de flux distincts (défaut: 1000)")
+    parseur.add_argument('--seed', type=int, default=1, help="Graine du générateur (défaut: 1)")
+    parseur.add_argument('--pcapng', action='store_true', help="Générer la capture au format PCAPNG")
+    parseur.add_argument('--backend', choices=('auto', 'natif', 'pyshark'), default='natif',
+                         help="Backend de décodage (défaut: natif)")
+    parseur.add_argument('--repeat', type=int, default=3, help="Nombre d'itérations (défaut: 3)")
+    parseur.add_argument('--output', help="Fichier JSON des résultats")
+    parseur.add_argument('--baseline', help="Référence JSON à laquelle comparer les résultats")
+    parseur.add_argument('--tolerance', type=float, default=0.10,
+                         help="Ralentissement toléré par étape avant régression (défaut: 0.10)")
+    parseur.add_argument('--save-baseline', metavar='FICHIER',
+                         help="Enregistrer les résultats comme nouvelle référence")
+    return parseur
+
+
+def main():
+    args = construire_parseur().parse_args()
+    if args.repeat < 1:
+        print("[!] Erreur: --repeat doit être au moins 1")
+        sys.exit(1)
+
+    with tempfile.TemporaryDirectory(prefix='bench_pcap_') as dossier:
+        resultats = executer_bench(args, dossier)
+
+    print(f"\n[✓] {resultats['parametres']['paquets']:,} paquets, "
+          f"meilleur temps sur {args.repeat} itération(s):")
+    for etape, mesure in resultats['etapes'].items():
+        print(f"   - {etape}: {mesure['secondes']:.3f}s, "
+              f"{mesure['paquets_par_seconde'] or 0:,.0f} paquets/s, RSS max {mesure['rss_max_mo']} Mo")
+
+    for chemin in filter(None, (args.output, args.save_baseline)):
+        with open(chemin, 'w', encoding='utf-8') as f:
+            json.dump(resultats, f, indent=2, ensure_ascii=False)
+            f.write('\n')
+        print(f"[✓] Résultats écrits: {chemin}")
+
+    if args.baseline:
+        try:
+            with open(args.baseline, encoding='utf-8') as f:
+                reference = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"[!] Erreur: référence illisible ({e})")
+            sys.exit(1)
+        regressions = comparer(resultats, reference, args.tolerance)
+        if regressions:
+            print(f"\n[!] Régression au-delà de {args.tolerance:.0%}: {', '.join(regressions)}")
+            sys.exit(1)
+        print(f"\n[✓] Aucune régression au-delà de {args.tolerance:.0%}")
+
+
+if __name__ == '__main__':
+    main()
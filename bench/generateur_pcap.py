@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Générateur déterministe de captures synthétiques
+Produit N paquets Ethernet/IPv4 avec un mélange configurable de trafic TCP,
+UDP/443 (QUIC), DNS et de connexions vers des ports malveillants, répartis
+sur un nombre donné de flux. Une même graine produit toujours le même fichier.
+
+Exemple:
+    python bench/generateur_pcap.py capture.pcap --packets 100000 \\
+        --mix tcp=50,quic=20,dns=20,ports=10 --flows 1000
+"""
+
+import argparse
+import random
+import struct
+
+# Proportions par défaut (normalisées)
+MELANGE_DEFAUT = {'tcp': 55, 'quic': 20, 'dns': 20, 'ports': 5}
+
+DOMAINES = ['google.com', 'example.com', 'api.github.com', 'cdn.jsdelivr.net', 'a.b.com',
+            'evil.tk', 'c2.example.org', 'update.malware.ml', 'x.tkt.example.com']
+PORTS_FLAGUES = (4444, 5555, 6666, 7777, 9999, 31337)
+SERVEUR_DNS = bytes((8, 8, 8, 8))
+
+_ENTETE_PCAP = struct.Struct('<IHHiIII')
+_ENREGISTREMENT_PCAP = struct.Struct('<IIII')
+
+
+def _ipv4(entier):
+    return struct.pack('!I', entier)
+
+
+def _trame(src, dst, proto, srcport, dstport, charge=b''):
+    """Trame Ethernet/IPv4/TCP ou UDP minimale"""
+    if proto == 6:
+        l4 = struct.pack('!HHIIBBHHH', srcport, dstport, 0, 0, 5 << 4, 0x18, 65535, 0, 0) + charge
+    else:
+        l4 = struct.pack('!HHHH', srcport, dstport, 8 + len(charge), 0) + charge
+    ip = struct.pack('!BBHHHBBH4s4s', 0x45, 0, 20 + len(l4), 0, 0, 64, proto, 0, src, dst)
+    return b'\x02\x00\x00\x00\x00\x02\x02\x00\x00\x00\x00\x01\x08\x00' + ip + l4
+
+
+def _question_dns(identifiant, domaine):
+    nom = b''.join(bytes((len(etiquette),)) + etiquette.encode() for etiquette in domaine.split('.'))
+    return struct.pack('!HHHHHH', identifiant, 0x0100, 1, 0, 0, 0) + nom + b'\x00\x00\x01\x00\x01'
+
+
+def lire_melange(texte):
+    """Analyse 'tcp=50,quic=20,...' en dictionnaire de proportions"""
+    melange = {}
+    for element in texte.split(','):
+        nom, _, valeur = element.partition('=')
+        nom = nom.strip()
+        if nom not in MELANGE_DEFAUT:
+            raise argparse.ArgumentTypeError(f"type inconnu: {nom} ({', '.join(MELANGE_DEFAUT)})")
+        melange[nom] = float(valeur)
+    if sum(melange.values()) <= 0:
+        raise argparse.ArgumentTypeError("le mélange doit contenir au moins une proportion positive")
+    return melange
+
+
+def generer_paquets(nombre, melange=None, nb_flux=256, graine=1, debut=1_700_000_000.0):
+    """
+    Génère les paquets de la capture
+
+    Args:
+        nombre: Nombre de paquets
+        melange: Proportions par type ('tcp', 'quic', 'dns', 'ports')
+        nb_flux: Nombre de couples (client, serveur) distincts
+        graine: Graine du générateur pseudo-aléatoire
+
+    Yields:
+        Tuples (horodatage, trame)
+    """
+    aleatoire = random.Random(graine)
+    melange = melange or MELANGE_DEFAUT
+    types = [nom for nom, poids in melange.items() if poids > 0]
+    poids = [melange[nom] for nom in types]
+    cumul = []
+    total = 0.0
+    for valeur in poids:
+        total += valeur
+        cumul.append(total / sum(poids))
+
+    # Clients en 10.0.0.0/16, serveurs en 198.18.0.0/15 (plage réservée aux tests)
+    flux = [(_ipv4(0x0a000000 + aleatoire.randrange(1, 1 << 16)),
+             _ipv4(0xc6120000 + aleatoire.randrange(1, 1 << 17)),
+             aleatoire.randrange(32768, 61000)) for _ in range(nb_flux)]
+
+    horodatage = debut
+    for numero in range(nombre):
+        horodatage += aleatoire.expovariate(1000.0)
+        tirage = aleatoire.random()
+        type_paquet = types[-1]
+        for nom, seuil in zip(types, cumul):
+            if tirage < seuil:
+                type_paquet = nom
+                break
+        client, serveur, port_client = flux[aleatoire.randrange(nb_flux)]
+
+        if type_paquet == 'tcp':
+            charge = b'\x17\x03\x03' + bytes(aleatoire.randrange(0, 1200))
+            trame = _trame(client, serveur, 6, port_client, 443, charge)
+        elif type_paquet == 'quic':
+            trame = _trame(client, serveur, 17, port_client, 443, bytes(aleatoire.randrange(40, 1200)))
+        elif type_paquet == 'dns':
+            domaine = DOMAINES[aleatoire.randrange(len(DOMAINES))]
+            trame = _trame(client, SERVEUR_DNS, 17, port_client, 53,
+                           _question_dns(numero & 0xffff, domaine))
+        else:
+            port = PORTS_FLAGUES[aleatoire.randrange(len(PORTS_FLAGUES))]
+            trame = _trame(client, serveur, 6, port_client, port)
+        yield horodatage, trame
+
+
+def ecrire_pcap(chemin, paquets):
+    """Écrit les paquets dans un fichier PCAP (microsecondes, Ethernet)"""
+    nombre = 0
+    with open(chemin, 'wb', buffering=1 << 20) as f:
+        f.write(_ENTETE_PCAP.pack(0xa1b2c3d4, 2, 4, 0, 0, 65535, 1))
+        for horodatage, trame in paquets:
+            secondes = int(horodatage)
+            microsecondes = int(round((horodatage - secondes) * 1e6))
+            if microsecondes == 1000000:
+                secondes, microsecondes = secondes + 1, 0
+            f.write(_ENREGISTREMENT_PCAP.pack(secondes, microsecondes, len(trame), len(trame)))
+            f.write(trame)
+            nombre += 1
+    return nombre
+
+
+def ecrire_pcapng(chemin, paquets):
+    """Écrit les paquets dans un fichier PCAPNG (SHB, IDB, EPB)"""
+    def bloc(type_bloc, corps):
+        corps += b'\x00' * (-len(corps) % 4)
+        longueur = len(corps) + 12
+        return struct.pack('<II', type_bloc, longueur) + corps + struct.pack('<I', longueur)
+
+    nombre = 0
+    with open(chemin, 'wb', buffering=1 << 20) as f:
+        f.write(bloc(0x0a0d0d0a, struct.pack('<IHHq', 0x1a2b3c4d, 1, 0, -1)))
+        f.write(bloc(1, struct.pack('<HHI', 1, 0, 65535)))
+        for horodatage, trame in paquets:
+            micro = int(round(horodatage * 1e6))
+            f.write(bloc(6, struct.pack('<IIIII', 0, micro >> 32, micro & 0xffffffff,
+                                        len(trame), len(trame)) + trame))
+            nombre += 1
+    return nombre
+
+
+def generer_capture(chemin, nombre, melange=None, nb_flux=256, graine=1, pcapng=False):
+    """Génère une capture synthétique complète et retourne le nombre de paquets écrits"""
+    paquets = generer_paquets(nombre, melange, nb_flux, graine)
+    return (ecrire_pcapng if pcapng else ecrire_pcap)(chemin, paquets)
+
+
+def construire_parseur():
+    parseur = argparse.ArgumentParser(description="Générateur déterministe de captures synthétiques")
+    parseur.add_argument('sortie', help="Fichier de capture à écrire")
+    parseur.add_argument('--packets', type=int, default=100000, help="Nombre de paquets (défaut: 100000)")
+    parseur.add_argument('--mix', type=lire_melange, default=MELANGE_DEFAUT,
+                         help="Proportions tcp=..,quic=..,dns=..,ports=.. (défaut: 55/20/20/5)")
+    parseur.add_argument('--flows', type=int, default=256, help="Nombre de flux distincts (défaut: 256)")
+    parseur.add_argument('--seed', type=int, default=1, help="Graine (défaut: 1)")
+    parseur.add_argument('--pcapng', action='store_true', help="Écrire au format PCAPNG")
+    return parseur
+
+
+if __name__ == '__main__':
+    args = construire_parseur().parse_args()
+    nombre = generer_capture(args.sortie, args.packets, args.mix, args.flows, args.seed, args.pcapng)
+    print(f"[✓] {nombre} paquets écrits dans {args.sortie}")
@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""
+Module de cache persistant des analyses
+Conserve sur disque l'état produit par analyser() (statistiques de protocoles,
+table des flux, esquisses et requêtes DNS, alertes par paquet), indexé par le
+contenu de la capture, pour sauter le décodage lors des exécutions suivantes
+"""
+
+import gzip
+import hashlib
+import os
+import pickle
+import tempfile
+from array import array
+from analyseur import (MIN_INTERVALLES_BEACONING, SEUIL_CV_BEACONING, SEUIL_DISPERSION_BEACONING,
+                       SEUIL_DUREE_PERSISTANT, SEUIL_PAQUETS_PERSISTANT, choisir_backend)
+from conversations import StatsConversation, StatsConversationIAT
+from decodeur import VERSION_DECODEUR
+
+VERSION_CACHE = 9
+TAILLE_BLOC_HASH = 4 << 20
+TAILLE_MAX_DEFAUT = 2 << 30
+EXTENSION = '.cache.gz'
+
+
+def dossier_cache_defaut():
+    """Répertoire de cache par défaut (XDG_CACHE_HOME ou ~/.cache)"""
+    base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'analyseur_pcap')
+
+
+def empreinte_fichier(chemin, empreinte=None):
+    """Empreinte BLAKE2b du contenu d'un fichier"""
+    empreinte = empreinte or hashlib.blake2b(digest_size=20)
+    with open(chemin, 'rb') as f:
+        while True:
+            bloc = f.read(TAILLE_BLOC_HASH)
+            if not bloc:
+                break
+            empreinte.update(bloc)
+    return empreinte
+
+
+# Type de colonne de chaque attribut numérique des enregistrements de flux
+# (les autres, comme les esquisses d'intervalles, sont conservés en liste)
+TYPES_COLONNES = {
+    'premier_ts': 'd', 'dernier_ts': 'd', 'paquets': 'q', 'bytes': 'q',
+    'paquets_haut': 'q', 'bytes_haut': 'q', 'initiateur_bas': 'b', 'etat': 'l',
+    'iat_n': 'q', 'iat_moyenne': 'd', 'iat_m2': 'd',
+}
+
+
+def _attributs(classe):
+    """Attributs (__slots__) d'une classe d'enregistrement de flux, classes parentes comprises"""
+    return [nom for base in reversed(classe.__mro__) for nom in base.__dict__.get('__slots__', ())]
+
+
+def conversations_vers_colonnes(conversations):
+    """Sérialise les flux en colonnes compactes (horodatage absent: NaN)"""
+    stats = list(conversations.values())
+    iat = bool(stats) and isinstance(stats[0], StatsConversationIAT)
+    nan = float('nan')
+    colonnes = {'cles': list(conversations), 'iat': iat}
+    for nom in _attributs(StatsConversationIAT if iat else StatsConversation):
+        valeurs = (getattr(s, nom) for s in stats)
+        if nom in ('premier_ts', 'dernier_ts'):
+            valeurs = (nan if valeur is None else valeur for valeur in valeurs)
+        colonnes[nom] = array(TYPES_COLONNES[nom], valeurs) if nom in TYPES_COLONNES else list(valeurs)
+    return colonnes
+
+
+def colonnes_vers_conversations(colonnes):
+    """Reconstruit les flux à partir de leurs colonnes"""
+    classe = StatsConversationIAT if colonnes['iat'] else StatsConversation
+    attributs = _attributs(classe)
+    conversations = {}
+    for i, cle in enumerate(colonnes['cles']):
+        stats = classe()
+        for nom in attributs:
+            setattr(stats, nom, colonnes[nom][i])
+        if stats.premier_ts != stats.premier_ts:
+            stats.premier_ts = stats.dernier_ts = None
+        stats.initiateur_bas = bool(stats.initiateur_bas)
+        conversations[cle] = stats
+    return conversations
+
+
+def parametres_resultat(analyseur):
+    """
+    Paramètres d'un analyseur dont dépend l'état produit par analyser()
+    Les seuils des flux persistants et du beaconing en font partie: les flux
+    expirés sont évalués pendant analyser().
+    """
+    parametres = analyseur.parametres()
+    parametres['backend'] = choisir_backend(analyseur.fichier_pcap, analyseur.backend)
+    for nom in ('chronometrer', 'pipeline'):
+        parametres.pop(nom, None)  # Sans effet sur le résultat
+    parametres['seuils_flux'] = (SEUIL_PAQUETS_PERSISTANT, SEUIL_DUREE_PERSISTANT,
+                                 MIN_INTERVALLES_BEACONING, SEUIL_DISPERSION_BEACONING,
+                                 SEUIL_CV_BEACONING)
+    return parametres
+
+
+def ecrire_atomique(chemin, objet):
+    """Écrit un objet sérialisé (pickle compressé gzip) en remplaçant atomiquement le fichier"""
+    dossier = os.path.dirname(chemin) or '.'
+    os.makedirs(dossier, exist_ok=True)
+    descripteur, temporaire = tempfile.mkstemp(dir=dossier, suffix='.tmp')
+    try:
+        with os.fdopen(descripteur, 'wb') as brut, \
+             gzip.GzipFile(fileobj=brut, mode='wb', compresslevel=3) as f:
+            pickle.dump(objet, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temporaire, chemin)
+    except BaseException:
+        try:
+            os.remove(temporaire)
+        except FileNotFoundError:
+            pass
+        raise
+
+
+class CacheAnalyse:
+    """
+    Cache sur disque des états d'analyse, avec éviction LRU par taille
+
+    La clé combine l'empreinte du contenu de la capture, la version du
+    décodeur et les paramètres qui influencent analyser() (backend, plage
+    temporelle, listes de domaines, délais d'expiration des flux...). Les
+    seuils des flux persistants et du beaconing en font partie: les flux
+    expirés sont évalués pendant analyser().
+    """
+
+    def __init__(self, dossier=None, taille_max=TAILLE_MAX_DEFAUT):
+        self.dossier = dossier or dossier_cache_defaut()
+        self.taille_max = taille_max
+
+    def cle(self, analyseur):
+        """Calcule la clé de cache d'un analyseur"""
+        empreinte = hashlib.blake2b(digest_size=20)
+        parametres = parametres_resultat(analyseur)
+        empreinte.update(repr((VERSION_CACHE, VERSION_DECODEUR, sorted(parametres.items()))).encode())
+        for liste in parametres.get('listes_domaines', ()) + parametres.get('listes_mots', ()):
+            empreinte_fichier(liste, empreinte)
+        empreinte_fichier(analyseur.fichier_pcap, empreinte)
+        return empreinte.hexdigest()
+
+    def _chemin(self, cle):
+        return os.path.join(self.dossier, cle + EXTENSION)
+
+    def charger(self, analyseur, cle=None):
+        """
+        Restaure l'état d'analyse depuis le cache
+
+        Returns:
+            True si l'état a été trouvé et fusionné dans l'analyseur
+        """
+        chemin = self._chemin(cle or self.cle(analyseur))
+        try:
+            with gzip.open(chemin, 'rb') as f:
+                etat = pickle.load(f)
+            os.utime(chemin)  # Marque l'entrée comme récemment utilisée
+        except FileNotFoundError:
+            return False
+        except (OSError, EOFError, pickle.UnpicklingError, ValueError, KeyError):
+            self._supprimer(chemin)
+            return False
+        etat['conversations'] = colonnes_vers_conversations(etat['conversations'])
+        analyseur.fusionner(etat)
+        return True
+
+    def enregistrer(self, analyseur, cle=None):
+        """Écrit l'état d'analyse dans le cache puis applique l'éviction LRU"""
+        cle = cle or self.cle(analyseur)
+        etat = analyseur.etat_partiel()
+        etat['conversations'] = conversations_vers_colonnes(etat['conversations'])
+        etat.pop('compteurs_detecteurs', None)  # Propres à l'exécution qui a rempli le cache
+        ecrire_atomique(self._chemin(cle), etat)
+        self.evincer()
+
+    def evincer(self):
+        """Supprime les entrées les moins récemment utilisées au-delà de la taille maximale"""
+        entrees = []
+        for nom in os.listdir(self.dossier):
+            if not nom.endswith(EXTENSION):
+                continue
+            chemin = os.path.join(self.dossier, nom)
+            try:
+                stat = os.stat(chemin)
+            except FileNotFoundError:
+                continue  # Évincée par un autre processus
+            entrees.append((stat.st_mtime, stat.st_size, chemin))
+
+        total = sum(taille for _, taille, _ in entrees)
+        for _, taille, chemin in sorted(entrees):
+            if total <= self.taille_max:
+                break
+            self._supprimer(chemin)
+            total -= taille
+
+    @staticmethod
+    def _supprimer(chemin):
+        try:
+            os.remove(chemin)
+        except FileNotFoundError:
+            pass
+
+
+def analyser_avec_cache(analyseur, cache, analyse=None):
+    """
+    Restaure l'état d'analyse depuis le cache, ou exécute l'analyse puis l'y enregistre
+
+    Args:
+        analyseur: Instance de AnalyseurTraficSuspect
+        cache: Instance de CacheAnalyse
+        analyse: Fonction d'analyse à exécuter en cas d'absence (défaut: analyseur.analyser)
+
+    Returns:
+        True si l'état provient du cache
+    """
+    try:
+        cle = cache.cle(analyseur)
+    except OSError:
+        cle = None  # Capture ou liste illisible: l'analyse signalera l'erreur
+    if cle is not None and cache.charger(analyseur, cle):
+        return True
+    (analyse or analyseur.analyser)()
+    if cle is not None:
+        try:
+            cache.enregistrer(analyseur, cle)
+        except OSError as e:
+            print(f"[!] Impossible d'écrire le cache: {e}")
+    return False
@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+"""
+Module de décompression des captures archivées
+Reconnaît les captures compressées (gzip, zstd, lz4) à leurs nombres magiques
+et les décompresse à la volée par grands blocs, sans fichier intermédiaire.
+Les fichiers zstd à plusieurs trames (format seekable, zstd -B, pzstd)
+peuvent être repris à la trame contenant un offset décompressé.
+"""
+
+import bisect
+import io
+import os
+import struct
+import zlib
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import lz4.frame as lz4_frame
+except ImportError:
+    lz4_frame = None
+
+MAGIC_GZIP = b'\x1f\x8b'
+MAGIC_ZSTD = b'\x28\xb5\x2f\xfd'
+MAGIC_LZ4 = b'\x04\x22\x4d\x18'
+
+# Extensions des captures compressées (mode --batch)
+EXTENSIONS_COMPRESSION = ('.gz', '.zst', '.lz4')
+
+# Octets compressés lus par appel, et tampon des données décompressées
+TAILLE_LECTURE = 1 << 20
+TAILLE_TAMPON = 4 << 20
+
+# Trames zstd: trames ignorables (0x184D2A50 à 0x184D2A5F) et table de saut du format seekable
+_MAGIC_TRAME_ZSTD = 0xfd2fb528
+_MAGIC_IGNORABLE_MIN = 0x184d2a50
+_MAGIC_IGNORABLE_MAX = 0x184d2a5f
+_MAGIC_TABLE_SAUT = 0x184d2a5e
+_MAGIC_PIED_TABLE = 0x8f92eab1
+_PIED_TABLE = struct.Struct('<IBI')
+
+
+class ErreurDecompression(ValueError):
+    """Levée lorsque les données compressées sont corrompues"""
+
+
+def detecter_compression(entete):
+    """
+    Identifie la compression d'un fichier à partir de ses premiers octets
+
+    Returns:
+        'gzip', 'zstd', 'lz4' ou None si le fichier n'est pas compressé
+    """
+    if entete[:2] == MAGIC_GZIP:
+        return 'gzip'
+    if entete[:4] == MAGIC_ZSTD:
+        return 'zstd'
+    if entete[:4] == MAGIC_LZ4:
+        return 'lz4'
+    return None
+
+
+def compression_fichier(fichier):
+    """Retourne la compression du fichier ('gzip', 'zstd', 'lz4' ou None)"""
+    with open(fichier, 'rb') as f:
+        return detecter_compression(f.read(4))
+
+
+def _decompresseur(compression):
+    """Nouveau décompresseur d'une trame (attributs eof et unused_data)"""
+    if compression == 'gzip':
+        return zlib.decompressobj(16 + zlib.MAX_WBITS)
+    if compression == 'zstd':
+        if zstandard is None:
+            raise RuntimeError("zstandard n'est pas installé (pip install zstandard)")
+        return zstandard.ZstdDecompressor().decompressobj()
+    if compression == 'lz4':
+        if lz4_frame is None:
+            raise RuntimeError("lz4 n'est pas installé (pip install lz4)")
+        return lz4_frame.LZ4FrameDecompressor()
+    raise ValueError(f"compression inconnue: {compression}")
+
+
+class FluxDecompresse(io.RawIOBase):
+    """
+    Flux des données décompressées d'un fichier, à partir d'un offset compressé
+    (début d'une trame). Les trames ou membres concaténés sont lus à la suite;
+    une dernière trame incomplète (fichier en cours d'écriture) termine le flux.
+    """
+
+    def __init__(self, fichier, compression, offset=0):
+        self.compression = compression
+        self._decompresseur = _decompresseur(compression)
+        self._brut = open(fichier, 'rb', buffering=0)
+        self._brut.seek(offset)
+        self._donnees = b''
+        self._curseur = 0
+
+    def readable(self):
+        return True
+
+    def readinto(self, tampon):
+        while self._curseur >= len(self._donnees):
+            if not self._remplir():
+                return 0
+        n = min(len(tampon), len(self._donnees) - self._curseur)
+        tampon[:n] = memoryview(self._donnees)[self._curseur:self._curseur + n]
+        self._curseur += n
+        return n
+
+    def _remplir(self):
+        """Décompresse le bloc suivant; False en fin de fichier"""
+        decompresseur = self._decompresseur
+        if decompresseur.eof:
+            entree = decompresseur.unused_data
+            decompresseur = self._decompresseur = _decompresseur(self.compression)
+        else:
+            entree = b''
+        if not entree:
+            entree = self._brut.read(TAILLE_LECTURE)
+            if not entree:
+                return False
+        try:
+            self._donnees = decompresseur.decompress(entree)
+        except Exception as e:  # zlib.error, zstandard.ZstdError, RuntimeError (lz4)
+            raise ErreurDecompression(f"Données {self.compression} invalides: {e}") from e
+        self._curseur = 0
+        return True
+
+    def close(self):
+        self._brut.close()
+        super().close()
+
+
+def ouvrir_decompresse(fichier, compression=None, offset=0):
+    """Flux binaire tamponné des données décompressées (lecture par f.read(n))"""
+    compression = compression or compression_fichier(fichier)
+    return io.BufferedReader(FluxDecompresse(fichier, compression, offset), TAILLE_TAMPON)
+
+
+def trames_zstd(fichier):
+    """
+    Trames d'un fichier zstd: liste (offset compressé, offset décompressé) de leurs débuts
+
+    La table de saut du format seekable est utilisée si elle est présente;
+    sinon les en-têtes de trames et de blocs sont parcourus sans décompresser.
+
+    Returns:
+        Liste des trames, ou None si la taille décompressée d'une trame est inconnue
+    """
+    with open(fichier, 'rb') as f:
+        taille = os.fstat(f.fileno()).st_size
+        trames = _lire_table_saut(f, taille)
+        if trames is None:
+            trames = _parcourir_trames(f, taille)
+    return trames
+
+
+def _lire_table_saut(f, taille):
+    """Table de saut du format seekable (trame ignorable finale), ou None"""
+    if taille < 8 + _PIED_TABLE.size:
+        return None
+    f.seek(taille - _PIED_TABLE.size)
+    nombre, descripteur, magic = _PIED_TABLE.unpack(f.read(_PIED_TABLE.size))
+    largeur = 12 if descripteur & 0x80 else 8
+    debut = taille - _PIED_TABLE.size - nombre * largeur - 8
+    if magic != _MAGIC_PIED_TABLE or debut < 0:
+        return None
+    f.seek(debut)
+    magic_trame, taille_trame = struct.unpack('<II', f.read(8))
+    if magic_trame != _MAGIC_TABLE_SAUT or taille_trame != nombre * largeur + _PIED_TABLE.size:
+        return None
+    entrees = f.read(nombre * largeur)
+    trames = []
+    compresse = decompresse = 0
+    for i in range(nombre):
+        taille_compressee, taille_decompressee = struct.unpack_from('<II', entrees, i * largeur)
+        trames.append((compresse, decompresse))
+        compresse += taille_compressee
+        decompresse += taille_decompressee
+    return trames
+
+
+def _parcourir_trames(f, taille):
+    """Débuts des trames d'après leurs en-têtes (Frame_Content_Size requis), ou None"""
+    trames = []
+    position = decompresse = 0
+    while position + 8 <= taille:
+        f.seek(position)
+        entete = f.read(18)
+        magic = struct.unpack_from('<I', entete)[0]
+        if _MAGIC_IGNORABLE_MIN <= magic <= _MAGIC_IGNORABLE_MAX:
+            position += 8 + struct.unpack_from('<I', entete, 4)[0]
+            continue
+        if magic != _MAGIC_TRAME_ZSTD:
+            return None
+        descripteur = entete[4]
+        segment_unique = descripteur >> 5 & 1
+        octets_taille = (segment_unique, 2, 4, 8)[descripteur >> 6]
+        if not octets_taille:
+            return None  # Taille décompressée absente de l'en-tête
+        debut_taille = 5 + (1 - segment_unique) + (0, 1, 2, 4)[descripteur & 3]
+        contenu = int.from_bytes(entete[debut_taille:debut_taille + octets_taille], 'little')
+        if octets_taille == 2:
+            contenu += 256
+        trames.append((position, decompresse))
+        decompresse += contenu
+
+        # Blocs: en-tête de 3 octets (dernier bloc, type, taille)
+        position += debut_taille + octets_taille
+        while True:
+            f.seek(position)
+            brut = f.read(3)
+            if len(brut) < 3:
+                return trames  # Dernière trame incomplète
+            bloc = int.from_bytes(brut, 'little')
+            position += 3 + (1 if (bloc >> 1) & 3 == 1 else bloc >> 3)
+            if bloc & 1:
+                break
+        if descripteur & 0x04:
+            position += 4  # Somme de contrôle du contenu
+    return trames
+
+
+def trame_pour_offset(trames, offset):
+    """Trame (offset compressé, offset décompressé) contenant un offset décompressé"""
+    return trames[bisect.bisect_right([debut for _, debut in trames], offset) - 1]
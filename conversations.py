@@ -0,0 +1,356 @@
+#!/usr/bin/env python3
+"""
+Module de suivi compact des flux IP
+Chaque flux est un enregistrement à taille fixe (__slots__) indexé par une clé
+entière canonique regroupant le protocole et les deux extrémités
+(adresse, port): les deux sens d'une connexion partagent le même enregistrement
+"""
+
+import ipaddress
+import math
+import socket
+
+# Les adresses IPv6 sont marquées par ce bit pour les distinguer des IPv4
+DRAPEAU_IPV6 = 1 << 128
+BITS_ADRESSE = 129
+MASQUE_ADRESSE = (1 << BITS_ADRESSE) - 1
+
+
+def adresse_depuis_octets(brut):
+    """Convertit une adresse binaire (4 ou 16 octets) en entier"""
+    valeur = int.from_bytes(brut, 'big')
+    return valeur if len(brut) == 4 else valeur | DRAPEAU_IPV6
+
+
+def adresse_depuis_texte(texte):
+    """Convertit une adresse textuelle (IPv4 ou IPv6) en entier"""
+    adresse = ipaddress.ip_address(texte)
+    return int(adresse) if adresse.version == 4 else int(adresse) | DRAPEAU_IPV6
+
+
+def adresses_couche(couche_ip):
+    """
+    Retourne les adresses source et destination d'une couche IP sous forme d'entiers
+    Les couches du décodeur natif fournissent directement les octets bruts.
+    """
+    src_brut = getattr(couche_ip, 'src_brut', None)
+    if src_brut is not None:
+        return adresse_depuis_octets(src_brut), adresse_depuis_octets(couche_ip.dst_brut)
+    return adresse_depuis_texte(couche_ip.src), adresse_depuis_texte(couche_ip.dst)
+
+
+def formater_adresse(entier):
+    """Convertit une adresse entière en texte"""
+    if entier & DRAPEAU_IPV6:
+        return socket.inet_ntop(socket.AF_INET6, (entier ^ DRAPEAU_IPV6).to_bytes(16, 'big'))
+    return socket.inet_ntop(socket.AF_INET, entier.to_bytes(4, 'big'))
+
+
+# Extrémité d'un flux: adresse suivie du port sur 16 bits
+BITS_PORT = 16
+BITS_EXTREMITE = BITS_ADRESSE + BITS_PORT
+MASQUE_EXTREMITE = (1 << BITS_EXTREMITE) - 1
+MASQUE_PORT = (1 << BITS_PORT) - 1
+
+NOMS_PROTOCOLES = {6: 'TCP', 17: 'UDP'}
+
+# Protocole sur 8 bits au-dessus des deux extrémités; au-delà, l'indice de la
+# capture d'origine dans la synthèse d'un lot (voir cle_capture)
+BITS_PROTOCOLE = 8
+MASQUE_PROTOCOLE = (1 << BITS_PROTOCOLE) - 1
+BITS_CLE = 2 * BITS_EXTREMITE + BITS_PROTOCOLE
+
+# Drapeaux TCP
+TCP_FIN = 0x01
+TCP_SYN = 0x02
+TCP_RST = 0x04
+TCP_ACK = 0x10
+
+# État TCP d'un flux, relatif aux extrémités basse et haute de la clé (indépendant
+# du sens du premier paquet: deux portions d'un même flux se combinent par OU)
+SYN_BAS = 0x001
+SYN_HAUT = 0x002
+SYN_ACK_BAS = 0x004
+SYN_ACK_HAUT = 0x008
+FIN_BAS = 0x010
+FIN_HAUT = 0x020
+RST = 0x040
+ETABLI = 0x080      # Au moins un paquet autre qu'un SYN seul
+DEBUT_SYN = 0x100   # Le premier paquet de l'enregistrement est un SYN seul
+
+
+def cle_flux(proto, src, sport, dst, dport):
+    """
+    Clé canonique bidirectionnelle d'un flux (5-tuple)
+
+    Les deux sens d'une connexion partagent la même clé: les extrémités
+    (adresse, port) sont ordonnées. Retourne (clé, bas) où `bas` indique que
+    l'émetteur (src, sport) est l'extrémité basse.
+    """
+    a = (src << BITS_PORT) | sport
+    b = (dst << BITS_PORT) | dport
+    if a <= b:
+        return (((proto << BITS_EXTREMITE) | a) << BITS_EXTREMITE) | b, True
+    return (((proto << BITS_EXTREMITE) | b) << BITS_EXTREMITE) | a, False
+
+
+def extremites_flux(cle):
+    """Retourne (proto, (adresse, port) basse, (adresse, port) haute) d'une clé de flux"""
+    haute = cle & MASQUE_EXTREMITE
+    cle >>= BITS_EXTREMITE
+    basse = cle & MASQUE_EXTREMITE
+    return ((cle >> BITS_EXTREMITE) & MASQUE_PROTOCOLE, (basse >> BITS_PORT, basse & MASQUE_PORT),
+            (haute >> BITS_PORT, haute & MASQUE_PORT))
+
+
+def cle_capture(cle, capture):
+    """
+    Clé d'un flux distinguée par l'indice de sa capture: le même 5-tuple vu
+    dans deux captures d'un lot reste deux flux dans la synthèse
+    """
+    return cle | (capture << BITS_CLE)
+
+
+def adresses_flux(cle, initiateur_bas=True):
+    """Retourne (proto, src, sport, dst, dport) dans le sens initiateur -> répondeur"""
+    proto, basse, haute = extremites_flux(cle)
+    (src, sport), (dst, dport) = (basse, haute) if initiateur_bas else (haute, basse)
+    return proto, src, sport, dst, dport
+
+
+def _formater_extremite(adresse, port, proto):
+    texte = formater_adresse(adresse)
+    if proto not in NOMS_PROTOCOLES:
+        return texte
+    return f"[{texte}]:{port}" if adresse & DRAPEAU_IPV6 else f"{texte}:{port}"
+
+
+def formater_flux(cle, initiateur_bas=True):
+    """Texte 'src:port → dst:port (TCP)' d'un flux, produit uniquement pour l'affichage"""
+    proto, src, sport, dst, dport = adresses_flux(cle, initiateur_bas)
+    texte = f"{_formater_extremite(src, sport, proto)} → {_formater_extremite(dst, dport, proto)}"
+    return f"{texte} ({NOMS_PROTOCOLES[proto]})" if proto in NOMS_PROTOCOLES else texte
+
+
+def formater_conversation(cle):
+    """Texte 'a:port ↔ b:port (TCP)' d'un flux dans son orientation canonique"""
+    proto, (basse, port_bas), (haute, port_haut) = extremites_flux(cle)
+    texte = (f"{_formater_extremite(basse, port_bas, proto)} ↔ "
+             f"{_formater_extremite(haute, port_haut, proto)}")
+    return f"{texte} ({NOMS_PROTOCOLES[proto]})" if proto in NOMS_PROTOCOLES else texte
+
+
+def etat_tcp(drapeaux, haut, premier):
+    """Bits d'état (SYN_BAS...) apportés par un segment TCP émis par l'extrémité basse ou haute"""
+    syn_seul = drapeaux & (TCP_SYN | TCP_ACK) == TCP_SYN
+    if syn_seul:
+        bits = SYN_HAUT if haut else SYN_BAS
+        if premier:
+            bits |= DEBUT_SYN
+    else:
+        bits = ETABLI
+        if drapeaux & TCP_SYN:
+            bits |= SYN_ACK_HAUT if haut else SYN_ACK_BAS
+    if drapeaux & TCP_FIN:
+        bits |= FIN_HAUT if haut else FIN_BAS
+    if drapeaux & TCP_RST:
+        bits |= RST
+    return bits
+
+
+def decrire_etat_tcp(etat):
+    """Libellé de l'état TCP d'un flux ('' pour un flux sans segment TCP)"""
+    if etat & RST:
+        return 'réinitialisé'
+    if etat & FIN_BAS and etat & FIN_HAUT:
+        return 'fermé'
+    if etat & (FIN_BAS | FIN_HAUT):
+        return 'fermeture'
+    if etat & (SYN_ACK_BAS | SYN_ACK_HAUT | ETABLI):
+        return 'établi'
+    if etat & (SYN_BAS | SYN_HAUT):
+        return 'SYN'
+    return ''
+
+
+class StatsConversation:
+    """
+    Statistiques d'un flux bidirectionnel (5-tuple): premier et dernier
+    horodatage, paquets et octets (total et émis par l'extrémité haute de la
+    clé), sens de l'initiateur et état TCP. Mémoire constante quel que soit
+    le nombre de paquets.
+    """
+    __slots__ = ('premier_ts', 'dernier_ts', 'paquets', 'bytes', 'paquets_haut', 'bytes_haut',
+                 'initiateur_bas', 'etat')
+
+    def __init__(self):
+        self.premier_ts = None
+        self.dernier_ts = None
+        self.paquets = 0
+        self.bytes = 0
+        self.paquets_haut = 0
+        self.bytes_haut = 0
+        self.initiateur_bas = True
+        self.etat = 0
+
+    def ajouter(self, timestamp, taille, haut=False, drapeaux=None):
+        """
+        Prend en compte un paquet (timestamp ou taille peuvent être None)
+
+        Args:
+            haut: Paquet émis par l'extrémité haute de la clé
+            drapeaux: Drapeaux TCP du segment (None hors TCP)
+        """
+        self.paquets += 1
+        if taille:
+            self.bytes += taille
+        if haut:
+            self.paquets_haut += 1
+            if taille:
+                self.bytes_haut += taille
+        if drapeaux is not None:
+            self.etat |= etat_tcp(drapeaux, haut, self.paquets == 1)
+        if timestamp is not None:
+            if self.premier_ts is None:
+                self.premier_ts = timestamp
+            self.dernier_ts = timestamp
+
+    @property
+    def duree(self):
+        """Durée entre le premier et le dernier paquet horodaté"""
+        if self.premier_ts is None:
+            return 0
+        return self.dernier_ts - self.premier_ts
+
+    @property
+    def paquets_retour(self):
+        """Paquets émis par le répondeur"""
+        return self.paquets_haut if self.initiateur_bas else self.paquets - self.paquets_haut
+
+    @property
+    def bytes_retour(self):
+        """Octets émis par le répondeur"""
+        return self.bytes_haut if self.initiateur_bas else self.bytes - self.bytes_haut
+
+    @property
+    def etablie(self):
+        """Au moins un segment TCP autre qu'un SYN seul a été vu"""
+        return bool(self.etat & ETABLI)
+
+    @property
+    def ferme(self):
+        """Connexion TCP terminée (FIN des deux côtés, ou RST)"""
+        return bool(self.etat & RST) or (self.etat & (FIN_BAS | FIN_HAUT)) == FIN_BAS | FIN_HAUT
+
+    def fusionner(self, suivante):
+        """
+        Ajoute les statistiques d'une portion postérieure du même flux
+        (analysée dans un autre shard); le sens de l'initiateur est conservé
+        """
+        self.paquets += suivante.paquets
+        self.bytes += suivante.bytes
+        self.paquets_haut += suivante.paquets_haut
+        self.bytes_haut += suivante.bytes_haut
+        self.etat |= suivante.etat & ~DEBUT_SYN
+        if suivante.premier_ts is not None:
+            if self.premier_ts is None:
+                self.premier_ts = suivante.premier_ts
+            self.dernier_ts = suivante.dernier_ts
+
+
+# Intervalles entre salves (détection du beaconing): les écarts plus courts
+# séparent les paquets d'une même salve (requête, réponse...) et sont ignorés
+ECART_SALVE = 1.0
+
+# Esquisse de quantiles des intervalles: classes logarithmiques de 1/8 d'octave
+# à partir d'ECART_SALVE (erreur relative inférieure à 4.5 %); la dernière
+# classe regroupe les intervalles de plus de 2^17 secondes
+CLASSES_PAR_OCTAVE = 8
+NB_CLASSES_IAT = 17 * CLASSES_PAR_OCTAVE
+VALEURS_CLASSES_IAT = tuple(ECART_SALVE * 2 ** ((classe + 0.5) / CLASSES_PAR_OCTAVE)
+                            for classe in range(NB_CLASSES_IAT))
+
+
+def classe_iat(iat):
+    """Classe de l'esquisse d'un intervalle supérieur à ECART_SALVE"""
+    return min(int(math.log2(iat / ECART_SALVE) * CLASSES_PAR_OCTAVE), NB_CLASSES_IAT - 1)
+
+
+def quantile_classes(classes, effectif, q):
+    """
+    Quantile q (rang le plus proche) d'une esquisse classe -> effectif totalisant
+    `effectif` intervalles, représenté par le centre géométrique de sa classe
+    """
+    rang = max(1, math.ceil(q * effectif))
+    cumul = 0
+    for classe in sorted(classes):
+        cumul += classes[classe]
+        if cumul >= rang:
+            return VALEURS_CLASSES_IAT[classe]
+    return None
+
+
+class StatsConversationIAT(StatsConversation):
+    """
+    Statistiques de flux complétées par les intervalles entre salves de
+    paquets (écarts supérieurs à ECART_SALVE): moyenne et variance calculées
+    en flux par l'algorithme de Welford, et esquisse de quantiles à classes
+    logarithmiques (au plus NB_CLASSES_IAT compteurs). Mémoire constante,
+    fusion exacte de l'esquisse entre shards.
+    """
+    __slots__ = ('iat_n', 'iat_moyenne', 'iat_m2', 'iat_classes')
+
+    def __init__(self):
+        super().__init__()
+        self.iat_n = 0
+        self.iat_moyenne = 0.0
+        self.iat_m2 = 0.0
+        self.iat_classes = None  # Classe -> effectif, créé au premier intervalle
+
+    def ajouter(self, timestamp, taille, haut=False, drapeaux=None):
+        if timestamp is not None and self.dernier_ts is not None \
+                and timestamp - self.dernier_ts > ECART_SALVE:
+            self._ajouter_iat(timestamp - self.dernier_ts)
+        super().ajouter(timestamp, taille, haut, drapeaux)
+
+    def _ajouter_iat(self, iat):
+        self.iat_n += 1
+        delta = iat - self.iat_moyenne
+        self.iat_moyenne += delta / self.iat_n
+        self.iat_m2 += delta * (iat - self.iat_moyenne)
+        if self.iat_classes is None:
+            self.iat_classes = {}
+        classe = classe_iat(iat)
+        self.iat_classes[classe] = self.iat_classes.get(classe, 0) + 1
+
+    def quantile_iat(self, q):
+        """Quantile approché des intervalles entre salves (None sans intervalle)"""
+        if not self.iat_n:
+            return None
+        return quantile_classes(self.iat_classes, self.iat_n, q)
+
+    @property
+    def iat_variance(self):
+        """Variance des intervalles entre salves"""
+        return self.iat_m2 / self.iat_n if self.iat_n > 1 else 0.0
+
+    def fusionner(self, suivante):
+        # L'écart entre les deux portions est lui-même un intervalle entre salves
+        ecart = None
+        if self.dernier_ts is not None and suivante.premier_ts is not None:
+            ecart = suivante.premier_ts - self.dernier_ts
+
+        # Combinaison de Chan et al. des deux accumulateurs de Welford
+        n = self.iat_n + suivante.iat_n
+        if suivante.iat_n:
+            delta = suivante.iat_moyenne - self.iat_moyenne
+            self.iat_m2 += suivante.iat_m2 + delta * delta * self.iat_n * suivante.iat_n / n
+            self.iat_moyenne += delta * suivante.iat_n / n
+            self.iat_n = n
+            if self.iat_classes is None:
+                self.iat_classes = {}
+            for classe, effectif in suivante.iat_classes.items():
+                self.iat_classes[classe] = self.iat_classes.get(classe, 0) + effectif
+        if ecart is not None and ecart > ECART_SALVE:
+            self._ajouter_iat(ecart)
+        super().fusionner(suivante)
@@ -0,0 +1,359 @@
+#!/usr/bin/env python3
+"""
+Module de décodage natif des trames
+Décodeur minimal Ethernet/IPv4/IPv6/TCP/UDP/DNS exposant les mêmes
+attributs que les paquets pyshark utilisés par l'analyseur
+"""
+
+import socket
+import struct
+from lecteur_pcap import IndexCapture, ouvrir_lecteur
+
+# À incrémenter à chaque changement du résultat du décodage (invalide le cache d'analyse)
+VERSION_DECODEUR = 1
+
+# Types de liens (LINKTYPE_*) pris en charge
+LINKTYPE_NULL = 0
+LINKTYPE_ETHERNET = 1
+LINKTYPE_RAW = 101
+LINKTYPE_LINUX_SLL = 113
+LINKTYPE_IPV4 = 228
+LINKTYPE_IPV6 = 229
+LINKTYPE_LINUX_SLL2 = 276
+LINKTYPES_RAW = (LINKTYPE_RAW, 12, 14, LINKTYPE_IPV4, LINKTYPE_IPV6)
+
+ETHERTYPE_IPV4 = 0x0800
+ETHERTYPE_IPV6 = 0x86dd
+ETHERTYPE_ARP = 0x0806
+ETHERTYPES_VLAN = (0x8100, 0x88a8, 0x9100)
+
+PROTO_ICMP = 1
+PROTO_TCP = 6
+PROTO_UDP = 17
+PROTO_ICMPV6 = 58
+
+# En-têtes d'extension IPv6 à sauter pour atteindre la couche transport
+EXTENSIONS_IPV6 = (0, 43, 60)
+
+# Noms de couches approximant le champ highest_layer de tshark
+PROTOCOLES_UDP = {53: 'DNS', 67: 'DHCP', 68: 'DHCP', 123: 'NTP', 137: 'NBNS',
+                  443: 'QUIC', 1900: 'SSDP', 5353: 'MDNS', 5355: 'LLMNR'}
+PROTOCOLES_TCP = {53: 'DNS', 80: 'HTTP', 443: 'TLS', 8443: 'TLS'}
+
+_ENTETE_IPV4 = struct.Struct('!BBHHHBBH4s4s')
+_ENTETE_IPV6 = struct.Struct('!IHBB16s16s')
+_PORTS = struct.Struct('!HH')
+_ENTETE_DNS = struct.Struct('!HHHHHH')
+
+
+class CoucheIP:
+    """Couche IP (v4 ou v6), adresses formatées à la demande"""
+    __slots__ = ('src_brut', 'dst_brut', 'proto')
+
+    def __init__(self, src_brut, dst_brut, proto):
+        self.src_brut = src_brut
+        self.dst_brut = dst_brut
+        self.proto = proto
+
+    @property
+    def src(self):
+        return _formater_ip(self.src_brut)
+
+    @property
+    def dst(self):
+        return _formater_ip(self.dst_brut)
+
+
+class CouchePorts:
+    """Couche TCP ou UDP"""
+    __slots__ = ('srcport', 'dstport', 'flags')
+
+    def __init__(self, srcport, dstport, flags=0):
+        self.srcport = srcport
+        self.dstport = dstport
+        self.flags = flags
+
+
+class CoucheDNS:
+    """Couche DNS réduite à la première question"""
+    __slots__ = ('qry_name',)
+
+    def __init__(self, qry_name):
+        self.qry_name = qry_name
+
+
+class PaquetNatif:
+    """
+    Paquet décodé nativement
+    Seules les couches présentes sont renseignées, hasattr() se comporte
+    donc comme sur un paquet pyshark
+    """
+    __slots__ = ('sniff_timestamp', 'length', 'highest_layer', 'ip', 'ipv6', 'tcp', 'udp', 'dns')
+
+    def __init__(self, timestamp, longueur):
+        self.sniff_timestamp = timestamp
+        self.length = longueur
+
+
+class CaptureNative:
+    """
+    Équivalent natif de pyshark.FileCapture (itération puis close())
+
+    Les fichiers sont projetés en mémoire: les décodeurs travaillent directement
+    sur des tranches memoryview, sans copie des trames. Les captures compressées
+    (gzip, zstd, lz4) sont décompressées à la volée.
+    """
+
+    def __init__(self, fichier_pcap, plage=None, segments=None, prefiltre=None):
+        self.fichier_pcap = fichier_pcap
+        self.plage = plage
+        self.segments = segments
+        self.prefiltre = prefiltre
+        # Paquets écartés par le pré-filtre (non transmis à l'analyseur)
+        self.rejetes = 0
+        # Offset suivant le dernier enregistrement complet, une fois la lecture terminée
+        self.position_fin = None
+        self._lecteur = None
+
+    def __iter__(self):
+        self._lecteur = ouvrir_lecteur(self.fichier_pcap)
+        index = None
+        if self.plage is not None and self.segments is None:
+            index = IndexCapture.obtenir(self._lecteur)
+        enregistrements = self._lecteur.enregistrements(self.plage, index, self.segments)
+        prefiltre = self.prefiltre
+        for timestamp, linktype, donnees, longueur in enregistrements:
+            paquet = decoder_trame(linktype, donnees, timestamp, longueur, prefiltre)
+            if paquet is None:
+                self.rejetes += 1
+                continue
+            yield paquet
+        self.position_fin = self._lecteur.position_fin
+
+    def close(self):
+        if self._lecteur is not None:
+            self._lecteur.close()
+            self._lecteur = None
+
+
+def _formater_ip(brut):
+    """Convertit une adresse binaire (4 ou 16 octets) en texte"""
+    if len(brut) == 4:
+        return socket.inet_ntop(socket.AF_INET, brut)
+    return socket.inet_ntop(socket.AF_INET6, brut)
+
+
+def decoder_trame(linktype, donnees, timestamp, longueur, prefiltre=None):
+    """
+    Décode une trame brute en PaquetNatif
+
+    Args:
+        linktype: Type de lien de l'interface de capture
+        donnees: Octets capturés
+        timestamp: Horodatage en secondes
+        longueur: Longueur originale de la trame sur le fil
+        prefiltre: Prefiltre des détecteurs actifs (None = tout décoder)
+
+    Returns:
+        PaquetNatif, ou None si le pré-filtre rejette la trame
+    """
+    if prefiltre is not None and prefiltre.toutes_trames:
+        prefiltre = None  # La couche la plus haute de chaque trame est requise
+    paquet = PaquetNatif(timestamp, longueur)
+    ethertype, position = _decoder_liaison(linktype, donnees)
+
+    if ethertype == ETHERTYPE_IPV4:
+        retenu = _decoder_ipv4(paquet, donnees, position, prefiltre)
+    elif ethertype == ETHERTYPE_IPV6:
+        retenu = _decoder_ipv6(paquet, donnees, position, prefiltre)
+    elif prefiltre is not None:
+        retenu = False
+    elif ethertype == ETHERTYPE_ARP:
+        paquet.highest_layer = 'ARP'
+        retenu = True
+    else:
+        paquet.highest_layer = 'ETH' if linktype == LINKTYPE_ETHERNET else 'DATA'
+        retenu = True
+    return paquet if retenu else None
+
+
+def _decoder_liaison(linktype, donnees):
+    """Retourne (ethertype, position de la couche réseau)"""
+    try:
+        if linktype == LINKTYPE_ETHERNET:
+            ethertype = struct.unpack_from('!H', donnees, 12)[0]
+            position = 14
+            while ethertype in ETHERTYPES_VLAN:
+                ethertype = struct.unpack_from('!H', donnees, position + 2)[0]
+                position += 4
+            return ethertype, position
+        if linktype == LINKTYPE_LINUX_SLL:
+            return struct.unpack_from('!H', donnees, 14)[0], 16
+        if linktype == LINKTYPE_LINUX_SLL2:
+            return struct.unpack_from('!H', donnees, 0)[0], 20
+        if linktype == LINKTYPE_NULL:
+            # Famille d'adresse dans l'ordre des octets de la machine de capture
+            famille = struct.unpack_from('<I', donnees, 0)[0]
+            if famille > 0xffff:
+                famille = struct.unpack_from('>I', donnees, 0)[0]
+            # AF_INET6 varie selon le système (10, 24, 28, 30)
+            return (ETHERTYPE_IPV4 if famille == 2 else ETHERTYPE_IPV6), 4
+        if linktype in LINKTYPES_RAW:
+            version = donnees[0] >> 4
+            return (ETHERTYPE_IPV4 if version == 4 else ETHERTYPE_IPV6), 0
+    except (struct.error, IndexError):
+        pass
+    return None, 0
+
+
+def _decoder_ipv4(paquet, donnees, position, prefiltre=None):
+    """Décode l'en-tête IPv4 puis la couche transport; retourne False si rejeté"""
+    try:
+        (version_ihl, _, longueur_totale, _, fragment, _, proto, _, src, dst) = \
+            _ENTETE_IPV4.unpack_from(donnees, position)
+    except struct.error:
+        paquet.highest_layer = 'DATA'
+        return prefiltre is None
+    paquet.ip = CoucheIP(bytes(src), bytes(dst), proto)
+
+    # Seul le premier fragment porte l'en-tête transport
+    if fragment & 0x1fff:
+        paquet.highest_layer = 'IP'
+        return prefiltre is None or prefiltre.ip
+    debut = position + (version_ihl & 0x0f) * 4
+    fin = min(len(donnees), position + longueur_totale) if longueur_totale else len(donnees)
+    return _decoder_transport(paquet, proto, donnees, debut, fin, prefiltre)
+
+
+def _decoder_ipv6(paquet, donnees, position, prefiltre=None):
+    """Décode l'en-tête IPv6 (et ses extensions simples) puis la couche transport"""
+    try:
+        _, longueur_charge, proto, _, src, dst = _ENTETE_IPV6.unpack_from(donnees, position)
+    except struct.error:
+        paquet.highest_layer = 'DATA'
+        return prefiltre is None
+    paquet.ipv6 = CoucheIP(bytes(src), bytes(dst), proto)
+
+    debut = position + 40
+    fin = min(len(donnees), debut + longueur_charge) if longueur_charge else len(donnees)
+    try:
+        while proto in EXTENSIONS_IPV6:
+            proto = donnees[debut]
+            debut += (donnees[debut + 1] + 1) * 8
+        if proto == 44:  # Fragment
+            decalage = struct.unpack_from('!H', donnees, debut + 2)[0] >> 3
+            proto = donnees[debut]
+            debut += 8
+            if decalage:
+                paquet.highest_layer = 'IPV6'
+                return prefiltre is None or prefiltre.ip
+    except (struct.error, IndexError):
+        paquet.highest_layer = 'IPV6'
+        return prefiltre is None or prefiltre.ip
+    paquet.ipv6.proto = proto
+    return _decoder_transport(paquet, proto, donnees, debut, fin, prefiltre)
+
+
+def _decoder_transport(paquet, proto, donnees, debut, fin, prefiltre=None):
+    """
+    Décode TCP/UDP et détermine la couche la plus haute
+
+    Avec un pré-filtre, les ports sont testés avant tout décodage de la charge
+    utile, et seule la question DNS est décodée (si un détecteur la demande).
+
+    Returns:
+        False si le pré-filtre rejette le paquet
+    """
+    try:
+        if proto == PROTO_TCP:
+            srcport, dstport = _PORTS.unpack_from(donnees, debut)
+            if prefiltre is not None and not prefiltre.accepte_tcp(srcport, dstport):
+                return False
+            decalage = (donnees[debut + 12] >> 4) * 4
+            flags = donnees[debut + 13]
+            paquet.tcp = CouchePorts(srcport, dstport, flags)
+            charge = debut + decalage
+            if charge >= fin:
+                paquet.highest_layer = 'TCP'
+                return True
+            if (srcport == 53 or dstport == 53) and (prefiltre is None or prefiltre.dns):
+                # DNS sur TCP: préfixe de longueur sur 2 octets
+                if _decoder_dns(paquet, donnees, charge + 2, fin):
+                    return True
+            if prefiltre is not None:
+                paquet.highest_layer = 'TCP'
+            elif srcport in PROTOCOLES_TCP or dstport in PROTOCOLES_TCP:
+                nom = PROTOCOLES_TCP.get(dstport) or PROTOCOLES_TCP.get(srcport)
+                if nom == 'TLS' and not 0x14 <= donnees[charge] <= 0x17:
+                    nom = 'DATA'
+                paquet.highest_layer = nom
+            else:
+                paquet.highest_layer = 'DATA'
+
+        elif proto == PROTO_UDP:
+            srcport, dstport = _PORTS.unpack_from(donnees, debut)
+            if prefiltre is not None and not prefiltre.accepte_udp(srcport, dstport):
+                return False
+            paquet.udp = CouchePorts(srcport, dstport)
+            charge = debut + 8
+            if (srcport == 53 or dstport == 53) and (prefiltre is None or prefiltre.dns):
+                if _decoder_dns(paquet, donnees, charge, fin):
+                    return True
+            nom = PROTOCOLES_UDP.get(dstport) or PROTOCOLES_UDP.get(srcport)
+            if nom and nom != 'DNS':
+                paquet.highest_layer = nom
+            else:
+                paquet.highest_layer = 'DATA' if charge < fin else 'UDP'
+
+        elif prefiltre is not None and not prefiltre.ip:
+            return False
+        elif proto == PROTO_ICMP:
+            paquet.highest_layer = 'ICMP'
+        elif proto == PROTO_ICMPV6:
+            paquet.highest_layer = 'ICMPV6'
+        else:
+            paquet.highest_layer = 'IPV6' if hasattr(paquet, 'ipv6') else 'IP'
+
+    except (struct.error, IndexError):
+        paquet.highest_layer = 'DATA'
+        return prefiltre is None or prefiltre.ip
+    return True
+
+
+def _decoder_dns(paquet, donnees, debut, fin):
+    """Décode le nom de la première question DNS; retourne True si réussi"""
+    try:
+        qdcount = _ENTETE_DNS.unpack_from(donnees, debut)[2]
+        if qdcount == 0:
+            return False
+        nom = _lire_nom_dns(donnees, debut + 12, debut, fin)
+    except (struct.error, IndexError, UnicodeDecodeError):
+        return False
+    if nom is None:
+        return False
+    paquet.dns = CoucheDNS(nom)
+    paquet.highest_layer = 'DNS'
+    return True
+
+
+def _lire_nom_dns(donnees, position, debut_message, fin):
+    """Lit un nom DNS (avec pointeurs de compression) en texte pointé"""
+    etiquettes = []
+    sauts = 0
+    while True:
+        if position >= fin:
+            return None
+        longueur = donnees[position]
+        if longueur == 0:
+            break
+        if longueur & 0xc0 == 0xc0:
+            sauts += 1
+            if sauts > 16:
+                return None
+            position = debut_message + (((longueur & 0x3f) << 8) | donnees[position + 1])
+            continue
+        if position + 1 + longueur > fin:
+            return None
+        etiquettes.append(bytes(donnees[position + 1:position + 1 + longueur]).decode('ascii', 'replace'))
+        position += 1 + longueur
+    return '.'.join(etiquettes) if etiquettes else '<Root>'
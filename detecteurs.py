@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Module de registre des détecteurs
+Chaque détecteur déclare les couches et ports qu'il traite; l'analyseur en
+déduit une table de dispatch qui ne transmet chaque paquet qu'aux détecteurs
+concernés, en une seule passe
+"""
+
+import time
+from prefiltre import Interet
+
+# Registre global: nom -> Detecteur (dans l'ordre d'enregistrement)
+DETECTEURS = {}
+
+
+class Detecteur:
+    """
+    Détecteur enregistré
+
+    Args:
+        nom: Nom utilisé par --detectors
+        interet: Interet (couches et ports de destination traités)
+        traitement: Nom d'une méthode de l'analyseur, ou fonction(analyseur, paquet)
+    """
+    __slots__ = ('nom', 'interet', 'traitement')
+
+    def __init__(self, nom, interet, traitement):
+        self.nom = nom
+        self.interet = interet
+        self.traitement = traitement
+
+    def lier(self, analyseur):
+        """Retourne la fonction de traitement paquet -> None liée à l'analyseur"""
+        if isinstance(self.traitement, str):
+            # Résolu sur l'instance: les surcharges des sous-classes sont respectées
+            return getattr(analyseur, self.traitement)
+        traitement = self.traitement
+        return lambda paquet: traitement(analyseur, paquet)
+
+
+def enregistrer_detecteur(nom, interet, traitement):
+    """
+    Ajoute un détecteur au registre
+
+    Le traitement est appelé une fois par couche déclarée présente dans le
+    paquet ('trame': tout paquet, 'ip': IPv4/IPv6, 'dns', 'tcp'/'udp' filtrés
+    sur les ports de destination déclarés). Les erreurs AttributeError et
+    ValueError interrompent le traitement du paquet, comme pour les détecteurs
+    intégrés.
+
+    Exemple:
+        def detecter_telnet(analyseur, paquet):
+            analyseur.flux_suspects.append({...})
+
+        enregistrer_detecteur('telnet', Interet(couches=('tcp',), ports_tcp=(23,)),
+                              detecter_telnet)
+    """
+    if not isinstance(interet, Interet):
+        raise TypeError("interet doit être une instance de prefiltre.Interet")
+    DETECTEURS[nom] = Detecteur(nom, interet, traitement)
+    return DETECTEURS[nom]
+
+
+def _chronometrer(traiter, compteur):
+    """Enveloppe un traitement pour cumuler son nombre d'appels et sa durée"""
+    horloge = time.perf_counter
+
+    def traiter_chronometre(paquet):
+        debut = horloge()
+        try:
+            traiter(paquet)
+        finally:
+            compteur[0] += 1
+            compteur[1] += horloge() - debut
+    return traiter_chronometre
+
+
+class TableDispatch:
+    """
+    Table de dispatch des détecteurs actifs d'un analyseur
+
+    Les listes de traitements par port sont précalculées: un paquet TCP ou UDP
+    coûte une seule recherche dans un dictionnaire, quel que soit le nombre de
+    détecteurs enregistrés.
+
+    Attributs:
+        trame, ip, dns: Traitements appelés pour ces couches
+        tcp, udp: Port de destination -> traitements
+        tcp_defaut, udp_defaut: Traitements des ports absents de tcp / udp
+        compteurs: Nom -> [appels, secondes] (si chronométré)
+    """
+
+    def __init__(self, analyseur, noms, chronometrer=False):
+        self.compteurs = {}
+        self.trame, self.ip, self.dns = [], [], []
+        entrees_tcp, entrees_udp = [], []
+        for nom in noms:
+            detecteur = DETECTEURS[nom]
+            traiter = detecteur.lier(analyseur)
+            if chronometrer:
+                self.compteurs[nom] = [0, 0.0]
+                traiter = _chronometrer(traiter, self.compteurs[nom])
+            interet = detecteur.interet
+            if 'trame' in interet.couches:
+                self.trame.append(traiter)
+            if 'ip' in interet.couches:
+                self.ip.append(traiter)
+            if 'dns' in interet.couches:
+                self.dns.append(traiter)
+            if 'tcp' in interet.couches:
+                entrees_tcp.append((traiter, interet.ports_tcp))
+            if 'udp' in interet.couches:
+                entrees_udp.append((traiter, interet.ports_udp))
+        self.tcp, self.tcp_defaut = self._par_port(entrees_tcp)
+        self.udp, self.udp_defaut = self._par_port(entrees_udp)
+
+    @staticmethod
+    def _par_port(entrees):
+        """Précalcule, pour chaque port déclaré, les traitements dans l'ordre d'enregistrement"""
+        defaut = [traiter for traiter, ports in entrees if ports is None]
+        declares = set()
+        for _, ports in entrees:
+            declares |= ports or set()
+        par_port = {port: [traiter for traiter, ports in entrees if ports is None or port in ports]
+                    for port in declares}
+        return par_port, defaut
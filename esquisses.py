@@ -0,0 +1,397 @@
+#!/usr/bin/env python3
+"""
+Module de comptage approché en mémoire bornée
+Count-Min Sketch et tas des éléments les plus fréquents (heavy hitters),
+Space-Saving pour les plus gros contributeurs d'un flux pondéré (paquets,
+octets), HyperLogLog pour le nombre d'éléments distincts, échantillon
+uniforme d'éléments distincts (bottom-k). Les structures se fusionnent (mode
+parallèle, traitement par lot): le hachage est déterministe d'un
+processus à l'autre.
+"""
+
+import hashlib
+import heapq
+import math
+from array import array
+from operator import add
+
+# Count-Min Sketch: PROFONDEUR_COUNT_MIN lignes de LARGEUR_COUNT_MIN compteurs 32 bits (2 Mo)
+LARGEUR_COUNT_MIN = 1 << 17
+PROFONDEUR_COUNT_MIN = 4
+
+# Éléments suivis individuellement par FrequencesApprochees
+CAPACITE_FREQUENTS = 10000
+
+# Éléments suivis par SpaceSaving: l'erreur d'un compte est au plus total / capacité
+CAPACITE_SPACE_SAVING = 4096
+
+# HyperLogLog: 2^PRECISION_HLL registres (erreur type 1.04 / 32 = 3.3 %), ensemble
+# exact des hachages tant qu'il compte au plus SEUIL_EXACT_HLL éléments
+PRECISION_HLL = 10
+SEUIL_EXACT_HLL = 16
+
+# Éléments distincts conservés par EchantillonMinimal
+TAILLE_ECHANTILLON = 64
+
+
+def hacher(texte):
+    """Hachage 64 bits déterministe (indépendant de PYTHONHASHSEED)"""
+    return int.from_bytes(hashlib.blake2b(texte.encode('utf-8', 'surrogatepass'),
+                                          digest_size=8).digest(), 'little')
+
+
+class CountMin:
+    """
+    Count-Min Sketch: estimation (par excès) de la fréquence de chaque élément
+
+    Les compteurs sont additifs: la fusion de deux sketches donne exactement
+    le sketch du flux concaténé.
+    """
+    __slots__ = ('largeur', 'tables', 'total')
+
+    def __init__(self, largeur=LARGEUR_COUNT_MIN, profondeur=PROFONDEUR_COUNT_MIN):
+        if largeur & (largeur - 1):
+            raise ValueError("la largeur doit être une puissance de 2")
+        self.largeur = largeur
+        self.tables = [array('I', bytes(4 * largeur)) for _ in range(profondeur)]
+        self.total = 0
+
+    def _indices(self, hachage):
+        # Double hachage (Kirsch-Mitzenmacher): une seule empreinte pour toutes les lignes
+        h1 = hachage & 0xffffffff
+        h2 = (hachage >> 32) | 1
+        masque = self.largeur - 1
+        return [(h1 + i * h2) & masque for i in range(len(self.tables))]
+
+    def ajouter(self, hachage, n=1):
+        """Compte n occurrences et retourne l'estimation mise à jour"""
+        estimation = None
+        for table, indice in zip(self.tables, self._indices(hachage)):
+            valeur = table[indice] + n
+            table[indice] = valeur
+            if estimation is None or valeur < estimation:
+                estimation = valeur
+        self.total += n
+        return estimation
+
+    def estimer(self, hachage):
+        """Estimation de la fréquence (jamais inférieure à la fréquence réelle)"""
+        return min(table[indice] for table, indice in zip(self.tables, self._indices(hachage)))
+
+    def fusionner(self, autre):
+        """Ajoute les compteurs d'un sketch de mêmes dimensions"""
+        if autre.largeur != self.largeur or len(autre.tables) != len(self.tables):
+            raise ValueError("dimensions de Count-Min Sketch incompatibles")
+        self.tables = [array('I', map(add, table, autre_table))
+                       for table, autre_table in zip(self.tables, autre.tables)]
+        self.total += autre.total
+
+
+class FrequencesApprochees:
+    """
+    Éléments les plus fréquents d'un flux en mémoire bornée
+
+    Tous les éléments sont comptés dans un Count-Min Sketch; les `capacite`
+    plus fréquents sont suivis individuellement (tas des plus petits comptes
+    pour l'éviction). Un élément suivi depuis sa première occurrence a un
+    compte exact: tant qu'aucune éviction n'a eu lieu, les résultats sont
+    ceux d'un comptage complet. Au-delà, un élément admis reçoit l'estimation
+    du sketch (majorant).
+    """
+    __slots__ = ('sketch', 'capacite', 'suivis', 'tas', 'evictions')
+
+    def __init__(self, capacite=CAPACITE_FREQUENTS, sketch=None):
+        self.sketch = sketch or CountMin()
+        self.capacite = capacite
+        self.suivis = {}  # Élément -> [compte, exact], dans l'ordre de première apparition
+        self.tas = []     # (compte, élément), entrées périmées ignorées à l'extraction
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self.suivis)
+
+    def ajouter(self, element, hachage=None):
+        """Compte une occurrence de l'élément (hachage: hacher(element) s'il est déjà calculé)"""
+        estimation = self.sketch.ajouter(hacher(element) if hachage is None else hachage)
+        suivi = self.suivis.get(element)
+        if suivi is not None:
+            suivi[0] = suivi[0] + 1 if suivi[1] else estimation
+            heapq.heappush(self.tas, (suivi[0], element))
+            if len(self.tas) > 4 * self.capacite + 64:
+                self._reconstruire_tas()
+            return
+        if len(self.suivis) >= self.capacite:
+            minimum = self._minimum()
+            self.evictions += 1
+            if estimation <= minimum[0]:
+                return
+            heapq.heappop(self.tas)
+            del self.suivis[minimum[1]]
+        # Jamais vu si rien n'a été écarté (ou estimation de 1): compte exact
+        self.suivis[element] = [estimation, self.evictions == 0 or estimation == 1]
+        heapq.heappush(self.tas, (estimation, element))
+
+    def _minimum(self):
+        """Entrée (compte, élément) du tas correspondant au plus petit compte suivi"""
+        while True:
+            compte, element = self.tas[0]
+            suivi = self.suivis.get(element)
+            if suivi is not None and suivi[0] == compte:
+                return self.tas[0]
+            heapq.heappop(self.tas)
+
+    def _reconstruire_tas(self):
+        self.tas = [(suivi[0], element) for element, suivi in self.suivis.items()]
+        heapq.heapify(self.tas)
+
+    def frequents(self, seuil=0):
+        """Liste (élément, compte, exact) des éléments suivis de compte supérieur au seuil"""
+        return [(element, compte, exact) for element, (compte, exact) in self.suivis.items()
+                if compte > seuil]
+
+    def fusionner(self, autre):
+        """
+        Fusionne les fréquences d'une portion postérieure du flux
+        Les comptes exacts des deux côtés s'additionnent; sinon l'estimation
+        du sketch fusionné est retenue.
+        """
+        self.sketch.fusionner(autre.sketch)
+        exhaustif = self.evictions == 0
+        autre_exhaustif = autre.evictions == 0
+        for element, suivi in self.suivis.items():
+            if element not in autre.suivis and not autre_exhaustif:
+                suivi[0], suivi[1] = self.sketch.estimer(hacher(element)), False
+        for element, (compte, exact) in autre.suivis.items():
+            suivi = self.suivis.get(element)
+            if suivi is None:
+                suivi = self.suivis[element] = [0, exhaustif]
+            if suivi[1] and exact:
+                suivi[0] += compte
+            else:
+                suivi[0], suivi[1] = self.sketch.estimer(hacher(element)), False
+        self.evictions += autre.evictions
+        if len(self.suivis) > self.capacite:
+            conserves = set(heapq.nlargest(self.capacite, self.suivis,
+                                           key=lambda element: self.suivis[element][0]))
+            self.evictions += len(self.suivis) - len(conserves)
+            self.suivis = {element: suivi for element, suivi in self.suivis.items()
+                           if element in conserves}
+        self._reconstruire_tas()
+
+
+class SpaceSaving:
+    """
+    Plus gros contributeurs d'un flux pondéré (Space-Saving, Metwally et al.)
+
+    Au plus `capacite` éléments sont suivis. Un élément non suivi remplace le
+    plus petit compte `m` et reçoit le compte m + poids, avec une erreur m:
+    son compte réel est compris entre compte - erreur et compte, et tout
+    élément non suivi pèse au plus m (donc au plus total / capacité). Tant
+    qu'aucun élément n'a été écarté, les comptes sont exacts.
+
+    Le tas contient une entrée par élément suivi, minorant de son compte:
+    une mise à jour ne coûte qu'une écriture dans le dictionnaire, l'entrée
+    n'est corrigée que lorsqu'elle remonte au sommet.
+    """
+    __slots__ = ('capacite', 'comptes', 'erreurs', 'tas', 'exhaustif')
+
+    def __init__(self, capacite=CAPACITE_SPACE_SAVING):
+        self.capacite = capacite
+        self.comptes = {}   # Élément -> compte, dans l'ordre de première apparition
+        self.erreurs = {}   # Élément -> erreur (absent: compte exact)
+        self.tas = []       # (minorant du compte, élément)
+        self.exhaustif = True
+
+    def __len__(self):
+        return len(self.comptes)
+
+    def ajouter(self, element, poids=1):
+        """Ajoute `poids` au compte de l'élément"""
+        compte = self.comptes.get(element)
+        if compte is not None:
+            self.comptes[element] = compte + poids
+        elif self.exhaustif and len(self.comptes) < self.capacite:
+            self.comptes[element] = poids
+            heapq.heappush(self.tas, (poids, element))
+        else:
+            self._admettre(element, poids)
+
+    def _admettre(self, element, poids):
+        """Suit un nouvel élément à la place du plus petit compte (ou à sa hauteur)"""
+        comptes, tas = self.comptes, self.tas
+        if len(comptes) < self.capacite:
+            # Résumé incomplet issu d'une fusion: pas d'éviction
+            plancher = self.plancher()
+            heapq.heappush(tas, (plancher + poids, element))
+        else:
+            # Plus petit compte (plancher() en ligne: appelé à chaque nouvel élément)
+            while True:
+                plancher, evince = tas[0]
+                compte = comptes[evince]
+                if compte == plancher:
+                    break
+                heapq.heapreplace(tas, (compte, evince))
+            heapq.heapreplace(tas, (plancher + poids, element))
+            del comptes[evince]
+            self.erreurs.pop(evince, None)
+            self.exhaustif = False
+        comptes[element] = plancher + poids
+        if plancher:
+            self.erreurs[element] = plancher
+
+    def plancher(self):
+        """Majorant du compte de tout élément non suivi (0 tant que les comptes sont exacts)"""
+        if self.exhaustif and len(self.comptes) < self.capacite:
+            return 0
+        tas, comptes = self.tas, self.comptes
+        while True:
+            minorant, element = tas[0]
+            compte = comptes[element]
+            if compte == minorant:
+                return compte
+            heapq.heapreplace(tas, (compte, element))
+
+    def plus_gros(self, n=None):
+        """Liste (élément, compte, erreur) des n plus gros comptes (tous si n vaut None)"""
+        erreurs = self.erreurs
+        # Copie en une opération: lisible depuis un autre fil pendant l'analyse (mode live)
+        paires = list(self.comptes.items())
+        if n is None:
+            paires.sort(key=lambda paire: paire[1], reverse=True)
+        else:
+            paires = heapq.nlargest(n, paires, key=lambda paire: paire[1])
+        return [(element, compte, erreurs.get(element, 0)) for element, compte in paires]
+
+    def fusionner(self, autre):
+        """
+        Fusionne le résumé d'une autre portion du flux (Agarwal et al.)
+        Un élément absent d'un côté y reçoit le plancher de ce côté, en compte
+        et en erreur; seuls les `capacite` plus gros comptes sont conservés.
+        Sans élément écarté, le résultat est celui d'un comptage unique.
+        """
+        plancher, plancher_autre = self.plancher(), autre.plancher()
+        comptes, erreurs = self.comptes, self.erreurs
+        if plancher_autre:
+            for element in comptes:
+                if element not in autre.comptes:
+                    comptes[element] += plancher_autre
+                    erreurs[element] = erreurs.get(element, 0) + plancher_autre
+        for element, compte in autre.comptes.items():
+            erreur = autre.erreurs.get(element, 0)
+            if element in comptes:
+                comptes[element] += compte
+            else:
+                comptes[element] = plancher + compte
+                erreur += plancher
+            erreur += erreurs.get(element, 0)
+            if erreur:
+                erreurs[element] = erreur
+        self.exhaustif = self.exhaustif and autre.exhaustif
+        if len(comptes) > self.capacite:
+            conserves = set(heapq.nlargest(self.capacite, comptes, key=comptes.get))
+            self.comptes = {element: compte for element, compte in comptes.items()
+                            if element in conserves}
+            self.erreurs = {element: erreur for element, erreur in erreurs.items()
+                            if element in conserves}
+            self.exhaustif = False
+        self.tas = [(compte, element) for element, compte in self.comptes.items()]
+        heapq.heapify(self.tas)
+
+
+class HyperLogLog:
+    """
+    Estimation du nombre d'éléments distincts (HyperLogLog)
+    Exact jusqu'à SEUIL_EXACT_HLL éléments, puis 2^PRECISION_HLL registres d'un
+    octet; les registres ne dépendent que de l'ensemble des hachages vus, la
+    fusion est donc exacte.
+    """
+    __slots__ = ('hachages', 'registres')
+
+    def __init__(self):
+        self.hachages = set()
+        self.registres = None
+
+    def ajouter(self, hachage):
+        """Ajoute un élément par son hachage 64 bits (voir hacher)"""
+        if self.registres is not None:
+            self._ajouter_registre(hachage)
+            return
+        self.hachages.add(hachage)
+        if len(self.hachages) > SEUIL_EXACT_HLL:
+            self.registres = bytearray(1 << PRECISION_HLL)
+            for valeur in self.hachages:
+                self._ajouter_registre(valeur)
+            self.hachages = None
+
+    def _ajouter_registre(self, hachage):
+        bits = 64 - PRECISION_HLL
+        indice = hachage >> bits
+        rang = bits - (hachage & ((1 << bits) - 1)).bit_length() + 1
+        if rang > self.registres[indice]:
+            self.registres[indice] = rang
+
+    def estimer(self):
+        """Nombre approché d'éléments distincts"""
+        if self.registres is None:
+            return len(self.hachages)
+        m = len(self.registres)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimation = alpha * m * m / sum(2.0 ** -rang for rang in self.registres)
+        vides = self.registres.count(0)
+        if estimation <= 2.5 * m and vides:
+            estimation = m * math.log(m / vides)  # Petites cardinalités: comptage linéaire
+        return round(estimation)
+
+    def fusionner(self, autre):
+        """Ajoute les éléments d'un autre HyperLogLog"""
+        if autre.registres is None:
+            for hachage in autre.hachages:
+                self.ajouter(hachage)
+            return
+        if self.registres is None:
+            hachages = self.hachages
+            self.registres = bytearray(autre.registres)
+            self.hachages = None
+            for hachage in hachages:
+                self._ajouter_registre(hachage)
+            return
+        self.registres = bytearray(map(max, self.registres, autre.registres))
+
+
+class EchantillonMinimal:
+    """
+    Échantillon uniforme d'éléments distincts (bottom-k)
+    Conserve les `taille` éléments de plus petit hachage: l'échantillon ne
+    dépend pas de l'ordre d'arrivée, la fusion est donc exacte.
+    """
+    __slots__ = ('taille', 'tas', 'hachages')
+
+    def __init__(self, taille=TAILLE_ECHANTILLON):
+        self.taille = taille
+        self.tas = []           # (-hachage, élément): le plus grand hachage au sommet
+        self.hachages = set()
+
+    def __len__(self):
+        return len(self.tas)
+
+    def ajouter(self, element, hachage):
+        """Propose un élément par son hachage 64 bits (voir hacher)"""
+        if hachage in self.hachages:
+            return
+        if len(self.tas) < self.taille:
+            heapq.heappush(self.tas, (-hachage, element))
+        elif hachage < -self.tas[0][0]:
+            evince, _ = heapq.heapreplace(self.tas, (-hachage, element))
+            self.hachages.discard(-evince)
+        else:
+            return
+        self.hachages.add(hachage)
+
+    def elements(self):
+        """Éléments de l'échantillon, par hachage croissant"""
+        return [element for _, element in sorted(self.tas, reverse=True)]
+
+    def fusionner(self, autre):
+        """Ajoute les éléments d'un autre échantillon"""
+        for hachage, element in autre.tas:
+            self.ajouter(element, -hachage)
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Module d'export des résultats
+Écrit les tables de l'analyse (flux suspects, flux persistants, conversations,
+requêtes DNS, statistiques de protocoles) en JSONL et CSV, ainsi qu'en
+Parquet / Arrow lorsque pyarrow est installé. Les lignes sont produites à la
+volée et écrites par lots, sans liste intermédiaire.
+"""
+
+import csv
+import json
+from itertools import islice
+from conversations import adresses_flux, decrire_etat_tcp, formater_adresse
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+# Formats reconnus par --format ('html' désigne le rapport)
+FORMATS = ('html', 'jsonl', 'csv', 'parquet', 'arrow')
+EXTENSIONS = {'jsonl': '.jsonl', 'csv': '.csv', 'parquet': '.parquet', 'arrow': '.arrow'}
+
+# Nombre de lignes écrites par lot
+TAILLE_LOT = 10000
+
+# Schéma des tables exportées: (colonne, type) avec type parmi 'str', 'int', 'float'
+SCHEMAS = {
+    'flux_suspects': (('type', 'str'), ('detail', 'str'), ('severite', 'str'), ('src', 'str'),
+                      ('dst', 'str'), ('port', 'int'), ('occurrences', 'int'),
+                      ('premier_ts', 'float'), ('dernier_ts', 'float'), ('bytes', 'int')),
+    'flux_arriere_plan': (('conversation', 'str'), ('paquets', 'int'), ('bytes', 'int'),
+                          ('duree', 'float'), ('debit', 'float')),
+    'conversations': (('src', 'str'), ('sport', 'int'), ('dst', 'str'), ('dport', 'int'),
+                      ('proto', 'int'), ('premier_ts', 'float'), ('dernier_ts', 'float'),
+                      ('paquets', 'int'), ('bytes', 'int'), ('paquets_retour', 'int'),
+                      ('bytes_retour', 'int'), ('etat_tcp', 'str')),
+    'requetes_dns': (('domaine', 'str'), ('timestamp', 'float'), ('src', 'str')),
+    'stats_protocoles': (('protocole', 'str'), ('paquets', 'int')),
+}
+
+
+def pyarrow_disponible():
+    """Indique si pyarrow est installé"""
+    return pa is not None
+
+
+def _lignes_flux_suspects(analyseur):
+    for alerte in analyseur.flux_suspects:
+        yield (alerte['type'], alerte['detail'], alerte['severite'],
+               None if alerte['src'] is None else str(alerte['src']),
+               None if alerte['dst'] is None else str(alerte['dst']),
+               alerte['port'], alerte['occurrences'], alerte['premier_ts'], alerte['dernier_ts'],
+               alerte['bytes'])
+
+
+def _lignes_flux_arriere_plan(analyseur):
+    for flux in analyseur.flux_arriere_plan:
+        yield flux['conversation'], flux['paquets'], flux['bytes'], flux['duree'], flux['debit']
+
+
+def _lignes_conversations(analyseur):
+    # Flux encore en table (les flux expirés ne sont conservés que s'ils sont persistants)
+    for cle, stats in analyseur.conversations.items():
+        proto, src, sport, dst, dport = adresses_flux(cle, stats.initiateur_bas)
+        yield (formater_adresse(src), sport, formater_adresse(dst), dport, proto,
+               stats.premier_ts, stats.dernier_ts, stats.paquets, stats.bytes,
+               stats.paquets_retour, stats.bytes_retour, decrire_etat_tcp(stats.etat))
+
+
+def _lignes_requetes_dns(analyseur):
+    yield from analyseur.requetes_dns
+
+
+def _lignes_stats_protocoles(analyseur):
+    yield from analyseur.stats_protocoles.items()
+
+
+LIGNES = {
+    'flux_suspects': _lignes_flux_suspects,
+    'flux_arriere_plan': _lignes_flux_arriere_plan,
+    'conversations': _lignes_conversations,
+    'requetes_dns': _lignes_requetes_dns,
+    'stats_protocoles': _lignes_stats_protocoles,
+}
+
+
+def _lots(lignes, taille=TAILLE_LOT):
+    """Découpe un itérable de lignes en lots"""
+    lignes = iter(lignes)
+    while True:
+        lot = list(islice(lignes, taille))
+        if not lot:
+            return
+        yield lot
+
+
+def ecrire_jsonl(chemin, colonnes, lignes):
+    """Une ligne JSON par enregistrement"""
+    with open(chemin, 'w', encoding='utf-8') as f:
+        for lot in _lots(lignes):
+            f.writelines(json.dumps(dict(zip(colonnes, ligne)), ensure_ascii=False) + '\n'
+                         for ligne in lot)
+
+
+def ecrire_csv(chemin, colonnes, lignes):
+    """CSV avec ligne d'en-tête (valeurs absentes laissées vides)"""
+    with open(chemin, 'w', encoding='utf-8', newline='') as f:
+        ecrivain = csv.writer(f)
+        ecrivain.writerow(colonnes)
+        for lot in _lots(lignes):
+            ecrivain.writerows(lot)
+
+
+def _schema_arrow(schema):
+    types = {'str': pa.string(), 'int': pa.int64(), 'float': pa.float64()}
+    return pa.schema([(nom, types[type_colonne]) for nom, type_colonne in schema])
+
+
+def _lots_arrow(schema_arrow, lignes):
+    """Lots de lignes convertis en RecordBatch colonne par colonne"""
+    for lot in _lots(lignes):
+        colonnes = zip(*lot)
+        yield pa.RecordBatch.from_arrays(
+            [pa.array(valeurs, type=champ.type) for champ, valeurs in zip(schema_arrow, colonnes)],
+            schema=schema_arrow)
+
+
+def ecrire_parquet(chemin, schema, lignes):
+    """Fichier Parquet, un groupe de lignes par lot"""
+    schema_arrow = _schema_arrow(schema)
+    with pq.ParquetWriter(chemin, schema_arrow) as ecrivain:
+        for lot in _lots_arrow(schema_arrow, lignes):
+            ecrivain.write_batch(lot)
+
+
+def ecrire_arrow(chemin, schema, lignes):
+    """Fichier Arrow IPC (Feather v2)"""
+    schema_arrow = _schema_arrow(schema)
+    with pa.OSFile(chemin, 'wb') as sortie, pa.ipc.new_file(sortie, schema_arrow) as ecrivain:
+        for lot in _lots_arrow(schema_arrow, lignes):
+            ecrivain.write_batch(lot)
+
+
+def exporter(analyseur, base, formats):
+    """
+    Exporte toutes les tables dans les formats demandés
+
+    Args:
+        analyseur: Instance de AnalyseurTraficSuspect
+        base: Préfixe des fichiers (ex: 'rapport_analyse' -> rapport_analyse_conversations.csv)
+        formats: Formats parmi FORMATS ('html' est ignoré ici)
+
+    Returns:
+        Liste des fichiers écrits
+    """
+    fichiers = []
+    for format_export in formats:
+        if format_export not in EXTENSIONS:
+            continue
+        if format_export in ('parquet', 'arrow') and pa is None:
+            print(f"[!] pyarrow n'est pas installé (pip install pyarrow), format {format_export} ignoré")
+            continue
+        for table, schema in SCHEMAS.items():
+            chemin = f"{base}_{table}{EXTENSIONS[format_export]}"
+            lignes = LIGNES[table](analyseur)
+            colonnes = [nom for nom, _ in schema]
+            if format_export == 'jsonl':
+                ecrire_jsonl(chemin, colonnes, lignes)
+            elif format_export == 'csv':
+                ecrire_csv(chemin, colonnes, lignes)
+            elif format_export == 'parquet':
+                ecrire_parquet(chemin, schema, lignes)
+            else:
+                ecrire_arrow(chemin, schema, lignes)
+            fichiers.append(chemin)
+    return fichiers
@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+Module de filtrage des noms de domaine suspects
+Arbre de suffixes (étiquettes inversées) pour les domaines et TLD, automate
+d'Aho-Corasick pour les mots-clés: le coût d'une recherche ne dépend pas de
+la taille des listes chargées
+"""
+
+from functools import lru_cache
+
+# Listes intégrées, complétées par les fichiers de renseignement fournis
+TLDS_SUSPECTS = ['.tk', '.ml', '.ga', '.cf', '.gq']
+MOTS_SUSPECTS = ['temp', 'tmp', 'test', 'malware', 'c2', 'cmd']
+
+
+class TrieSuffixes:
+    """
+    Arbre des domaines indexé par étiquettes inversées (com -> example -> www)
+    Un domaine correspond si l'un de ses suffixes complets (à une frontière
+    d'étiquette) a été ajouté: '.tk' couvre 'evil.tk' mais pas 'x.tkt.example.com'.
+    """
+    __slots__ = ('racine', 'taille')
+
+    # Clé marquant la fin d'une entrée dans un nœud
+    FIN = ''
+
+    def __init__(self):
+        self.racine = {}
+        self.taille = 0
+
+    def ajouter(self, domaine):
+        """Ajoute un domaine ou un TLD ('.tk', 'tk', '*.evil.com', 'evil.com')"""
+        etiquettes = _etiquettes(domaine.lstrip('*'))
+        if not etiquettes:
+            return
+        noeud = self.racine
+        for etiquette in reversed(etiquettes):
+            noeud = noeud.setdefault(etiquette, {})
+        if self.FIN not in noeud:
+            noeud[self.FIN] = '.'.join(etiquettes)
+            self.taille += 1
+
+    def correspondance(self, domaine):
+        """Retourne le suffixe listé le plus court couvrant le domaine, ou None"""
+        noeud = self.racine
+        for etiquette in reversed(_etiquettes(domaine)):
+            noeud = noeud.get(etiquette)
+            if noeud is None:
+                return None
+            if self.FIN in noeud:
+                return noeud[self.FIN]
+        return None
+
+    def __len__(self):
+        return self.taille
+
+
+class AhoCorasick:
+    """Automate d'Aho-Corasick recherchant simultanément tous les mots-clés"""
+    __slots__ = ('transitions', 'echecs', 'sorties', 'construit')
+
+    def __init__(self, mots=()):
+        self.transitions = [{}]
+        self.echecs = [0]
+        self.sorties = [None]
+        self.construit = False
+        for mot in mots:
+            self.ajouter(mot)
+
+    def ajouter(self, mot):
+        """Ajoute un mot-clé (l'automate doit ensuite être reconstruit)"""
+        mot = mot.strip().lower()
+        if not mot:
+            return
+        etat = 0
+        for caractere in mot:
+            suivant = self.transitions[etat].get(caractere)
+            if suivant is None:
+                suivant = len(self.transitions)
+                self.transitions[etat][caractere] = suivant
+                self.transitions.append({})
+                self.echecs.append(0)
+                self.sorties.append(None)
+            etat = suivant
+        if self.sorties[etat] is None:
+            self.sorties[etat] = mot
+        self.construit = False
+
+    def construire(self):
+        """Calcule les liens d'échec par parcours en largeur"""
+        file_attente = list(self.transitions[0].values())
+        for etat in file_attente:
+            self.echecs[etat] = 0
+        position = 0
+        while position < len(file_attente):
+            etat = file_attente[position]
+            position += 1
+            for caractere, suivant in self.transitions[etat].items():
+                file_attente.append(suivant)
+                repli = self.echecs[etat]
+                while repli and caractere not in self.transitions[repli]:
+                    repli = self.echecs[repli]
+                cible = self.transitions[repli].get(caractere, 0)
+                self.echecs[suivant] = cible if cible != suivant else 0
+                # Un mot reconnu par le lien d'échec l'est aussi par cet état
+                if self.sorties[suivant] is None:
+                    self.sorties[suivant] = self.sorties[self.echecs[suivant]]
+        self.construit = True
+
+    def rechercher(self, texte):
+        """Retourne le premier mot-clé trouvé dans le texte, ou None"""
+        if not self.construit:
+            self.construire()
+        transitions = self.transitions
+        echecs = self.echecs
+        sorties = self.sorties
+        etat = 0
+        for caractere in texte:
+            while etat and caractere not in transitions[etat]:
+                etat = echecs[etat]
+            etat = transitions[etat].get(caractere, 0)
+            if sorties[etat] is not None:
+                return sorties[etat]
+        return None
+
+    def __len__(self):
+        return sum(1 for sortie in self.sorties if sortie is not None)
+
+
+class FiltreDomaines:
+    """Filtre compilé: domaines/TLD suspects et mots-clés suspects"""
+
+    def __init__(self, domaines=(), mots=()):
+        self.domaines = TrieSuffixes()
+        for domaine in domaines:
+            self.domaines.ajouter(domaine)
+        self.mots = AhoCorasick(mots)
+        self.mots.construire()
+
+    def verifier(self, domaine):
+        """
+        Vérifie un nom de domaine
+
+        Returns:
+            Motif de la correspondance (suffixe ou mot-clé), ou None
+        """
+        domaine = domaine.lower()
+        suffixe = self.domaines.correspondance(domaine)
+        if suffixe is not None:
+            return suffixe
+        return self.mots.rechercher(domaine)
+
+
+def _etiquettes(domaine):
+    """Étiquettes en minuscules d'un nom de domaine (points de début/fin ignorés)"""
+    domaine = domaine.strip().strip('.').lower()
+    return domaine.split('.') if domaine else []
+
+
+# Suffixes publics à deux étiquettes les plus courants: le domaine enregistré en compte trois
+SUFFIXES_DOUBLES = frozenset((
+    'co.uk', 'org.uk', 'ac.uk', 'gov.uk', 'com.au', 'net.au', 'org.au', 'co.nz', 'co.jp',
+    'ne.jp', 'or.jp', 'co.kr', 'com.br', 'com.cn', 'com.mx', 'com.tr', 'com.tn', 'co.in',
+    'co.za', 'com.sg', 'com.hk', 'com.tw',
+))
+
+
+def domaine_parent(domaine):
+    """
+    Domaine enregistré approché d'un nom ('a.b.example.co.uk' -> 'example.co.uk'):
+    les deux dernières étiquettes, trois derrière un suffixe de SUFFIXES_DOUBLES
+    """
+    etiquettes = _etiquettes(domaine)
+    nombre = 3 if len(etiquettes) > 2 and '.'.join(etiquettes[-2:]) in SUFFIXES_DOUBLES else 2
+    return '.'.join(etiquettes[-nombre:])
+
+
+def lire_liste(fichier):
+    """
+    Lit un fichier de renseignement: une entrée par ligne, commentaires '#'
+    Les lignes au format hosts ('0.0.0.0 evil.com') sont acceptées.
+    """
+    entrees = []
+    with open(fichier, encoding='utf-8', errors='replace') as f:
+        for ligne in f:
+            ligne = ligne.split('#', 1)[0].strip()
+            if ligne:
+                entrees.append(ligne.split()[-1])
+    return entrees
+
+
+@lru_cache(maxsize=8)
+def charger_filtre_domaines(fichiers_domaines=(), fichiers_mots=()):
+    """
+    Construit (une seule fois par processus) le filtre à partir des listes
+    intégrées et des fichiers de renseignement
+
+    Args:
+        fichiers_domaines: Tuple de fichiers de domaines / TLD
+        fichiers_mots: Tuple de fichiers de mots-clés
+    """
+    domaines = list(TLDS_SUSPECTS)
+    for fichier in fichiers_domaines:
+        domaines.extend(lire_liste(fichier))
+    mots = list(MOTS_SUSPECTS)
+    for fichier in fichiers_mots:
+        mots.extend(lire_liste(fichier))
+    return FiltreDomaines(domaines, mots)
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Module des plus gros émetteurs (top talkers)
+Sources, destinations, conversations et ports de service les plus actifs,
+en paquets et en octets, tenus à chaque paquet dans des résumés Space-Saving
+de taille fixe: la mémoire ne dépend pas du nombre d'hôtes ou de flux, et
+le rapport lit les premiers de chaque classement sans trier de table.
+"""
+
+from conversations import (BITS_PORT, MASQUE_PORT, NOMS_PROTOCOLES, formater_adresse,
+                           formater_conversation)
+from esquisses import CAPACITE_SPACE_SAVING, SpaceSaving
+
+DIMENSIONS = ('sources', 'destinations', 'conversations', 'ports')
+MESURES = ('paquets', 'bytes')
+
+
+def port_service(proto, sport, dport):
+    """Port de service d'un paquet TCP/UDP (le plus petit des deux), avec son protocole"""
+    return (proto << BITS_PORT) | min(sport, dport)
+
+
+def formater_port(element):
+    """Texte '443/TCP' d'un port de service (voir port_service)"""
+    proto = element >> BITS_PORT
+    return f"{element & MASQUE_PORT}/{NOMS_PROTOCOLES.get(proto, proto)}"
+
+
+# Texte des éléments de chaque dimension, produit uniquement pour l'affichage
+_FORMATS = {
+    'sources': formater_adresse,
+    'destinations': formater_adresse,
+    'conversations': formater_conversation,
+    'ports': formater_port,
+}
+
+
+class GrosEmetteurs:
+    """
+    Classements (Space-Saving) des sources, destinations, conversations
+    (clé canonique de flux) et ports de service, par paquets et par octets
+
+    Les éléments sont les entiers de conversations.py (adresses, clés de
+    flux) et de port_service; leur texte n'est produit qu'à la lecture.
+    """
+    __slots__ = ('resumes', '_ajouts')
+
+    def __init__(self, capacite=CAPACITE_SPACE_SAVING):
+        # (dimension, mesure) -> SpaceSaving
+        self.resumes = {(dimension, mesure): SpaceSaving(capacite)
+                        for dimension in DIMENSIONS for mesure in MESURES}
+        self._lier()
+
+    def __getstate__(self):
+        return (self.resumes,)
+
+    def __setstate__(self, etat):
+        self.resumes = etat[0]
+        self._lier()
+
+    def _lier(self):
+        # Méthodes d'ajout résolues une fois: huit appels par paquet
+        self._ajouts = tuple(self.resumes[dimension, mesure].ajouter
+                             for mesure in MESURES for dimension in DIMENSIONS)
+
+    def ajouter(self, src, dst, conversation, port, taille):
+        """Comptabilise un paquet IP (port: None hors TCP/UDP, taille: 0 si inconnue)"""
+        (sources, destinations, conversations, ports,
+         octets_sources, octets_destinations, octets_conversations, octets_ports) = self._ajouts
+        sources(src)
+        destinations(dst)
+        conversations(conversation)
+        if port is not None:
+            ports(port)
+        if taille:
+            octets_sources(src, taille)
+            octets_destinations(dst, taille)
+            octets_conversations(conversation, taille)
+            if port is not None:
+                octets_ports(port, taille)
+
+    def __bool__(self):
+        return bool(self.resumes['sources', 'paquets'])
+
+    def classement(self, dimension, mesure='bytes', n=None):
+        """
+        Les n premiers éléments d'une dimension pour une mesure
+
+        Returns:
+            Liste (texte, valeur, erreur): la valeur réelle est comprise entre
+            valeur - erreur et valeur
+        """
+        formater = _FORMATS[dimension]
+        return [(formater(element), compte, erreur)
+                for element, compte, erreur in self.resumes[dimension, mesure].plus_gros(n)]
+
+    def erreur_max(self, dimension, mesure='bytes'):
+        """Majorant de l'erreur des comptes d'un classement (0 s'ils sont exacts)"""
+        return self.resumes[dimension, mesure].plancher()
+
+    def fusionner(self, autre):
+        """Fusionne les classements d'une autre portion de capture (voir SpaceSaving.fusionner)"""
+        for cle, resume in autre.resumes.items():
+            self.resumes[cle].fusionner(resume)
@@ -0,0 +1,373 @@
+#!/usr/bin/env python3
+"""
+Module d'instrumentation de l'analyse
+Minuteries et compteurs (décodage, détecteurs, étapes), mémoire résidente,
+résumé JSON (--profile), endpoint Prometheus du mode live et points
+d'accroche pour un profileur autour de _analyser_paquet
+"""
+
+import cProfile
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from gros_emetteurs import DIMENSIONS
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Profileurs proposés par --profile-hook et extension du profil écrit
+PROFILEURS = ('cprofile', 'sampling')
+EXTENSIONS_PROFIL = {'cprofile': '.prof', 'sampling': '.folded'}
+
+# Période par défaut du profileur par échantillonnage (secondes)
+PERIODE_ECHANTILLONNAGE = 0.005
+
+# Éléments de chaque classement des plus gros émetteurs exposés en métriques
+EMETTEURS_METRIQUES = 10
+
+
+def rss_courant():
+    """Mémoire résidente actuelle en octets (0 si indisponible)"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return 0
+
+
+def rss_maximal_processus():
+    """Mémoire résidente maximale du processus depuis son lancement, en octets"""
+    if resource is None:
+        return 0
+    maximum = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kio sous Linux, octets sous macOS
+    return maximum if sys.platform == 'darwin' else maximum * 1024
+
+
+class Instrumentation:
+    """
+    Minuteries et compteurs d'une analyse
+
+    Les minuteries sont des paires [appels, secondes] cumulées par nom:
+    'etape.*' pour les étapes de main.py, 'decodage' pour le décodage des
+    paquets et 'analyse_paquet' pour _analyser_paquet. Le temps par détecteur
+    provient des compteurs de la table de dispatch (chronometrer=True).
+
+    Un hook de profilage est un objet exposant envelopper(fonction) et
+    terminer(); il est appliqué autour de chaque appel à _analyser_paquet
+    (voir ProfileurCProfile et ProfileurEchantillonnage).
+    """
+
+    def __init__(self):
+        self.debut = time.perf_counter()
+        self.minuteries = {}
+        self.compteurs = Counter()
+        self.hooks = []
+
+    def minuterie(self, nom):
+        """Paire [appels, secondes] de la minuterie `nom` (créée au besoin)"""
+        minuterie = self.minuteries.get(nom)
+        if minuterie is None:
+            minuterie = self.minuteries[nom] = [0, 0.0]
+        return minuterie
+
+    @contextmanager
+    def chronometre(self, nom):
+        """Chronomètre un bloc (étape, section...)"""
+        minuterie = self.minuterie(nom)
+        debut = time.perf_counter()
+        try:
+            yield
+        finally:
+            minuterie[0] += 1
+            minuterie[1] += time.perf_counter() - debut
+
+    def compter(self, nom, nombre=1):
+        self.compteurs[nom] += nombre
+
+    def envelopper(self, nom, fonction):
+        """Fonction équivalente dont chaque appel est chronométré"""
+        minuterie = self.minuterie(nom)
+        horloge = time.perf_counter
+
+        def fonction_chronometree(*args):
+            debut = horloge()
+            try:
+                return fonction(*args)
+            finally:
+                minuterie[0] += 1
+                minuterie[1] += horloge() - debut
+        return fonction_chronometree
+
+    def iterer(self, nom, iterable):
+        """Itère en chronométrant la production de chaque élément (ex: décodage)"""
+        minuterie = self.minuterie(nom)
+        horloge = time.perf_counter
+        iterateur = iter(iterable)
+        while True:
+            debut = horloge()
+            try:
+                element = next(iterateur)
+            except StopIteration:
+                minuterie[1] += horloge() - debut
+                return
+            minuterie[0] += 1
+            minuterie[1] += horloge() - debut
+            yield element
+
+    def attacher(self, hook):
+        """Ajoute un hook de profilage autour de _analyser_paquet"""
+        self.hooks.append(hook)
+        return hook
+
+    def envelopper_paquet(self, analyser_paquet):
+        """Traitement par paquet instrumenté: hooks de profilage puis minuterie"""
+        for hook in self.hooks:
+            analyser_paquet = hook.envelopper(analyser_paquet)
+        return self.envelopper('analyse_paquet', analyser_paquet)
+
+    def terminer(self):
+        """Termine les hooks (écriture des profils)"""
+        for hook in self.hooks:
+            hook.terminer()
+
+    def secondes(self, nom):
+        minuterie = self.minuteries.get(nom)
+        return minuterie[1] if minuterie else 0.0
+
+    def resume(self, analyseur):
+        """Résumé sérialisable en JSON des mesures et volumes de l'analyse"""
+        duree_analyse = self.secondes('etape.analyse') or (time.perf_counter() - self.debut)
+        return {
+            'fichier': str(analyseur.fichier_pcap),
+            'duree_totale_secondes': round(time.perf_counter() - self.debut, 6),
+            'etapes': {nom[len('etape.'):]: round(secondes, 6)
+                       for nom, (_, secondes) in self.minuteries.items() if nom.startswith('etape.')},
+            'paquets': {
+                'total': analyseur.nb_paquets,
+                'rejetes': analyseur.nb_rejetes,
+                'par_seconde': round(analyseur.nb_paquets / duree_analyse, 1) if duree_analyse else None,
+            },
+            'decodage': self._minuterie_json('decodage'),
+            'analyse_paquet': self._minuterie_json('analyse_paquet'),
+            'detecteurs': {nom: {'appels': appels, 'secondes': round(secondes, 6)}
+                           for nom, appels, secondes in analyseur.temps_detecteurs()},
+            'volumes': {
+                'conversations': len(analyseur.conversations),
+                'flux_termines': analyseur.nb_flux_termines,
+                'requetes_dns': analyseur.nb_requetes_dns,
+                'requetes_dns_conservees': len(analyseur.requetes_dns),
+                'domaines_dns_suivis': len(analyseur.frequences_dns),
+                'flux_suspects': len(analyseur.flux_suspects),
+                'occurrences_alertes': analyseur.flux_suspects.occurrences,
+                'flux_arriere_plan': len(analyseur.flux_arriere_plan),
+                'flux_beaconing': len(analyseur.flux_beaconing),
+            },
+            'compteurs': dict(self.compteurs),
+            'memoire': {
+                'rss_mo': round(rss_courant() / (1 << 20), 1),
+                'rss_max_mo': round(rss_maximal_processus() / (1 << 20), 1),
+            },
+        }
+
+    def _minuterie_json(self, nom):
+        """Minuterie au format JSON (None si jamais utilisée, ex: cache ou mode parallèle)"""
+        minuterie = self.minuteries.get(nom)
+        if minuterie is None:
+            return None
+        appels, secondes = minuterie
+        return {'appels': appels, 'secondes': round(secondes, 6),
+                'us_par_appel': round(secondes / appels * 1e6, 3) if appels else None}
+
+    def ecrire_resume(self, analyseur, chemin):
+        """Écrit le résumé JSON (--profile)"""
+        with open(chemin, 'w', encoding='utf-8') as f:
+            json.dump(self.resume(analyseur), f, indent=2, ensure_ascii=False)
+            f.write('\n')
+
+    def metriques_prometheus(self, analyseur):
+        """Métriques au format texte Prometheus"""
+        lignes = []
+
+        def metrique(nom, type_metrique, aide, valeurs):
+            lignes.append(f"# HELP analyseur_{nom} {aide}")
+            lignes.append(f"# TYPE analyseur_{nom} {type_metrique}")
+            for etiquettes, valeur in valeurs:
+                lignes.append(f"analyseur_{nom}{etiquettes} {valeur}")
+
+        metrique('paquets_total', 'counter', "Paquets lus", [('', analyseur.nb_paquets)])
+        metrique('paquets_rejetes_total', 'counter', "Paquets écartés par le pré-filtre",
+                 [('', analyseur.nb_rejetes or 0)])
+        metrique('conversations', 'gauge', "Flux en mémoire",
+                 [('', len(analyseur.conversations))])
+        metrique('flux_termines_total', 'counter', "Flux expirés et retirés de la table",
+                 [('', analyseur.nb_flux_termines)])
+        metrique('requetes_dns_total', 'counter', "Requêtes DNS analysées",
+                 [('', analyseur.nb_requetes_dns)])
+        metrique('requetes_dns', 'gauge', "Requêtes DNS conservées",
+                 [('', len(analyseur.requetes_dns))])
+        metrique('alertes', 'gauge', "Alertes distinctes", [('', len(analyseur.flux_suspects))])
+        metrique('alertes_occurrences_total', 'counter', "Occurrences d'alertes",
+                 [('', analyseur.flux_suspects.occurrences)])
+        for nom in ('decodage', 'analyse_paquet'):
+            appels, secondes = self.minuteries.get(nom, (0, 0.0))
+            metrique(f'{nom}_secondes_total', 'counter', f"Temps cumulé ({nom})",
+                     [('', round(secondes, 6))])
+        temps = analyseur.temps_detecteurs()
+        metrique('detecteur_appels_total', 'counter', "Appels par détecteur",
+                 [(f'{{detecteur="{nom}"}}', appels) for nom, appels, _ in temps])
+        metrique('detecteur_secondes_total', 'counter', "Temps cumulé par détecteur",
+                 [(f'{{detecteur="{nom}"}}', round(secondes, 6)) for nom, _, secondes in temps])
+        for mesure in ('bytes', 'paquets'):
+            metrique(f'gros_emetteurs_{mesure}', 'gauge',
+                     f"Plus gros émetteurs ({mesure}, majorant Space-Saving)",
+                     [(f'{{dimension="{dimension}",element="{texte}"}}', valeur)
+                      for dimension in DIMENSIONS
+                      for texte, valeur, _ in analyseur.top_emetteurs(dimension, mesure,
+                                                                      EMETTEURS_METRIQUES)])
+        metrique('rss_octets', 'gauge', "Mémoire résidente", [('', rss_courant())])
+        return '\n'.join(lignes) + '\n'
+
+
+class ServeurMetriques:
+    """
+    Endpoint HTTP local exposant /metrics au format Prometheus (mode live)
+
+    Le serveur tourne dans un fil démon et lit l'état de l'analyseur sans
+    verrou: les valeurs sont des instantanés, éventuellement décalés d'un paquet.
+    """
+
+    def __init__(self, instrumentation, analyseur, port, hote='127.0.0.1'):
+        source = (instrumentation, analyseur)
+
+        class Gestionnaire(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] not in ('/metrics', '/'):
+                    self.send_error(404)
+                    return
+                corps = source[0].metriques_prometheus(source[1]).encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(corps)))
+                self.end_headers()
+                self.wfile.write(corps)
+
+            def log_message(self, *args):
+                pass
+
+        self._serveur = ThreadingHTTPServer((hote, port), Gestionnaire)
+        self._serveur.daemon_threads = True
+        self.adresse = f"http://{hote}:{self._serveur.server_address[1]}/metrics"
+        self._fil = threading.Thread(target=self._serveur.serve_forever, daemon=True)
+
+    def demarrer(self):
+        self._fil.start()
+        return self
+
+    def arreter(self):
+        self._serveur.shutdown()
+        self._serveur.server_close()
+
+
+class ProfileurCProfile:
+    """
+    cProfile activé uniquement pendant _analyser_paquet
+
+    Le profil (format pstats) est écrit dans `chemin` à la fin de l'analyse:
+        python -m pstats profil.prof   ou   snakeviz profil.prof
+    """
+
+    def __init__(self, chemin):
+        self.chemin = chemin
+        self.profil = cProfile.Profile()
+
+    def envelopper(self, fonction):
+        profil = self.profil
+
+        def fonction_profilee(paquet):
+            profil.enable()
+            try:
+                return fonction(paquet)
+            finally:
+                profil.disable()
+        return fonction_profilee
+
+    def terminer(self):
+        self.profil.dump_stats(self.chemin)
+        print(f"[✓] Profil cProfile écrit: {self.chemin}")
+
+
+class ProfileurEchantillonnage:
+    """
+    Profileur par échantillonnage de la pile pendant _analyser_paquet
+
+    Un fil relève la pile du fil d'analyse toutes les `periode` secondes,
+    uniquement lorsqu'un paquet est en cours de traitement. Le coût sur le
+    fil d'analyse se limite à deux affectations par paquet. Les piles sont
+    écrites au format « folded » (une pile par ligne suivie de son nombre
+    d'échantillons), lisible par flamegraph.pl ou speedscope.
+    """
+
+    def __init__(self, chemin, periode=PERIODE_ECHANTILLONNAGE):
+        self.chemin = chemin
+        self.periode = periode
+        self.piles = Counter()
+        self._en_cours = None
+        self._code_racine = None
+        self._arret = threading.Event()
+        self._fil = None
+
+    def envelopper(self, fonction):
+        etat = self
+
+        def fonction_echantillonnee(paquet):
+            etat._en_cours = threading.get_ident()
+            try:
+                return fonction(paquet)
+            finally:
+                etat._en_cours = None
+        self._code_racine = fonction_echantillonnee.__code__
+        if self._fil is None:
+            self._fil = threading.Thread(target=self._echantillonner, daemon=True)
+            self._fil.start()
+        return fonction_echantillonnee
+
+    def _echantillonner(self):
+        while not self._arret.wait(self.periode):
+            ident = self._en_cours
+            if ident is None:
+                continue
+            cadre = sys._current_frames().get(ident)
+            pile = []
+            while cadre is not None and cadre.f_code is not self._code_racine:
+                code = cadre.f_code
+                pile.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                cadre = cadre.f_back
+            if cadre is not None:
+                self.piles[';'.join(reversed(pile))] += 1
+
+    def terminer(self):
+        self._arret.set()
+        if self._fil is not None:
+            self._fil.join()
+        with open(self.chemin, 'w', encoding='utf-8') as f:
+            for pile, nombre in self.piles.most_common():
+                f.write(f"_analyser_paquet;{pile} {nombre}\n" if pile else f"_analyser_paquet {nombre}\n")
+        print(f"[✓] Profil par échantillonnage écrit: {self.chemin} "
+              f"({sum(self.piles.values())} échantillons)")
+
+
+def creer_profileur(nom, chemin):
+    """Crée le hook de profilage demandé par --profile-hook"""
+    if nom == 'cprofile':
+        return ProfileurCProfile(chemin)
+    if nom == 'sampling':
+        return ProfileurEchantillonnage(chemin)
+    raise ValueError(f"profileur inconnu: {nom} ({', '.join(PROFILEURS)})")
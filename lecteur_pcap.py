@@ -0,0 +1,736 @@
+#!/usr/bin/env python3
+"""
+Module de lecture native des fichiers de capture
+Parcourt les enregistrements PCAP (libpcap) et PCAPNG sans passer par tshark,
+y compris dans les captures compressées (gzip, zstd, lz4)
+"""
+
+import mmap
+import os
+import struct
+from array import array
+from compression import (TAILLE_LECTURE, compression_fichier, detecter_compression,
+                         ouvrir_decompresse, trame_pour_offset, trames_zstd)
+
+# Nombres magiques des formats supportés
+MAGIC_PCAP_US = 0xa1b2c3d4
+MAGIC_PCAP_NS = 0xa1b23c4d
+MAGIC_PCAPNG = 0x0a0d0d0a
+MAGIC_ORDRE_PCAPNG = 0x1a2b3c4d
+
+# Types de blocs PCAPNG utilisés
+BLOC_SHB = 0x0a0d0d0a
+BLOC_IDB = 0x00000001
+BLOC_OPB = 0x00000002
+BLOC_SPB = 0x00000003
+BLOC_EPB = 0x00000006
+
+TAILLE_ENTETE_PCAP = 24
+TAILLE_ENTETE_ENREGISTREMENT = 16
+
+# Index annexe des enregistrements (fichier <capture>.idx)
+MAGIC_INDEX = b'PIDX'
+VERSION_INDEX = 1
+PAS_INDEX = 1024
+_ENTETE_INDEX = struct.Struct('<4sHHIQQQ')
+
+
+class FormatCaptureInvalide(ValueError):
+    """Levée lorsque le fichier n'est pas un PCAP/PCAPNG exploitable"""
+
+
+def detecter_format(entete):
+    """
+    Identifie le format d'une capture à partir de ses premiers octets
+
+    Returns:
+        'pcap', 'pcapng' ou None si le format n'est pas reconnu
+    """
+    if len(entete) < 4:
+        return None
+    for ordre in ('<', '>'):
+        magic = struct.unpack(ordre + 'I', entete[:4])[0]
+        if magic in (MAGIC_PCAP_US, MAGIC_PCAP_NS):
+            return 'pcap'
+    if struct.unpack('<I', entete[:4])[0] == MAGIC_PCAPNG:
+        return 'pcapng'
+    return None
+
+
+def format_fichier(fichier):
+    """Retourne le format du fichier de capture ('pcap', 'pcapng' ou None), compressé ou non"""
+    with open(fichier, 'rb') as f:
+        entete = f.read(4)
+    if detecter_compression(entete) is not None:
+        try:
+            with ouvrir_decompresse(fichier) as flux:
+                entete = flux.read(4)
+        except (RuntimeError, ValueError):
+            return None  # Module de décompression absent ou données corrompues
+    return detecter_format(entete)
+
+
+def ouvrir_lecteur(fichier):
+    """Lecteur d'une capture: projetée en mémoire, ou décompressée à la volée"""
+    compression = compression_fichier(fichier)
+    if compression is not None:
+        return LecteurCompresse(fichier, compression)
+    return LecteurMmap(fichier)
+
+
+def acces_direct(fichier):
+    """Indique si un offset de la capture peut être atteint sans relire le début (shards)"""
+    with ouvrir_lecteur(fichier) as lecteur:
+        return lecteur.acces_direct
+
+
+def lire_flux_enregistrements(f, nom='<flux>'):
+    """
+    Itère sur les enregistrements d'un flux binaire déjà ouvert (fichier, pipe...)
+    Le flux n'est lu qu'à travers f.read(n).
+
+    Yields:
+        Tuples (timestamp, linktype, donnees, longueur_originale)
+    """
+    entete = f.read(4)
+    format_capture = detecter_format(entete)
+    if format_capture == 'pcap':
+        yield from _lire_pcap(f, entete)
+    elif format_capture == 'pcapng':
+        yield from _lire_pcapng(f, entete)
+    elif entete:
+        raise FormatCaptureInvalide(f"Format de capture non reconnu: {nom}")
+
+
+def _lire_pcap(f, magic):
+    """Lit un fichier au format libpcap classique"""
+    if struct.unpack('<I', magic)[0] in (MAGIC_PCAP_US, MAGIC_PCAP_NS):
+        ordre = '<'
+    else:
+        ordre = '>'
+    nanosecondes = struct.unpack(ordre + 'I', magic)[0] == MAGIC_PCAP_NS
+    diviseur = 1e9 if nanosecondes else 1e6
+
+    reste = f.read(TAILLE_ENTETE_PCAP - 4)
+    if len(reste) < TAILLE_ENTETE_PCAP - 4:
+        raise FormatCaptureInvalide("En-tête PCAP tronqué")
+    linktype = struct.unpack(ordre + 'I', reste[16:20])[0] & 0x0fffffff
+
+    entete_enreg = struct.Struct(ordre + 'IIII')
+    lire = f.read
+    while True:
+        brut = lire(TAILLE_ENTETE_ENREGISTREMENT)
+        if len(brut) < TAILLE_ENTETE_ENREGISTREMENT:
+            return
+        ts_sec, ts_frac, longueur_capturee, longueur_originale = entete_enreg.unpack(brut)
+        donnees = lire(longueur_capturee)
+        if len(donnees) < longueur_capturee:
+            return  # Dernier paquet tronqué
+        yield ts_sec + ts_frac / diviseur, linktype, donnees, longueur_originale
+
+
+def _lire_pcapng(f, magic):
+    """Lit un fichier au format PCAPNG (blocs SHB, IDB, EPB, SPB, OPB)"""
+    ordre = '<'
+    interfaces = []
+    bloc = magic + f.read(8)
+
+    while len(bloc) == 12:
+        type_bloc = struct.unpack('<I', bloc[:4])[0]
+
+        if type_bloc == BLOC_SHB:
+            # L'ordre des octets est défini par chaque section
+            ordre = _ordre_section(bloc[8:12])
+            interfaces = []
+
+        type_bloc, longueur_bloc = struct.unpack(ordre + 'II', bloc[:8])
+        if longueur_bloc < 12:
+            raise FormatCaptureInvalide("Bloc PCAPNG invalide")
+        corps = bloc[8:] + f.read(longueur_bloc - 12)
+        if len(corps) < longueur_bloc - 8:
+            return  # Bloc tronqué en fin de fichier
+
+        if type_bloc == BLOC_IDB:
+            interfaces.append(_lire_interface(corps, ordre))
+        else:
+            enregistrement = _decoder_bloc_paquet(type_bloc, corps, ordre, interfaces)
+            if enregistrement is not None:
+                yield enregistrement
+
+        bloc = f.read(12)
+
+
+def _ordre_section(octets):
+    """Retourne l'ordre des octets d'une section PCAPNG d'après son magic"""
+    if struct.unpack('<I', octets)[0] == MAGIC_ORDRE_PCAPNG:
+        return '<'
+    if struct.unpack('>I', octets)[0] == MAGIC_ORDRE_PCAPNG:
+        return '>'
+    raise FormatCaptureInvalide("Section PCAPNG invalide")
+
+
+def _decoder_bloc_paquet(type_bloc, corps, ordre, interfaces):
+    """
+    Décode un bloc de paquet PCAPNG (EPB, SPB, OPB)
+
+    Args:
+        corps: Contenu du bloc après le champ longueur (longueur finale incluse)
+
+    Returns:
+        Tuple (timestamp, linktype, donnees, longueur_originale) ou None
+    """
+    if type_bloc == BLOC_EPB and len(corps) >= 24:
+        id_interface, ts_haut, ts_bas, longueur_capturee, longueur_originale = \
+            struct.unpack_from(ordre + 'IIIII', corps)
+        if id_interface < len(interfaces):
+            linktype, resolution, decalage = interfaces[id_interface]
+            timestamp = ((ts_haut << 32) | ts_bas) / resolution + decalage
+            return timestamp, linktype, corps[20:20 + longueur_capturee], longueur_originale
+
+    elif type_bloc == BLOC_SPB and len(corps) >= 8 and interfaces:
+        longueur_originale = struct.unpack_from(ordre + 'I', corps)[0]
+        longueur_capturee = min(longueur_originale, len(corps) - 8)
+        return 0.0, interfaces[0][0], corps[4:4 + longueur_capturee], longueur_originale
+
+    elif type_bloc == BLOC_OPB and len(corps) >= 24:
+        id_interface, _, ts_haut, ts_bas, longueur_capturee, longueur_originale = \
+            struct.unpack_from(ordre + 'HHIIII', corps)
+        if id_interface < len(interfaces):
+            linktype, resolution, decalage = interfaces[id_interface]
+            timestamp = ((ts_haut << 32) | ts_bas) / resolution + decalage
+            return timestamp, linktype, corps[20:20 + longueur_capturee], longueur_originale
+
+    return None
+
+
+def _lire_interface(corps, ordre):
+    """
+    Décode un bloc IDB
+
+    Returns:
+        Tuple (linktype, resolution en unités par seconde, décalage en secondes)
+    """
+    linktype = struct.unpack_from(ordre + 'H', corps)[0]
+    resolution = 1e6
+    decalage = 0
+
+    position = 8
+    fin_options = len(corps) - 4  # Le corps se termine par la longueur du bloc
+    while position + 4 <= fin_options:
+        code, longueur = struct.unpack_from(ordre + 'HH', corps, position)
+        position += 4
+        if code == 0:
+            break
+        valeur = corps[position:position + longueur]
+        if code == 9 and longueur >= 1:
+            # if_tsresol: puissance de 10 ou de 2 selon le bit de poids fort
+            exposant = valeur[0] & 0x7f
+            resolution = float(2 ** exposant) if valeur[0] & 0x80 else float(10 ** exposant)
+        elif code == 14 and longueur >= 8:
+            decalage = struct.unpack(ordre + 'q', bytes(valeur[:8]))[0]
+        position += (longueur + 3) & ~3
+
+    return linktype, resolution, decalage
+
+
+class LecteurCapture:
+    """
+    Parcours des enregistrements d'une capture (voir LecteurMmap, LecteurCompresse)
+
+    Les sous-classes fournissent parcourir(offset), close() et acces_direct.
+    """
+
+    def enregistrements(self, plage=None, index=None, segments=None):
+        """
+        Itère sur les enregistrements, éventuellement restreints à une plage temporelle
+
+        Args:
+            plage: Tuple (debut, fin) en secondes epoch, bornes None acceptées
+            index: IndexCapture permettant de sauter les blocs hors de la plage
+            segments: Liste explicite de segments (offset, nombre) à lire
+
+        Yields:
+            Tuples (timestamp, linktype, donnees, longueur_originale)
+        """
+        debut = fin = None
+        if plage is not None:
+            debut, fin = plage
+            debut = float('-inf') if debut is None else debut
+            fin = float('inf') if fin is None else fin
+        if segments is None:
+            if plage is not None and index is not None:
+                segments = index.segments_pour_plage(debut, fin)
+            else:
+                segments = [(None, None)]
+
+        for offset, nombre in segments:
+            parcours = self.parcourir(offset)
+            for rang, (_, timestamp, linktype, donnees, longueur) in enumerate(parcours):
+                if nombre is not None and rang >= nombre:
+                    break
+                if plage is None or debut <= timestamp <= fin:
+                    yield timestamp, linktype, donnees, longueur
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class LecteurMmap(LecteurCapture):
+    """
+    Lecteur de capture projeté en mémoire (mmap)
+
+    Les données de chaque enregistrement sont fournies sous forme de tranches
+    memoryview du fichier projeté: aucune copie n'est faite par paquet.
+    """
+    acces_direct = True
+
+    def __init__(self, fichier):
+        self.fichier = fichier
+        self._fichier = open(fichier, 'rb')
+        try:
+            self._mmap = mmap.mmap(self._fichier.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._fichier.close()
+            raise FormatCaptureInvalide(f"Fichier de capture vide: {fichier}")
+        self.vue = memoryview(self._mmap)
+        self.taille = len(self.vue)
+        self.position_fin = None
+        self.format = detecter_format(self.vue[:4])
+
+        try:
+            if self.format == 'pcap':
+                self._lire_entete_pcap()
+            elif self.format == 'pcapng':
+                self._lire_entete_pcapng()
+            else:
+                raise FormatCaptureInvalide(f"Format de capture non reconnu: {fichier}")
+        except (FormatCaptureInvalide, struct.error):
+            self.close()
+            raise
+
+    def _lire_entete_pcap(self):
+        """Lit l'en-tête global libpcap"""
+        if self.taille < TAILLE_ENTETE_PCAP:
+            raise FormatCaptureInvalide("En-tête PCAP tronqué")
+        magic = bytes(self.vue[:4])
+        self.ordre = '<' if struct.unpack('<I', magic)[0] in (MAGIC_PCAP_US, MAGIC_PCAP_NS) else '>'
+        nanosecondes = struct.unpack(self.ordre + 'I', magic)[0] == MAGIC_PCAP_NS
+        self.diviseur = 1e9 if nanosecondes else 1e6
+        self.linktype = struct.unpack_from(self.ordre + 'I', self.vue, 20)[0] & 0x0fffffff
+        self.debut_donnees = TAILLE_ENTETE_PCAP
+
+    def _lire_entete_pcapng(self):
+        """
+        Relève l'ordre des octets et les interfaces déclarées avant le premier paquet,
+        nécessaires pour reprendre la lecture au milieu du fichier
+        """
+        self.ordre = _ordre_section(self.vue[8:12])
+        self.interfaces = []
+        self.debut_donnees = 0
+        position = 0
+        while position + 12 <= self.taille:
+            type_bloc, longueur_bloc = struct.unpack_from(self.ordre + 'II', self.vue, position)
+            if longueur_bloc < 12:
+                break
+            if type_bloc == BLOC_IDB:
+                self.interfaces.append(
+                    _lire_interface(self.vue[position + 8:position + longueur_bloc], self.ordre))
+            elif type_bloc != BLOC_SHB:
+                break
+            position += longueur_bloc
+
+    def parcourir(self, offset=None):
+        """
+        Parcourt les enregistrements à partir d'un offset (début du fichier par défaut)
+        Un parcours mené à son terme renseigne position_fin: l'offset qui suit le
+        dernier enregistrement complet (reprise de la lecture d'un fichier qui grossit)
+
+        Yields:
+            Tuples (offset, timestamp, linktype, donnees, longueur_originale)
+        """
+        if self.format == 'pcap':
+            return self._parcourir_pcap(self.debut_donnees if offset is None else offset)
+        return self._parcourir_pcapng(offset)
+
+    def _parcourir_pcap(self, position):
+        vue = self.vue
+        taille = self.taille
+        linktype = self.linktype
+        diviseur = self.diviseur
+        entete_enreg = struct.Struct(self.ordre + 'IIII')
+        unpack_from = entete_enreg.unpack_from
+
+        while position + TAILLE_ENTETE_ENREGISTREMENT <= taille:
+            ts_sec, ts_frac, longueur_capturee, longueur_originale = unpack_from(vue, position)
+            debut = position + TAILLE_ENTETE_ENREGISTREMENT
+            fin = debut + longueur_capturee
+            if fin > taille:
+                break  # Dernier paquet tronqué
+            yield position, ts_sec + ts_frac / diviseur, linktype, vue[debut:fin], longueur_originale
+            position = fin
+        self.position_fin = position
+
+    def _parcourir_pcapng(self, position):
+        vue = self.vue
+        taille = self.taille
+        if position is None:
+            position = 0
+            ordre = '<'
+            interfaces = []
+        else:
+            ordre = self.ordre
+            interfaces = list(self.interfaces)
+
+        while position + 12 <= taille:
+            type_bloc = struct.unpack_from('<I', vue, position)[0]
+            if type_bloc == BLOC_SHB:
+                ordre = _ordre_section(vue[position + 8:position + 12])
+                interfaces = []
+            type_bloc, longueur_bloc = struct.unpack_from(ordre + 'II', vue, position)
+            if longueur_bloc < 12:
+                raise FormatCaptureInvalide("Bloc PCAPNG invalide")
+            if position + longueur_bloc > taille:
+                break  # Bloc tronqué en fin de fichier
+
+            corps = vue[position + 8:position + longueur_bloc]
+            if type_bloc == BLOC_IDB:
+                interfaces.append(_lire_interface(corps, ordre))
+            else:
+                enregistrement = _decoder_bloc_paquet(type_bloc, corps, ordre, interfaces)
+                if enregistrement is not None:
+                    yield (position,) + enregistrement
+            position += longueur_bloc
+        self.position_fin = position
+
+    def close(self):
+        """Libère la projection mémoire (différée si des tranches sont encore référencées)"""
+        if self._mmap is None:
+            return
+        self.vue.release()
+        try:
+            self._mmap.close()
+        except BufferError:
+            pass  # Libérée par le ramasse-miettes une fois les tranches détruites
+        self._mmap = None
+        self._fichier.close()
+
+
+class LecteurCompresse(LecteurCapture):
+    """
+    Lecteur d'une capture compressée (gzip, zstd, lz4), décompressée à la volée
+
+    Les offsets sont ceux du flux décompressé. Les enregistrements sont copiés
+    depuis un tampon de compression.TAILLE_TAMPON octets. Un offset est rejoint
+    en avançant dans le flux en cours, depuis la trame zstd qui le contient
+    (fichiers à plusieurs trames), ou en reprenant la décompression au début.
+    """
+
+    def __init__(self, fichier, compression):
+        self.fichier = fichier
+        self.compression = compression
+        self.position_fin = None
+        self.trames = trames_zstd(fichier) if compression == 'zstd' else None
+        # Les shards d'une capture à une seule trame la décompresseraient chacun depuis le début
+        self.acces_direct = self.trames is not None and len(self.trames) > 1
+        self._flux = None
+        self._position = 0
+
+        try:
+            self._rejoindre(0)
+            entete = self._lire(TAILLE_ENTETE_PCAP)
+            if not entete:
+                raise FormatCaptureInvalide(f"Fichier de capture vide: {fichier}")
+            self.format = detecter_format(entete)
+            if self.format == 'pcap':
+                self._lire_entete_pcap(entete)
+            elif self.format == 'pcapng':
+                self._lire_entete_pcapng()
+            else:
+                raise FormatCaptureInvalide(f"Format de capture non reconnu: {fichier}")
+        except (FormatCaptureInvalide, struct.error):
+            self.close()
+            raise
+
+    def _rejoindre(self, offset):
+        """Positionne le flux décompressé sur un offset"""
+        if self._flux is None or offset < self._position:
+            debut_compresse, debut = trame_pour_offset(self.trames, offset) if self.trames else (0, 0)
+            if self._flux is not None:
+                self._flux.close()
+            self._flux = ouvrir_decompresse(self.fichier, self.compression, debut_compresse)
+            self._position = debut
+        while self._position < offset:
+            saut = self._flux.read(min(offset - self._position, TAILLE_LECTURE))
+            if not saut:
+                break
+            self._position += len(saut)
+        return self._flux
+
+    def _lire(self, taille):
+        donnees = self._flux.read(taille)
+        self._position += len(donnees)
+        return donnees
+
+    def _lire_entete_pcap(self, entete):
+        """Lit l'en-tête global libpcap"""
+        if len(entete) < TAILLE_ENTETE_PCAP:
+            raise FormatCaptureInvalide("En-tête PCAP tronqué")
+        self.ordre = '<' if struct.unpack('<I', entete[:4])[0] in (MAGIC_PCAP_US, MAGIC_PCAP_NS) else '>'
+        nanosecondes = struct.unpack(self.ordre + 'I', entete[:4])[0] == MAGIC_PCAP_NS
+        self.diviseur = 1e9 if nanosecondes else 1e6
+        self.linktype = struct.unpack_from(self.ordre + 'I', entete, 20)[0] & 0x0fffffff
+        self.debut_donnees = TAILLE_ENTETE_PCAP
+
+    def _lire_entete_pcapng(self):
+        """Relève l'ordre des octets et les interfaces déclarées avant le premier paquet"""
+        self._rejoindre(0)
+        self.ordre = '<'
+        self.interfaces = []
+        self.debut_donnees = 0
+        while True:
+            bloc = self._lire_bloc(self.ordre)
+            if bloc is None:
+                break
+            ordre, type_bloc, _, corps = bloc
+            if type_bloc == BLOC_SHB:
+                self.ordre = ordre
+            elif type_bloc == BLOC_IDB:
+                self.interfaces.append(_lire_interface(corps, ordre))
+            else:
+                break
+
+    def _lire_bloc(self, ordre):
+        """
+        Bloc PCAPNG suivant du flux
+
+        Returns:
+            Tuple (ordre de sa section, type, longueur, corps), None en fin de flux
+        """
+        entete = self._lire(12)
+        if len(entete) < 12:
+            return None
+        if struct.unpack_from('<I', entete)[0] == BLOC_SHB:
+            ordre = _ordre_section(entete[8:12])
+        type_bloc, longueur_bloc = struct.unpack_from(ordre + 'II', entete)
+        if longueur_bloc < 12:
+            raise FormatCaptureInvalide("Bloc PCAPNG invalide")
+        corps = entete[8:] + self._lire(longueur_bloc - 12)
+        if len(corps) < longueur_bloc - 8:
+            return None  # Bloc tronqué en fin de fichier
+        return ordre, type_bloc, longueur_bloc, corps
+
+    def parcourir(self, offset=None):
+        """
+        Parcourt les enregistrements à partir d'un offset du flux décompressé
+        (voir LecteurMmap.parcourir)
+        """
+        if self.format == 'pcap':
+            return self._parcourir_pcap(self.debut_donnees if offset is None else offset)
+        return self._parcourir_pcapng(offset)
+
+    def _parcourir_pcap(self, position):
+        lire = self._rejoindre(position).read
+        linktype = self.linktype
+        diviseur = self.diviseur
+        unpack = struct.Struct(self.ordre + 'IIII').unpack
+
+        while True:
+            brut = lire(TAILLE_ENTETE_ENREGISTREMENT)
+            if len(brut) < TAILLE_ENTETE_ENREGISTREMENT:
+                self._position = position + len(brut)
+                break
+            ts_sec, ts_frac, longueur_capturee, longueur_originale = unpack(brut)
+            donnees = lire(longueur_capturee)
+            self._position = position + TAILLE_ENTETE_ENREGISTREMENT + len(donnees)
+            if len(donnees) < longueur_capturee:
+                break  # Dernier paquet tronqué
+            yield position, ts_sec + ts_frac / diviseur, linktype, donnees, longueur_originale
+            position = self._position
+        self.position_fin = position
+
+    def _parcourir_pcapng(self, position):
+        if position is None:
+            position = 0
+            ordre = '<'
+            interfaces = []
+        else:
+            ordre = self.ordre
+            interfaces = list(self.interfaces)
+        self._rejoindre(position)
+
+        while True:
+            bloc = self._lire_bloc(ordre)
+            if bloc is None:
+                break
+            ordre, type_bloc, longueur_bloc, corps = bloc
+            if type_bloc == BLOC_SHB:
+                interfaces = []
+            elif type_bloc == BLOC_IDB:
+                interfaces.append(_lire_interface(corps, ordre))
+            else:
+                enregistrement = _decoder_bloc_paquet(type_bloc, corps, ordre, interfaces)
+                if enregistrement is not None:
+                    yield (position,) + enregistrement
+            position += longueur_bloc
+        self.position_fin = position
+
+    def close(self):
+        if self._flux is not None:
+            self._flux.close()
+            self._flux = None
+
+
+class IndexCapture:
+    """
+    Index annexe des enregistrements d'une capture
+
+    Un point d'entrée est conservé tous les PAS_INDEX enregistrements: son offset
+    ainsi que les horodatages minimum et maximum du bloc qu'il ouvre. Les blocs
+    hors d'une plage temporelle peuvent ainsi être sautés sans les lire, même si
+    les horodatages ne sont pas strictement croissants.
+    """
+
+    def __init__(self, pas=PAS_INDEX):
+        self.pas = pas
+        self.offsets = array('Q')
+        self.ts_min = array('d')
+        self.ts_max = array('d')
+        self.nombre_enregistrements = 0
+        self.taille_fichier = 0
+        self.mtime_ns = 0
+
+    @staticmethod
+    def chemin_pour(fichier):
+        """Chemin du fichier d'index associé à une capture"""
+        return fichier + '.idx'
+
+    @classmethod
+    def construire(cls, lecteur, pas=PAS_INDEX):
+        """Construit l'index en ne lisant que les en-têtes d'enregistrements"""
+        index = cls(pas)
+        rang = 0
+        for offset, timestamp, _, _, _ in lecteur.parcourir():
+            if rang % pas == 0:
+                index.offsets.append(offset)
+                index.ts_min.append(timestamp)
+                index.ts_max.append(timestamp)
+            else:
+                if timestamp < index.ts_min[-1]:
+                    index.ts_min[-1] = timestamp
+                if timestamp > index.ts_max[-1]:
+                    index.ts_max[-1] = timestamp
+            rang += 1
+        index.nombre_enregistrements = rang
+        stat = os.stat(lecteur.fichier)
+        index.taille_fichier = stat.st_size
+        index.mtime_ns = stat.st_mtime_ns
+        return index
+
+    def sauvegarder(self, chemin):
+        """Écrit l'index sur disque"""
+        with open(chemin, 'wb') as f:
+            f.write(_ENTETE_INDEX.pack(MAGIC_INDEX, VERSION_INDEX, 0, self.pas,
+                                       self.nombre_enregistrements, self.taille_fichier, self.mtime_ns))
+            self.offsets.tofile(f)
+            self.ts_min.tofile(f)
+            self.ts_max.tofile(f)
+
+    @classmethod
+    def charger(cls, chemin, fichier):
+        """
+        Charge un index existant
+
+        Returns:
+            IndexCapture, ou None si l'index est absent, invalide ou périmé
+        """
+        try:
+            with open(chemin, 'rb') as f:
+                magic, version, _, pas, nombre, taille, mtime_ns = \
+                    _ENTETE_INDEX.unpack(f.read(_ENTETE_INDEX.size))
+                stat = os.stat(fichier)
+                if magic != MAGIC_INDEX or version != VERSION_INDEX or \
+                   taille != stat.st_size or mtime_ns != stat.st_mtime_ns:
+                    return None
+                index = cls(pas)
+                nombre_blocs = (nombre + pas - 1) // pas
+                index.offsets.fromfile(f, nombre_blocs)
+                index.ts_min.fromfile(f, nombre_blocs)
+                index.ts_max.fromfile(f, nombre_blocs)
+        except (OSError, EOFError, struct.error):
+            return None
+        index.nombre_enregistrements = nombre
+        index.taille_fichier = taille
+        index.mtime_ns = mtime_ns
+        return index
+
+    @classmethod
+    def obtenir(cls, lecteur):
+        """Charge l'index annexe de la capture, ou le construit et l'enregistre"""
+        chemin = cls.chemin_pour(lecteur.fichier)
+        index = cls.charger(chemin, lecteur.fichier)
+        if index is None:
+            index = cls.construire(lecteur)
+            try:
+                index.sauvegarder(chemin)
+            except OSError:
+                pass  # Répertoire en lecture seule: l'index reste en mémoire
+        return index
+
+    def blocs_pour_plage(self, debut=float('-inf'), fin=float('inf')):
+        """Rangs des blocs de l'index pouvant contenir des paquets de la plage"""
+        return [i for i in range(len(self.offsets))
+                if self.ts_max[i] >= debut and self.ts_min[i] <= fin]
+
+    def segments_pour_blocs(self, blocs):
+        """
+        Convertit une liste croissante de rangs de blocs en segments
+        (offset, nombre d'enregistrements), les blocs contigus étant fusionnés
+        """
+        segments = []
+        precedent = None
+        for i in blocs:
+            nombre = min(self.pas, self.nombre_enregistrements - i * self.pas)
+            if segments and precedent == i - 1:
+                offset, total = segments[-1]
+                segments[-1] = (offset, total + nombre)
+            else:
+                segments.append((self.offsets[i], nombre))
+            precedent = i
+        return segments
+
+    def segments_pour_plage(self, debut, fin):
+        """Retourne les segments (offset, nombre d'enregistrements) à lire pour une plage"""
+        return self.segments_pour_blocs(self.blocs_pour_plage(debut, fin))
+
+    def decouper(self, nombre_shards, debut=float('-inf'), fin=float('inf')):
+        """
+        Découpe la capture en shards contigus alignés sur les enregistrements
+
+        Returns:
+            Liste de listes de segments, dans l'ordre du fichier
+        """
+        blocs = self.blocs_pour_plage(debut, fin)
+        nombre_shards = max(1, min(nombre_shards, len(blocs)))
+        taille, reste = divmod(len(blocs), nombre_shards)
+        shards = []
+        position = 0
+        for i in range(nombre_shards):
+            fin_shard = position + taille + (1 if i < reste else 0)
+            shards.append(self.segments_pour_blocs(blocs[position:fin_shard]))
+            position = fin_shard
+        return shards
+
+    def position_paquet(self, numero):
+        """
+        Localise le paquet de rang `numero` (à partir de 0)
+
+        Returns:
+            Tuple (offset du bloc, nombre d'enregistrements à sauter)
+        """
+        if not 0 <= numero < self.nombre_enregistrements:
+            raise IndexError(f"Paquet {numero} hors de la capture")
+        bloc = numero // self.pas
+        return self.offsets[bloc], numero - bloc * self.pas
@@ -3,19 +3,214 @@
 Point d'entrée principal pour l'analyseur de trafic PCAP
 """
 
+import argparse
+import os
 import sys
-from analyseur import AnalyseurTraficSuspect
+from contextlib import nullcontext
+from datetime import datetime
+from analyseur import (AnalyseurTraficSuspect, BACKENDS, DELAI_FERMETURE, DELAI_INACTIVITE,
+                       DETECTEURS)
+from exports import FORMATS, exporter
+from cache_analyse import CacheAnalyse, TAILLE_MAX_DEFAUT, analyser_avec_cache, dossier_cache_defaut
+from instrumentation import (EXTENSIONS_PROFIL, PROFILEURS, Instrumentation, ServeurMetriques,
+                             creer_profileur)
+from parallele import analyser_en_parallele
+from reprise import analyser_avec_reprise
+from traitement_lot import analyser_lot
+from temps_reel import AnalyseurTempsReel, FENETRE_DNS, ouvrir_source
 
-def main():
-    if len(sys.argv) < 2:
-        print("Usage: python main.py <fichier.pcap> [rapport_sortie.html]")
-        print("\nExemple:")
-        print("  python main.py capture.pcap")
-        print("  python main.py capture.pcap mon_rapport.html")
-        sys.exit(1)
+def lire_horodatage(texte):
+    """Convertit un horodatage epoch (secondes) ou ISO 8601 en secondes epoch"""
+    try:
+        return float(texte)
+    except ValueError:
+        return datetime.fromisoformat(texte).timestamp()
+
+def lire_plage_temps(texte):
+    """Analyse une plage 'debut,fin' (bornes optionnelles) pour --time-range"""
+    if ',' not in texte:
+        raise argparse.ArgumentTypeError("format attendu: debut,fin")
+    debut, fin = (partie.strip() for partie in texte.split(',', 1))
+    try:
+        return (lire_horodatage(debut) if debut else None,
+                lire_horodatage(fin) if fin else None)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"horodatage invalide: {texte}")
+
+def lire_detecteurs(texte):
+    """Analyse la liste 'dns,ports,...' de --detectors"""
+    noms = tuple(nom.strip() for nom in texte.split(',') if nom.strip())
+    inconnus = [nom for nom in noms if nom not in DETECTEURS]
+    if inconnus or not noms:
+        raise argparse.ArgumentTypeError(f"détecteurs disponibles: {', '.join(DETECTEURS)}")
+    return noms
+
+def lire_formats(texte):
+    """Analyse la liste 'html,jsonl,...' de --format"""
+    formats = tuple(dict.fromkeys(nom.strip().lower() for nom in texte.split(',') if nom.strip()))
+    if not formats or any(nom not in FORMATS for nom in formats):
+        raise argparse.ArgumentTypeError(f"formats disponibles: {', '.join(FORMATS)}")
+    return formats
+
+def construire_parseur():
+    """Construit le parseur des arguments de la ligne de commande"""
+    parseur = argparse.ArgumentParser(
+        description="Analyseur de trafic suspect - détection de flux non désirables (PCAP)",
+        epilog="Exemple:\n  python main.py capture.pcap\n  python main.py capture.pcap mon_rapport.html"
+               "\n  python main.py --batch captures/ --output-dir rapports/",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parseur.add_argument('fichier_pcap', nargs='?', help="Fichier de capture à analyser (PCAP/PCAPNG)")
+    parseur.add_argument('fichier_rapport', nargs='?', default='rapport_analyse.html',
+                         help="Rapport HTML à générer (défaut: rapport_analyse.html)")
+    parseur.add_argument('--format', type=lire_formats, default=('html',), metavar='FORMAT,...',
+                         help=f"Sorties à produire parmi {', '.join(FORMATS)} (défaut: html); "
+                              "les exports sont écrits à côté du rapport (<rapport>_<table>.<ext>)")
+    parseur.add_argument('--full-report', action='store_true',
+                         help="Inclure tous les résultats dans le rapport (tableaux paginés) "
+                              "au lieu des premiers de chaque section")
+    parseur.add_argument('--backend', choices=BACKENDS, default='auto',
+                         help="Décodeur des paquets: natif (rapide), pyshark (tshark) ou auto (défaut)")
+    parseur.add_argument('--time-range', type=lire_plage_temps, metavar='DEBUT,FIN',
+                         help="N'analyser que les paquets de la plage (epoch ou ISO 8601, "
+                              "bornes optionnelles); s'appuie sur l'index <capture>.idx")
+    parseur.add_argument('--suspicious-domains', action='append', default=[], metavar='FICHIER',
+                         help="Liste de domaines / TLD suspects (une entrée par ligne, format hosts "
+                              "accepté), en plus des TLD intégrés; option répétable")
+    parseur.add_argument('--suspicious-keywords', action='append', default=[], metavar='FICHIER',
+                         help="Liste de mots-clés suspects dans les noms de domaine; option répétable")
+    parseur.add_argument('--detectors', type=lire_detecteurs, metavar='NOM,...',
+                         help=f"Détecteurs à exécuter parmi {', '.join(DETECTEURS)} (défaut: tous); "
+                              "les paquets qui n'intéressent aucun d'eux sont écartés sans décodage")
+    parseur.add_argument('--beaconing', action='store_true',
+                         help="Détecter les flux aux intervalles réguliers (balises de C2): "
+                              "statistiques d'intervalles entre salves de paquets pour chaque flux")
+    parseur.add_argument('--pipeline', action='store_true',
+                         help="Avec --backend pyshark: lire les paquets décodés par tshark dans un "
+                              "thread séparé, relié à la détection par une file bornée (sans effet "
+                              "avec le décodeur natif)")
+    parseur.add_argument('--dns-queries', action='store_true',
+                         help="Conserver chaque requête DNS (domaine, horodatage, source) pour les "
+                              "exports; par défaut seules des esquisses en mémoire bornée sont tenues")
+    parseur.add_argument('--detector-timings', action='store_true',
+                         help="Mesurer le nombre d'appels et le temps passé dans chaque détecteur")
+    parseur.add_argument('--workers', type=int, metavar='N',
+                         help="Nombre de processus: shards d'une capture (défaut: 1) "
+                              "ou captures en parallèle avec --batch (défaut: nombre de cœurs)")
+    parseur.add_argument('--batch', metavar='DOSSIER|MOTIF',
+                         help="Analyser toutes les captures d'un répertoire ou d'un motif glob")
+    parseur.add_argument('--output-dir', default='rapports', metavar='DOSSIER',
+                         help="Répertoire des rapports du mode --batch (défaut: rapports)")
+    
+    cache = parseur.add_argument_group("cache d'analyse")
+    cache.add_argument('--no-cache', action='store_true',
+                       help="Ne pas lire ni écrire le cache des analyses")
+    cache.add_argument('--cache-dir', metavar='DOSSIER',
+                       help=f"Répertoire du cache (défaut: {dossier_cache_defaut()})")
+    cache.add_argument('--cache-size', type=int, default=TAILLE_MAX_DEFAUT >> 20, metavar='MO',
+                       help=f"Taille maximale du cache en Mo, les entrées les moins récemment "
+                            f"utilisées sont évincées (défaut: {TAILLE_MAX_DEFAUT >> 20})")
     
-    fichier_pcap = sys.argv[1]
-    fichier_rapport = sys.argv[2] if len(sys.argv) > 2 else 'rapport_analyse.html'
+    reprise = parseur.add_argument_group("reprise incrémentale")
+    reprise.add_argument('--checkpoint', metavar='FICHIER',
+                         help="Reprendre l'analyse au point de reprise FICHIER (créé s'il n'existe "
+                              "pas): seuls les nouveaux paquets de la capture, ou les nouveaux "
+                              "fichiers d'un répertoire / motif glob de fichiers tournants, sont lus")
+    
+    flux = parseur.add_argument_group("suivi des flux")
+    flux.add_argument('--idle-timeout', type=float, default=DELAI_INACTIVITE, metavar='SECONDES',
+                      help=f"Expiration d'un flux sans paquet depuis SECONDES (défaut: {DELAI_INACTIVITE}); "
+                           f"{DELAI_FERMETURE}s après une fermeture TCP (FIN des deux côtés ou RST)")
+    flux.add_argument('--active-timeout', type=float, metavar='SECONDES',
+                      help="Découper les flux plus longs que SECONDES en plusieurs enregistrements "
+                           "(défaut: aucun découpage; impose l'analyse séquentielle)")
+    
+    profil = parseur.add_argument_group("instrumentation")
+    profil.add_argument('--profile', metavar='FICHIER',
+                        help="Écrire un résumé JSON des mesures: temps par étape, décodage, "
+                             "détecteurs, paquets/s, volumes et mémoire (active --detector-timings)")
+    profil.add_argument('--profile-hook', choices=PROFILEURS,
+                        help="Profiler _analyser_paquet avec cProfile (<profil>.prof) ou par "
+                             "échantillonnage de la pile (<profil>.folded)")
+    
+    live = parseur.add_argument_group("mode live")
+    live.add_argument('--live', metavar='SOURCE',
+                      help="Analyse en flux: fichier en cours d'écriture, '-' (stdin) "
+                           "ou répertoire / motif glob de fichiers tournants")
+    live.add_argument('--window', type=float, default=FENETRE_DNS, metavar='SECONDES',
+                      help=f"Fenêtre glissante de la fréquence DNS (défaut: {FENETRE_DNS})")
+    live.add_argument('--follow-timeout', type=float, metavar='SECONDES',
+                      help="Arrêter après SECONDES sans nouvelle donnée (défaut: suivre indéfiniment)")
+    live.add_argument('--metrics-port', type=int, metavar='PORT',
+                      help="Exposer les métriques au format Prometheus sur "
+                           "http://127.0.0.1:PORT/metrics")
+    return parseur
+
+def parametres_detection(args):
+    """Paramètres de détection communs à tous les modes"""
+    return {
+        'listes_domaines': args.suspicious_domains,
+        'listes_mots': args.suspicious_keywords,
+        'detecteurs': args.detectors,
+        'inter_arrivees': args.beaconing,
+        'chronometrer': bool(args.detector_timings or args.profile or args.metrics_port),
+        'delai_inactivite': args.idle_timeout,
+        'delai_actif': args.active_timeout,
+        'conserver_requetes_dns': args.dns_queries,
+        'pipeline': args.pipeline,
+    }
+
+def creer_instrumentation(args):
+    """Instrumentation demandée par --profile / --profile-hook / --metrics-port (sinon None)"""
+    if not (args.profile or args.profile_hook or args.metrics_port):
+        return None
+    instrumentation = Instrumentation()
+    if args.profile_hook:
+        base = os.path.splitext(args.profile or 'profil_analyse.json')[0]
+        instrumentation.attacher(creer_profileur(args.profile_hook,
+                                                 base + EXTENSIONS_PROFIL[args.profile_hook]))
+    return instrumentation
+
+def etape(instrumentation, nom):
+    """Chronomètre une étape si l'instrumentation est active"""
+    return nullcontext() if instrumentation is None else instrumentation.chronometre(f"etape.{nom}")
+
+def terminer_instrumentation(instrumentation, analyseur, args):
+    """Écrit les profils et le résumé JSON de --profile"""
+    if instrumentation is None:
+        return
+    instrumentation.terminer()
+    if args.profile:
+        instrumentation.ecrire_resume(analyseur, args.profile)
+        print(f"[✓] Résumé des mesures écrit: {args.profile}")
+
+def ouvrir_cache(args):
+    """Cache d'analyse configuré par la ligne de commande (None avec --no-cache)"""
+    if args.no_cache:
+        return None
+    return CacheAnalyse(args.cache_dir, args.cache_size << 20)
+
+def ecrire_sorties(analyseur, args):
+    """Écrit le rapport HTML et les exports demandés par --format"""
+    if 'html' in args.format:
+        analyseur.generer_rapport_html(args.fichier_rapport, args.full_report)
+    for fichier in exporter(analyseur, os.path.splitext(args.fichier_rapport)[0], args.format):
+        print(f"[✓] Export écrit: {fichier}")
+
+def main():
+    parseur = construire_parseur()
+    args = parseur.parse_args()
+    if not (args.batch or args.live) and not args.fichier_pcap:
+        parseur.error("un fichier de capture, --batch ou --live est requis")
+    if args.live and args.fichier_pcap:
+        # En mode live, le seul argument positionnel est le rapport
+        args.fichier_rapport = args.fichier_pcap
+    if args.metrics_port is not None and not args.live:
+        parseur.error("--metrics-port n'est disponible qu'en mode --live")
+    if args.checkpoint and (args.batch or args.live):
+        parseur.error("--checkpoint ne s'applique qu'à l'analyse d'une capture")
+    if args.checkpoint and args.backend == 'pyshark':
+        parseur.error("--checkpoint nécessite le décodeur natif (lecture à partir d'un offset)")
     
     print("""
 ╔═══════════════════════════════════════════════════════════════╗
@@ -26,31 +221,114 @@ def main():
 ╚═══════════════════════════════════════════════════════════════╝
     """)
     
+    if args.batch:
+        executer_lot(args)
+    elif args.live:
+        executer_live(args)
+    else:
+        executer_analyse(args)
+
+def executer_live(args):
+    """Mode --live: analyse en flux avec alertes immédiates"""
+    print(f"\n[LIVE] Analyse en flux (Ctrl+C pour arrêter et générer le rapport)...")
+    analyseur = AnalyseurTempsReel(args.live, fenetre_dns=args.window,
+                                   **parametres_detection(args))
+    instrumentation = analyseur.instrumentation = creer_instrumentation(args)
+    serveur = None
+    if args.metrics_port is not None:
+        try:
+            serveur = ServeurMetriques(instrumentation, analyseur, args.metrics_port).demarrer()
+        except OSError as e:
+            print(f"[!] Erreur: impossible d'ouvrir le port {args.metrics_port} ({e})")
+            sys.exit(1)
+        print(f"[*] Métriques Prometheus: {serveur.adresse}")
+    
+    with etape(instrumentation, 'analyse'):
+        analyseur.analyser_flux(ouvrir_source(args.live, args.follow_timeout))
+    if serveur is not None:
+        serveur.arreter()
+    
+    with etape(instrumentation, 'rapport'):
+        ecrire_sorties(analyseur, args)
+    analyseur.afficher_resume()
+    terminer_instrumentation(instrumentation, analyseur, args)
+    if 'html' in args.format:
+        print(f"[✓] Rapport disponible: {args.fichier_rapport}")
+
+def executer_lot(args):
+    """Mode --batch: analyse d'un ensemble de captures"""
+    print(f"\n[LOT] Analyse des captures: {args.batch}")
+    if args.profile or args.profile_hook:
+        print("[!] --profile et --profile-hook ne s'appliquent pas au mode --batch, ignorés")
+    synthese = analyser_lot(args.batch, args.output_dir, args.workers,
+                            dict(parametres_detection(args), backend=args.backend),
+                            cache=ouvrir_cache(args), rapport_complet=args.full_report,
+                            formats=args.format)
+    if synthese is None:
+        sys.exit(1)
+    
+    synthese.afficher_resume()
+    print(f"[✓] Rapports disponibles dans: {args.output_dir}")
+
+def executer_analyse(args):
+    """Analyse d'une capture unique en 4 étapes"""
+    fichier_pcap = args.fichier_pcap
+    fichier_rapport = args.fichier_rapport
+    
     # Créer l'analyseur
-    analyseur = AnalyseurTraficSuspect(fichier_pcap)
+    analyseur = AnalyseurTraficSuspect(fichier_pcap, backend=args.backend,
+                                       plage_temps=args.time_range,
+                                       **parametres_detection(args))
+    instrumentation = analyseur.instrumentation = creer_instrumentation(args)
     
-    # Étape 1: Analyse principale du fichier PCAP
+    # Étape 1: Analyse principale du fichier PCAP (ou restauration depuis le cache)
     print("\n[ÉTAPE 1/4] Analyse des paquets PCAP...")
-    analyseur.analyser()
+    if args.checkpoint:
+        if args.workers and args.workers > 1:
+            print("[!] --workers est ignoré avec --checkpoint (reprise séquentielle)")
+        analyse = lambda: analyser_avec_reprise(analyseur, args.checkpoint)
+    elif args.workers and args.workers > 1:
+        if args.profile_hook:
+            print("[!] --profile-hook ne profile pas les processus workers (utiliser --workers 1)")
+        analyse = lambda: analyser_en_parallele(analyseur, args.workers)
+    else:
+        analyse = analyseur.analyser
+    # Le point de reprise tient lieu de cache
+    cache = None if args.checkpoint else ouvrir_cache(args)
+    with etape(instrumentation, 'analyse'):
+        if cache is None:
+            analyse()
+        elif analyser_avec_cache(analyseur, cache, analyse):
+            print(f"[✓] Résultats restaurés depuis le cache: {analyseur.nb_paquets} paquets")
+            if instrumentation is not None:
+                instrumentation.compter('cache_restaure')
     
     # Étape 2: Détection des flux persistants
     print("\n[ÉTAPE 2/4] Détection des flux persistants...")
-    analyseur.detecter_flux_persistants()
+    with etape(instrumentation, 'flux_persistants'):
+        analyseur.detecter_flux_persistants()
+    if analyseur.inter_arrivees:
+        with etape(instrumentation, 'beaconing'):
+            analyseur.detecter_beaconing()
     
     # Étape 3: Analyse des requêtes DNS
     print("\n[ÉTAPE 3/4] Analyse des fréquences DNS...")
-    analyseur.analyser_frequence_dns()
+    with etape(instrumentation, 'frequence_dns'):
+        analyseur.analyser_frequence_dns()
     
-    # Étape 4: Génération du rapport HTML
-    print("\n[ÉTAPE 4/4] Génération du rapport HTML...")
-    analyseur.generer_rapport_html(fichier_rapport)
+    # Étape 4: Génération du rapport HTML et des exports
+    print("\n[ÉTAPE 4/4] Génération du rapport et des exports...")
+    with etape(instrumentation, 'rapport'):
+        ecrire_sorties(analyseur, args)
     
     # Affichage du résumé
     analyseur.afficher_resume()
+    terminer_instrumentation(instrumentation, analyseur, args)
     
     print(f"\n{'='*70}")
     print(f"[✓] ANALYSE TERMINÉE AVEC SUCCÈS!")
-    print(f"[✓] Rapport disponible: {fichier_rapport}")
+    if 'html' in args.format:
+        print(f"[✓] Rapport disponible: {fichier_rapport}")
     print(f"{'='*70}\n")
 
 
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Module d'analyse parallèle d'une capture
+Découpe un fichier PCAP en shards alignés sur les enregistrements et
+répartit l'analyse paquet par paquet sur plusieurs processus
+"""
+
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from analyseur import AnalyseurTraficSuspect, choisir_backend
+from lecteur_pcap import IndexCapture, acces_direct, ouvrir_lecteur
+
+# Nombre de shards par worker, pour équilibrer la charge entre processus
+SHARDS_PAR_WORKER = 4
+
+
+def _analyser_shard(fichier_pcap, parametres, segments):
+    """Analyse un shard dans un processus worker et retourne son état partiel"""
+    analyseur = AnalyseurTraficSuspect(fichier_pcap, **dict(parametres, backend='natif'))
+    analyseur.analyser_segments(segments)
+    return analyseur.etat_partiel()
+
+
+def decouper_capture(fichier_pcap, nombre_shards, plage_temps=None):
+    """
+    Découpe une capture en shards à l'aide de son index d'enregistrements
+
+    Returns:
+        Liste de shards, chacun étant une liste de segments (offset, nombre)
+    """
+    with ouvrir_lecteur(fichier_pcap) as lecteur:
+        index = IndexCapture.obtenir(lecteur)
+    debut, fin = plage_temps if plage_temps is not None else (None, None)
+    return index.decouper(nombre_shards,
+                          float('-inf') if debut is None else debut,
+                          float('inf') if fin is None else fin)
+
+
+def analyser_en_parallele(analyseur, nb_workers=None):
+    """
+    Remplace analyser() par une analyse répartie sur plusieurs processus
+
+    Chaque worker analyse un shard et renvoie ses stats_protocoles, flux,
+    esquisses DNS et flux_suspects partiels; ceux-ci sont
+    fusionnés dans l'ordre du fichier, le résultat est donc identique à
+    celui d'une analyse séquentielle (aux marges d'erreur près pour les
+    classements des plus gros émetteurs ayant écarté des éléments).
+
+    Args:
+        analyseur: Instance de AnalyseurTraficSuspect à remplir
+        nb_workers: Nombre de processus (défaut: nombre de cœurs)
+    """
+    nb_workers = nb_workers or os.cpu_count() or 1
+    if choisir_backend(analyseur.fichier_pcap, analyseur.backend) != 'natif':
+        print("[!] Le mode parallèle nécessite le décodeur natif, analyse séquentielle")
+        analyseur.analyser()
+        return
+    if analyseur.delai_actif is not None:
+        # Le découpage d'un flux dépend de son premier paquet, inconnu des shards suivants
+        print("[!] --active-timeout est incompatible avec le mode parallèle, analyse séquentielle")
+        analyseur.analyser()
+        return
+
+    try:
+        if not acces_direct(analyseur.fichier_pcap):
+            # Chaque shard devrait décompresser le fichier depuis le début
+            print("[!] Capture compressée sans accès direct (gzip, lz4 ou zstd à une seule trame), "
+                  "analyse séquentielle")
+            analyseur.analyser()
+            return
+    except (OSError, ValueError, RuntimeError):
+        pass  # Erreur signalée par l'analyse
+
+    print(f"[*] Analyse du fichier: {analyseur.fichier_pcap}")
+    debut = time.perf_counter()
+    try:
+        shards = decouper_capture(analyseur.fichier_pcap, nb_workers * SHARDS_PAR_WORKER,
+                                  analyseur.plage_temps)
+    except FileNotFoundError:
+        print(f"[!] Erreur: Fichier '{analyseur.fichier_pcap}' introuvable")
+        sys.exit(1)
+    except (ValueError, RuntimeError) as e:
+        print(f"[!] Erreur lors de l'analyse: {e}")
+        sys.exit(1)
+
+    print(f"[*] {len(shards)} shards répartis sur {nb_workers} processus...")
+    nombre = len(shards)
+    with ProcessPoolExecutor(max_workers=nb_workers) as executeur:
+        resultats = executeur.map(_analyser_shard,
+                                  [analyseur.fichier_pcap] * nombre,
+                                  [analyseur.parametres()] * nombre,
+                                  shards)
+        # map() restitue les résultats dans l'ordre des shards
+        for i, etat in enumerate(resultats, 1):
+            analyseur.fusionner(etat)
+            print(f"[*] Shard {i}/{nombre} fusionné ({analyseur.nb_paquets} paquets)")
+
+    duree = time.perf_counter() - debut
+    print(f"[✓] Analyse terminée: {analyseur.nb_paquets} paquets traités en {duree:.1f}s")
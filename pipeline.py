@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Module de pipeline de décodage pyshark
+La lecture des paquets décodés par tshark s'exécute dans un thread producteur,
+la détection dans le thread appelant; les lots de paquets transitent par une
+file bornée (contre-pression): tshark décode le lot suivant dans son
+sous-processus pendant la détection du lot courant. Avec le décodeur natif,
+décodage et détection partagent le verrou global de Python: le pipeline
+n'apporte rien et n'est pas utilisé (voir AnalyseurTraficSuspect.analyser)
+"""
+
+import queue
+import threading
+
+# Paquets par lot transmis entre étages, et lots en attente au plus dans la file
+TAILLE_LOT = 512
+PROFONDEUR_FILE = 8
+
+# Délai entre deux vérifications de l'arrêt par un producteur bloqué (secondes)
+ATTENTE_ARRET = 0.1
+
+_FIN = object()
+
+
+class ArretPipeline(Exception):
+    """Levée dans le producteur lorsque le consommateur a cessé de lire"""
+
+
+class _Erreur:
+    """Exception du producteur, relancée dans le thread consommateur"""
+
+    def __init__(self, exception):
+        self.exception = exception
+
+
+def paquets_en_pipeline(source, taille_lot=TAILLE_LOT, profondeur=PROFONDEUR_FILE):
+    """
+    Itère les paquets d'une source décodée dans un thread producteur
+
+    Une capture pyshark est lue par son API asynchrone (apply_on_packets
+    exécute la boucle asyncio de tshark dans le thread producteur): un
+    rappel bloqué sur la file pleine suspend la lecture de la sortie de
+    tshark, qui se met lui-même en attente. Toute autre source (itérable de
+    paquets) est itérée dans le producteur.
+
+    Args:
+        source: Capture pyshark ou itérable de paquets
+        taille_lot: Paquets par lot
+        profondeur: Lots en attente au plus (au-delà, le producteur attend)
+
+    Les exceptions du producteur sont relancées par l'itération; fermer le
+    générateur (fin de boucle, erreur, Ctrl+C) arrête le producteur.
+    """
+    file = queue.Queue(maxsize=profondeur)
+    arret = threading.Event()
+
+    def deposer(element):
+        while not arret.is_set():
+            try:
+                file.put(element, timeout=ATTENTE_ARRET)
+                return
+            except queue.Full:
+                continue
+        raise ArretPipeline
+
+    def produire():
+        lot = []
+
+        def recevoir(paquet):
+            lot.append(paquet)
+            if len(lot) >= taille_lot:
+                deposer(lot[:])
+                lot.clear()
+
+        try:
+            if hasattr(source, 'apply_on_packets'):
+                source.apply_on_packets(recevoir)
+            else:
+                for paquet in source:
+                    recevoir(paquet)
+            if lot:
+                deposer(lot)
+            deposer(_FIN)
+        except ArretPipeline:
+            pass
+        except BaseException as e:
+            if not arret.is_set():
+                try:
+                    deposer(_Erreur(e))
+                except ArretPipeline:
+                    pass
+
+    producteur = threading.Thread(target=produire, name='pipeline-decodage', daemon=True)
+    producteur.start()
+    try:
+        while True:
+            lot = file.get()
+            if lot is _FIN:
+                break
+            if isinstance(lot, _Erreur):
+                raise lot.exception
+            yield from lot
+        producteur.join()
+    finally:
+        arret.set()
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Module de pré-filtrage des paquets
+Les détecteurs déclarent les couches et ports dont ils ont besoin; leur union
+est compilée en filtre d'affichage tshark (pyshark) ou en test de rejet
+précoce pour le décodeur natif
+"""
+
+# Couches pouvant être demandées par un détecteur
+COUCHES = ('trame', 'ip', 'tcp', 'udp', 'dns')
+
+
+class Interet:
+    """
+    Besoins d'un détecteur
+
+    Args:
+        couches: Couches nécessaires ('trame' = toute trame, avec sa couche la plus haute)
+        ports_tcp: Ports TCP de destination concernés (None = tous)
+        ports_udp: Ports UDP de destination concernés (None = tous)
+        champs: Champs lus par le détecteur (documentation, ex: 'dns.qry_name')
+    """
+    __slots__ = ('couches', 'ports_tcp', 'ports_udp', 'champs')
+
+    def __init__(self, couches=(), ports_tcp=None, ports_udp=None, champs=()):
+        inconnues = set(couches) - set(COUCHES)
+        if inconnues:
+            raise ValueError(f"couches inconnues: {', '.join(sorted(inconnues))}")
+        self.couches = frozenset(couches)
+        self.ports_tcp = None if ports_tcp is None else frozenset(ports_tcp)
+        self.ports_udp = None if ports_udp is None else frozenset(ports_udp)
+        self.champs = tuple(champs)
+
+
+def _union_ports(interets, couche, attribut):
+    """Union des ports d'une couche (None = tous, ensemble vide = couche non demandée)"""
+    ports = set()
+    for interet in interets:
+        if couche in interet.couches:
+            demandes = getattr(interet, attribut)
+            if demandes is None:
+                return None
+            ports |= demandes
+    return frozenset(ports)
+
+
+class Prefiltre:
+    """
+    Union compilée des besoins des détecteurs actifs
+
+    Attributs consultés par le décodeur natif:
+        toutes_trames: aucun rejet, la couche la plus haute de chaque trame est requise
+        ip: tout paquet IP est requis
+        ports_tcp / ports_udp: ports de destination requis (None = tous)
+        dns: la question DNS doit être décodée
+    """
+
+    def __init__(self, interets):
+        interets = list(interets)
+        self.toutes_trames = any('trame' in i.couches for i in interets)
+        self.ip = self.toutes_trames or any('ip' in i.couches for i in interets)
+        self.dns = any('dns' in i.couches for i in interets)
+        self.ports_tcp = None if self.ip else _union_ports(interets, 'tcp', 'ports_tcp')
+        self.ports_udp = None if self.ip else _union_ports(interets, 'udp', 'ports_udp')
+
+    @property
+    def transport(self):
+        """Indique si des paquets TCP/UDP peuvent être retenus (hors DNS)"""
+        return self.ip or self.ports_tcp is None or self.ports_udp is None \
+            or bool(self.ports_tcp) or bool(self.ports_udp)
+
+    def accepte_tcp(self, srcport, dstport):
+        """Test de rejet précoce d'un segment TCP"""
+        if self.ports_tcp is None or dstport in self.ports_tcp:
+            return True
+        return self.dns and (srcport == 53 or dstport == 53)
+
+    def accepte_udp(self, srcport, dstport):
+        """Test de rejet précoce d'un datagramme UDP"""
+        if self.ports_udp is None or dstport in self.ports_udp:
+            return True
+        return self.dns and (srcport == 53 or dstport == 53)
+
+    def filtre_affichage(self):
+        """
+        Filtre d'affichage tshark équivalent
+
+        Returns:
+            Chaîne du filtre, ou None si toutes les trames sont requises
+        """
+        if self.toutes_trames:
+            return None
+        if self.ip:
+            return 'ip || ipv6'
+        clauses = []
+        if self.dns:
+            clauses.append('dns')
+        for couche, ports in (('tcp', self.ports_tcp), ('udp', self.ports_udp)):
+            if ports is None:
+                clauses.append(couche)
+            elif ports:
+                liste = ' '.join(str(port) for port in sorted(ports))
+                clauses.append(f"{couche}.dstport in {{{liste}}}")
+        return ' || '.join(clauses) or 'frame.number == 0'
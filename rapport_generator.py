@@ -2,26 +2,54 @@
 """
 Module de génération de rapports HTML
 Crée le rapport d'analyse avec les styles CSS
+
+Le document est écrit section par section, ligne de tableau par ligne de
+tableau, dans un fichier tamponné: la mémoire utilisée ne dépend pas du
+nombre de résultats
 """
 
 from datetime import datetime
+from html import escape
+from itertools import islice
 from styles import get_css_styles
-from template_html import get_html_template
 
-def generer_rapport_html(analyseur, fichier_sortie='rapport_analyse.html'):
+# Taille du tampon d'écriture du rapport
+TAILLE_TAMPON = 1 << 20
+
+# Au-delà, les tableaux sont découpés en pages repliables
+LIGNES_PAR_PAGE = 500
+
+# Nombre de lignes affichées par section (sauf rapport complet)
+LIMITE_FLUX_SUSPECTS = 50
+LIMITE_FLUX_ARRIERE_PLAN = 20
+LIMITE_PROTOCOLES = 10
+LIMITE_GROS_EMETTEURS = 10
+
+# Classements des plus gros émetteurs: dimension, titre, texte des éléments affiché en <code>
+SECTIONS_GROS_EMETTEURS = (
+    ('sources', 'Sources', True),
+    ('destinations', 'Destinations', True),
+    ('conversations', 'Conversations', True),
+    ('ports', 'Ports de service', False),
+)
+
+
+def generer_rapport_html(analyseur, fichier_sortie='rapport_analyse.html', complet=False):
     """
     Génère un rapport HTML complet avec les résultats de l'analyse
-    
+
     Args:
         analyseur: Instance de AnalyseurTraficSuspect
         fichier_sortie: Nom du fichier HTML à créer
+        complet: Inclure tous les résultats au lieu des premiers de chaque section
     """
-    
+
     # Récupérer les styles CSS
     css = get_css_styles()
-    
-    # Construire le contenu HTML
-    html = f"""<!DOCTYPE html>
+
+    with open(fichier_sortie, 'w', encoding='utf-8', buffering=TAILLE_TAMPON) as f:
+        ecrire = f.write
+        ecrire(f"""<!DOCTYPE html>
 <html lang="fr">
 <head>
     <meta charset="UTF-8">
@@ -38,49 +66,96 @@ def generer_rapport_html(analyseur, fichier_sortie='rapport_analyse.html'):
             <p>Analyse PCAP - Détection de flux non désirables</p>
             <p style="margin-top: 10px; font-size: 0.9em;">Généré le {datetime.now().strftime('%d/%m/%Y à %H:%M:%S')}</p>
         </div>
-        
+
         <div class="content">
-"""
-    
-    # Section Statistiques Globales
-    html += generer_section_statistiques(analyseur)
-    
-    # Section Flux Suspects
-    html += generer_section_flux_suspects(analyseur)
-    
-    # Section Flux Arrière-plan
-    html += generer_section_flux_arriere_plan(analyseur)
-    
-    # Section Protocoles
-    html += generer_section_protocoles(analyseur)
-    
-    # Section Conclusion
-    html += generer_section_conclusion(analyseur)
-    
-    # Fermer le HTML
-    html += f"""
+""")
+
+        # Section Statistiques Globales
+        ecrire_section_statistiques(ecrire, analyseur)
+
+        # Section Flux Suspects
+        ecrire_section_flux_suspects(ecrire, analyseur, None if complet else LIMITE_FLUX_SUSPECTS)
+
+        # Section Flux Arrière-plan
+        ecrire_section_flux_arriere_plan(ecrire, analyseur,
+                                         None if complet else LIMITE_FLUX_ARRIERE_PLAN)
+
+        # Section Plus Gros Émetteurs
+        ecrire_section_gros_emetteurs(ecrire, analyseur,
+                                      None if complet else LIMITE_GROS_EMETTEURS)
+
+        # Section Protocoles
+        ecrire_section_protocoles(ecrire, analyseur, None if complet else LIMITE_PROTOCOLES)
+
+        # Section Conclusion
+        ecrire_section_conclusion(ecrire, analyseur)
+
+        # Fermer le HTML
+        ecrire(f"""
         </div>
-        
+
         <div class="footer">
             <p>Rapport généré automatiquement par l'Analyseur de Trafic Suspect</p>
-            <p style="margin-top: 5px; font-size: 0.9em;">Fichier analysé: {analyseur.fichier_pcap}</p>
+            <p style="margin-top: 5px; font-size: 0.9em;">Fichier analysé: {escape(str(analyseur.fichier_pcap))}</p>
         </div>
     </div>
 </body>
 </html>
-"""
-    
-    # Écrire le fichier
-    with open(fichier_sortie, 'w', encoding='utf-8') as f:
-        f.write(html)
+""")
 
 
-def generer_section_statistiques(analyseur):
-    """Génère la section des statistiques globales"""
-    return f"""
+def ecrire_tableau(ecrire, entetes, lignes, lignes_par_page=LIGNES_PAR_PAGE):
+    """
+    Écrit un tableau à partir d'un itérable de lignes HTML (<tr>...</tr>)
+
+    Au-delà de `lignes_par_page` lignes, le tableau est découpé en pages
+    repliables (<details>): seule la page courante est gardée en mémoire.
+    """
+    lignes = iter(lignes)
+    page = list(islice(lignes, lignes_par_page))
+    suivante = list(islice(lignes, lignes_par_page))
+    if not suivante:
+        _ecrire_page(ecrire, entetes, page)
+        return
+
+    debut = 1
+    while page:
+        fin = debut + len(page) - 1
+        ouvert = ' open' if debut == 1 else ''
+        ecrire(f'\n                <details class="page"{ouvert}>'
+               f'<summary>Lignes {debut:,} à {fin:,}</summary>')
+        _ecrire_page(ecrire, entetes, page)
+        ecrire('</details>')
+        debut = fin + 1
+        page, suivante = suivante, list(islice(lignes, lignes_par_page))
+
+
+def _ecrire_page(ecrire, entetes, lignes):
+    """Écrit un élément <table> complet"""
+    colonnes = ''.join(f"""
+                            <th>{entete}</th>""" for entete in entetes)
+    ecrire(f"""
+                <table>
+                    <thead>
+                        <tr>{colonnes}
+                        </tr>
+                    </thead>
+                    <tbody>
+""")
+    for ligne in lignes:
+        ecrire(ligne)
+    ecrire("""
+                    </tbody>
+                </table>
+""")
+
+
+def ecrire_section_statistiques(ecrire, analyseur):
+    """Écrit la section des statistiques globales"""
+    rejetes = 'n/d' if analyseur.nb_rejetes is None else analyseur.nb_rejetes
+    ecrire(f"""
             <div class="section">
                 <h2>Statistiques Globales</h2>
-                <div class="stat-grid">
                 <div class="stat-grid">
                     <div class="stat-card">
                         <h3>{len(analyseur.flux_suspects)}</h3>
@@ -91,154 +166,180 @@ def generer_section_statistiques(analyseur):
                         <p>Flux en Arrière-plan</p>
                     </div>
                     <div class="stat-card">
-                        <h3>{len(analyseur.requetes_dns)}</h3>
+                        <h3>{analyseur.nb_requetes_dns}</h3>
                         <p>Requêtes DNS</p>
                     </div>
                     <div class="stat-card">
-                        <h3>{len(analyseur.conversations)}</h3>
-                        <p>Conversations IP</p>
+                        <h3>{analyseur.nb_flux()}</h3>
+                        <p>Flux IP (5-tuple)</p>
+                    </div>
+                    <div class="stat-card">
+                        <h3>{rejetes}</h3>
+                        <p>Paquets Écartés (pré-filtre)</p>
                     </div>
                 </div>
             </div>
+""")
+
+
+def _lignes_flux_suspects(flux_suspects):
+    """Lignes HTML du tableau des flux suspects"""
+    for flux in flux_suspects:
+        severite_class = flux['severite'].lower().replace('é', 'e')
+        yield f"""
+                        <tr>
+                            <td><strong>{escape(flux['type'])}</strong></td>
+                            <td>{escape(flux['detail'])}</td>
+                            <td><span class="badge {severite_class}">{flux['severite']}</span></td>
+                            <td>{flux['occurrences']:,}</td>
+                        </tr>
 """
 
 
-def generer_section_flux_suspects(analyseur):
-    """Génère la section des flux suspects"""
-    html = """
+def ecrire_section_flux_suspects(ecrire, analyseur, limite=None):
+    """Écrit la section des flux suspects (les `limite` premiers, ou tous)"""
+    ecrire("""
             <div class="section">
                 <h2>Flux Suspects Détectés</h2>
-"""
-    
+""")
+
     if analyseur.flux_suspects:
-        html += """
-                <table>
-                    <thead>
-                        <tr>
-                            <th>Type</th>
-                            <th>Détail</th>
-                            <th>Sévérité</th>
-                        </tr>
-                    </thead>
-                    <tbody>
-"""
-        for flux in analyseur.flux_suspects[:50]:  # Limiter à 50 entrées
-            severite_class = flux['severite'].lower().replace('é', 'e')
-            html += f"""
+        ecrire_tableau(ecrire, ('Type', 'Détail', 'Sévérité', 'Occurrences'),
+                       _lignes_flux_suspects(islice(analyseur.flux_suspects, limite)))
+    else:
+        ecrire('<p style="color: #6bcf7f; font-size: 1.2em;">✓ Aucun flux suspect détecté</p>')
+
+    ecrire('</div>')
+
+
+def _lignes_flux_arriere_plan(flux_arriere_plan):
+    """Lignes HTML du tableau des flux persistants"""
+    for flux in flux_arriere_plan:
+        yield f"""
                         <tr>
-                            <td><strong>{flux['type']}</strong></td>
-                            <td>{flux['detail']}</td>
-                            <td><span class="badge {severite_class}">{flux['severite']}</span></td>
+                            <td><code>{escape(flux['conversation'])}</code></td>
+                            <td>{flux['paquets']}</td>
+                            <td>{flux['bytes']:,}</td>
+                            <td>{flux['duree']}</td>
+                            <td>{flux['debit']:,.2f}</td>
                         </tr>
 """
-        html += """
-                    </tbody>
-                </table>
-"""
-    else:
-        html += '<p style="color: #6bcf7f; font-size: 1.2em;">✓ Aucun flux suspect détecté</p>'
-    
-    html += '</div>'
-    return html
 
 
-def generer_section_flux_arriere_plan(analyseur):
-    """Génère la section des flux en arrière-plan"""
-    html = """
+def ecrire_section_flux_arriere_plan(ecrire, analyseur, limite=None):
+    """Écrit la section des flux en arrière-plan (les `limite` plus actifs, ou tous)"""
+    ecrire("""
             <div class="section">
                 <h2>Flux Persistants en Arrière-plan</h2>
                 <div class="alert">
                     <strong>⚠️ Attention:</strong> Ces flux continuent de communiquer alors que l'application est supposée inactive.
                 </div>
-"""
-    
+""")
+
     if analyseur.flux_arriere_plan:
-        html += """
-                <table>
-                    <thead>
-                        <tr>
-                            <th>Conversation</th>
-                            <th>Paquets</th>
-                            <th>Données (bytes)</th>
-                            <th>Durée (s)</th>
-                            <th>Débit (bytes/s)</th>
-                        </tr>
-                    </thead>
-                    <tbody>
-"""
-        for flux in sorted(analyseur.flux_arriere_plan, key=lambda x: x['paquets'], reverse=True)[:20]:
-            html += f"""
+        ecrire_tableau(ecrire, ('Conversation', 'Paquets', 'Données (bytes)', 'Durée (s)',
+                                'Débit (bytes/s)'),
+                       _lignes_flux_arriere_plan(analyseur.top_flux_arriere_plan(limite)))
+    else:
+        ecrire('<p style="color: #6bcf7f; font-size: 1.2em;">✓ Aucun flux persistant anormal détecté</p>')
+
+    ecrire('</div>')
+
+
+def _lignes_gros_emetteurs(classement, code):
+    """Lignes HTML d'un classement (texte, valeur, erreur) des plus gros émetteurs"""
+    for rang, (texte, valeur, erreur) in enumerate(classement, 1):
+        element = f"<code>{escape(texte)}</code>" if code else escape(texte)
+        marge = f"±{erreur:,}" if erreur else "exact"
+        yield f"""
                         <tr>
-                            <td><code>{flux['conversation']}</code></td>
-                            <td>{flux['paquets']}</td>
-                            <td>{flux['bytes']:,}</td>
-                            <td>{flux['duree']}</td>
-                            <td>{flux['debit']:,.2f}</td>
+                            <td>{rang}</td>
+                            <td>{element}</td>
+                            <td>{valeur:,}</td>
+                            <td>{marge}</td>
                         </tr>
 """
-        html += """
-                    </tbody>
-                </table>
-"""
-    else:
-        html += '<p style="color: #6bcf7f; font-size: 1.2em;">✓ Aucun flux persistant anormal détecté</p>'
-    
-    html += '</div>'
-    return html
 
 
-def generer_section_protocoles(analyseur):
-    """Génère la section de répartition des protocoles"""
-    html = """
+def ecrire_section_gros_emetteurs(ecrire, analyseur, limite=None):
+    """
+    Écrit la section des plus gros émetteurs: les `limite` premiers de chaque
+    classement, lus dans les résumés bornés (voir gros_emetteurs.py)
+    """
+    ecrire("""
+            <div class="section">
+                <h2>Plus Gros Émetteurs</h2>
+""")
+
+    emetteurs = analyseur.gros_emetteurs
+    if not emetteurs:
+        ecrire('<p>Aucun paquet IP comptabilisé (détecteur conversations)</p>')
+        ecrire('</div>')
+        return
+
+    for dimension, titre, code in SECTIONS_GROS_EMETTEURS:
+        for mesure, unite in (('bytes', 'Données (bytes)'), ('paquets', 'Paquets')):
+            classement = analyseur.top_emetteurs(dimension, mesure, limite)
+            if not classement:
+                continue
+            ecrire(f"""
+                <h3 style="margin-top: 18px;">{titre} par {'octets' if mesure == 'bytes' else 'paquets'}</h3>""")
+            ecrire_tableau(ecrire, ('Rang', 'Élément', unite, "Marge d'erreur"),
+                           _lignes_gros_emetteurs(classement, code))
+
+    ecrire('</div>')
+
+
+def ecrire_section_protocoles(ecrire, analyseur, limite=None):
+    """Écrit la section de répartition des protocoles"""
+    ecrire("""
             <div class="section">
                 <h2>Répartition des Protocoles</h2>
-"""
-    
+""")
+
     total_paquets = sum(analyseur.stats_protocoles.values())
-    for proto, count in sorted(analyseur.stats_protocoles.items(), key=lambda x: x[1], reverse=True)[:10]:
+    for proto, count in analyseur.top_protocoles(limite):
         pourcentage = (count / total_paquets * 100) if total_paquets > 0 else 0
-        html += f"""
+        ecrire(f"""
                 <div style="margin: 10px 0;">
-                    <p><strong>{proto}</strong> - {count:,} paquets ({pourcentage:.1f}%)</p>
+                    <p><strong>{escape(proto)}</strong> - {count:,} paquets ({pourcentage:.1f}%)</p>
                     <div class="protocole-bar" style="width: {pourcentage}%;">
                         <span>{count:,}</span>
                     </div>
                 </div>
-"""
-    
-    html += '</div>'
-    return html
+""")
+
+    ecrire('</div>')
 
 
-def generer_section_conclusion(analyseur):
-    """Génère la section de conclusion"""
-    html = """
+def ecrire_section_conclusion(ecrire, analyseur):
+    """Écrit la section de conclusion"""
+    ecrire("""
             <div class="section">
                 <h2>Conclusion de l'Analyse</h2>
                 <p style="line-height: 1.8; font-size: 1.1em;">
-"""
-    
+""")
+
     if len(analyseur.flux_suspects) > 10 or len(analyseur.flux_arriere_plan) > 5:
-        html += """
+        ecrire("""
                     <strong style="color: #ff6b6b;">⚠️ Niveau de risque: ÉLEVÉ</strong><br><br>
-                    Plusieurs flux suspects et activités en arrière-plan ont été détectés. 
-                    Il est recommandé d'examiner en détail les applications concernées et de vérifier 
+                    Plusieurs flux suspects et activités en arrière-plan ont été détectés.
+                    Il est recommandé d'examiner en détail les applications concernées et de vérifier
                     leurs permissions d'accès réseau.
-"""
+""")
     elif len(analyseur.flux_suspects) > 0:
-        html += """
+        ecrire("""
                     <strong style="color: #ff9800;">⚠️ Niveau de risque: MODÉRÉ</strong><br><br>
-                    Quelques flux suspects ont été identifiés. Une vérification des applications 
+                    Quelques flux suspects ont été identifiés. Une vérification des applications
                     en arrière-plan est conseillée.
-"""
+""")
     else:
-        html += """
+        ecrire("""
                     <strong style="color: #6bcf7f;">✓ Niveau de risque: FAIBLE</strong><br><br>
                     Aucun flux suspect majeur n'a été détecté. Le trafic analysé semble globalement légitime.
-"""
-    
-    html += """
+""")
+
+    ecrire("""
                 </p>
             </div>
-"""
-    return html
\ No newline at end of file
+""")
@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+Module de reprise incrémentale des analyses
+Après chaque exécution, un point de reprise conserve l'offset atteint dans
+chaque fichier d'un jeu de captures (fichier qui grossit ou fichiers
+tournants) et l'état d'analyse avant détection (flux, esquisses DNS,
+alertes). L'exécution suivante restaure cet état et ne décode que les
+nouveaux enregistrements: le résultat est celui d'une analyse complète.
+"""
+
+import glob
+import gzip
+import hashlib
+import os
+import pickle
+import sys
+from cache_analyse import (VERSION_CACHE, colonnes_vers_conversations, conversations_vers_colonnes,
+                           ecrire_atomique, parametres_resultat)
+from decodeur import VERSION_DECODEUR
+from lecteur_pcap import FormatCaptureInvalide
+
+VERSION_REPRISE = 1
+# Octets de début de fichier identifiant une capture (rotation réutilisant un nom)
+TAILLE_EMPREINTE = 64 << 10
+
+
+def lister_rotation(source):
+    """
+    Fichiers d'un jeu de captures, par date de modification croissante
+
+    Args:
+        source: Fichier unique, répertoire ou motif glob de fichiers tournants
+    """
+    if os.path.isdir(source):
+        chemins = [os.path.join(source, nom) for nom in os.listdir(source)]
+    elif glob.has_magic(source):
+        chemins = glob.glob(source)
+    else:
+        return [source]
+    fichiers = []
+    for chemin in chemins:
+        if chemin.endswith('.idx') or not os.path.isfile(chemin):
+            continue  # Index annexes (voir lecteur_pcap.IndexCapture)
+        try:
+            fichiers.append((os.path.getmtime(chemin), chemin))
+        except OSError:
+            pass  # Supprimé entre-temps par la rotation
+    return [chemin for _, chemin in sorted(fichiers)]
+
+
+def _empreinte(chemin, taille):
+    """Empreinte des `taille` premiers octets d'un fichier"""
+    with open(chemin, 'rb') as f:
+        return hashlib.blake2b(f.read(taille), digest_size=16).hexdigest()
+
+
+def _cle_parametres(analyseur):
+    # L'état enregistré suit le format de celui du cache d'analyse
+    return repr((VERSION_REPRISE, VERSION_CACHE, VERSION_DECODEUR,
+                 sorted(parametres_resultat(analyseur).items())))
+
+
+def charger_point(chemin):
+    """Point de reprise enregistré (None s'il est absent ou illisible)"""
+    try:
+        with gzip.open(chemin, 'rb') as f:
+            return pickle.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, EOFError, pickle.UnpicklingError, ValueError, KeyError) as e:
+        print(f"[!] Point de reprise illisible ({e}): analyse complète")
+        return None
+
+
+def planifier(fichiers, point):
+    """
+    Détermine les lectures restant à faire dans un jeu de captures
+
+    Les fichiers déjà analysés doivent précéder les nouveaux et seul le
+    dernier d'entre eux peut avoir grossi: sinon l'ordre des paquets
+    différerait de celui d'une analyse complète.
+
+    Returns:
+        Liste ordonnée (chemin, offset, entrée du point de reprise ou None),
+        ou None si le point de reprise ne correspond plus au jeu de captures
+    """
+    entrees = point['fichiers']
+    reconnus = {}
+    for rang, entree in enumerate(entrees):
+        try:
+            taille = os.path.getsize(entree['chemin'])
+            if taille >= entree['taille'] \
+                    and _empreinte(entree['chemin'], entree['taille_empreinte']) == entree['empreinte']:
+                reconnus[entree['chemin']] = (rang, taille)
+        except OSError:
+            pass  # Supprimé par la rotation après son analyse
+
+    plan = []
+    nouveaux = False
+    for chemin in fichiers:
+        if chemin not in reconnus:
+            nouveaux = True
+            plan.append((chemin, None, None))
+            continue
+        rang, taille = reconnus[chemin]
+        entree = entrees[rang]
+        if nouveaux or (taille > entree['taille'] and rang != len(entrees) - 1):
+            return None
+        plan.append((chemin, entree['offset'], entree))
+    return plan
+
+
+def analyser_avec_reprise(analyseur, chemin_point):
+    """
+    Analyse le jeu de captures de l'analyseur (fichier_pcap: fichier, répertoire
+    ou motif glob) en reprenant au point de reprise, puis enregistre le nouveau point
+
+    L'état est restauré et enregistré avant les étapes de détection, qui
+    s'exécutent ensuite normalement sur l'état complet.
+    """
+    fichiers = lister_rotation(analyseur.fichier_pcap)
+    if not fichiers:
+        print(f"[!] Erreur: aucune capture ne correspond à '{analyseur.fichier_pcap}'")
+        sys.exit(1)
+
+    cle = _cle_parametres(analyseur)
+    point = charger_point(chemin_point)
+    plan = None
+    if point is not None:
+        if point.get('cle') != cle:
+            print("[!] Point de reprise créé avec d'autres paramètres ou une autre version: "
+                  "analyse complète")
+        else:
+            plan = planifier(fichiers, point)
+            if plan is None:
+                print("[!] Le jeu de captures ne prolonge plus le point de reprise: analyse complète")
+    if plan is None:
+        plan = [(chemin, None, None) for chemin in fichiers]
+    else:
+        etat = point['etat']
+        etat['conversations'] = colonnes_vers_conversations(etat['conversations'])
+        analyseur.fusionner(etat)
+        print(f"[*] Point de reprise: {analyseur.nb_paquets} paquets déjà analysés")
+
+    entrees = []
+    nouveaux = 0
+    try:
+        for chemin, offset, entree in plan:
+            taille = os.path.getsize(chemin)
+            if entree is not None and taille <= entree['taille']:
+                entrees.append(entree)  # Rien de nouveau
+                continue
+            try:
+                lus, position = analyseur.analyser_suite(chemin, offset)
+            except FormatCaptureInvalide as e:
+                if entree is None and taille < TAILLE_EMPREINTE:
+                    # Fichier tout juste créé par la rotation: repris à l'exécution suivante
+                    print(f"[*] {chemin} ignoré pour l'instant ({e})")
+                    break
+                raise
+            nouveaux += lus
+            print(f"[*] {chemin}: {lus} paquets" + (f" à partir de l'offset {offset}" if offset else ""))
+            taille_empreinte = min(TAILLE_EMPREINTE, position)
+            entrees.append({'chemin': chemin, 'offset': position, 'taille': taille,
+                            'taille_empreinte': taille_empreinte,
+                            'empreinte': _empreinte(chemin, taille_empreinte)})
+        analyseur.expirer_flux()
+    except FileNotFoundError as e:
+        print(f"[!] Erreur: Fichier '{e.filename}' introuvable")
+        sys.exit(1)
+    except Exception as e:
+        print(f"[!] Erreur lors de l'analyse: {e}")
+        sys.exit(1)
+    print(f"[✓] Analyse incrémentale terminée: {nouveaux} nouveaux paquets "
+          f"({analyseur.nb_paquets} au total)")
+
+    etat = analyseur.etat_partiel()
+    etat['conversations'] = conversations_vers_colonnes(etat['conversations'])
+    etat.pop('compteurs_detecteurs', None)  # Propres à chaque exécution
+    try:
+        ecrire_atomique(chemin_point, {'cle': cle, 'fichiers': entrees, 'etat': etat})
+        print(f"[✓] Point de reprise écrit: {chemin_point}")
+    except OSError as e:
+        print(f"[!] Impossible d'écrire le point de reprise: {e}")
@@ -122,6 +122,15 @@ def get_css_styles():
             transition: background 0.25s ease;
         }
 
+        details.page { margin-top: 12px; }
+
+        details.page summary {
+            cursor: pointer;
+            color: #9fd8ff;
+            font-weight: 600;
+            padding: 8px 0;
+        }
+
         .badge {
             padding: 6px 14px;
             border-radius: 999px;
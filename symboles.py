@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Module des tables de symboles
+Interne les valeurs répétées (noms de domaine, adresses) en identifiants
+entiers denses, dans l'ordre de première apparition: chaque valeur n'est
+conservée qu'une fois et les enregistrements (requêtes DNS) se réduisent à
+des colonnes d'identifiants. Le texte n'est reconstitué qu'à la lecture.
+"""
+
+from array import array
+from conversations import formater_adresse
+from table_flux import np
+
+
+class TableSymboles:
+    """Valeurs distinctes et leur identifiant (rang de première apparition)"""
+    __slots__ = ('identifiants', 'valeurs')
+
+    def __init__(self, valeurs=()):
+        self.valeurs = list(valeurs)
+        self.identifiants = {valeur: rang for rang, valeur in enumerate(self.valeurs)}
+
+    def __len__(self):
+        return len(self.valeurs)
+
+    def __getitem__(self, identifiant):
+        return self.valeurs[identifiant]
+
+    def __getstate__(self):
+        return (self.valeurs,)  # L'index se reconstruit au chargement
+
+    def __setstate__(self, etat):
+        self.__init__(etat[0])
+
+    def interner(self, valeur):
+        """Identifiant de la valeur, attribué à sa première apparition"""
+        identifiant = self.identifiants.get(valeur)
+        if identifiant is None:
+            identifiant = self.identifiants[valeur] = len(self.valeurs)
+            self.valeurs.append(valeur)
+        return identifiant
+
+    def fusionner(self, autre):
+        """Interne les valeurs d'une autre table; retourne la correspondance de ses identifiants"""
+        return array('I', map(self.interner, autre.valeurs))
+
+
+class RequetesDNS:
+    """
+    Journal compact des requêtes DNS (--dns-queries)
+    Trois colonnes: identifiant du domaine, horodatage, identifiant de
+    l'adresse source (entier de conversations.adresses_couche, None si inconnue)
+    """
+    __slots__ = ('domaines', 'horodatages', 'sources', 'noms', 'adresses')
+
+    def __init__(self):
+        self.domaines = array('I')
+        self.horodatages = array('d')
+        self.sources = array('I')
+        self.noms = TableSymboles()
+        self.adresses = TableSymboles()
+
+    def __len__(self):
+        return len(self.domaines)
+
+    def __iter__(self):
+        """Requêtes (domaine, horodatage, source en texte ou 'Unknown')"""
+        noms = self.noms.valeurs
+        textes = [formater_adresse(adresse) if adresse is not None else 'Unknown'
+                  for adresse in self.adresses.valeurs]
+        for domaine, horodatage, source in zip(self.domaines, self.horodatages, self.sources):
+            yield noms[domaine], horodatage, textes[source]
+
+    def ajouter(self, domaine, horodatage, source):
+        self.domaines.append(self.noms.interner(domaine))
+        self.horodatages.append(horodatage)
+        self.sources.append(self.adresses.interner(source))
+
+    def effectifs(self):
+        """Liste (domaine, nombre de requêtes), dans l'ordre de première apparition"""
+        if np is not None:
+            comptes = np.bincount(np.frombuffer(self.domaines, dtype=np.uint32),
+                                  minlength=len(self.noms)).tolist()
+        else:
+            comptes = [0] * len(self.noms)
+            for domaine in self.domaines:
+                comptes[domaine] += 1
+        return [(nom, compte) for nom, compte in zip(self.noms.valeurs, comptes) if compte]
+
+    def fusionner(self, autre):
+        """Ajoute les requêtes d'un autre journal (portion postérieure de la capture)"""
+        noms = self.noms.fusionner(autre.noms)
+        adresses = self.adresses.fusionner(autre.adresses)
+        self.domaines.extend(noms[domaine] for domaine in autre.domaines)
+        self.horodatages.extend(autre.horodatages)
+        self.sources.extend(adresses[source] for source in autre.sources)
+
+    def supprimer_avant(self, limite):
+        """Supprime les premières requêtes antérieures à `limite` (fenêtre du mode live)"""
+        debut = 0
+        while debut < len(self.horodatages) and self.horodatages[debut] < limite:
+            debut += 1
+        if not debut:
+            return
+        del self.domaines[:debut]
+        del self.horodatages[:debut]
+        del self.sources[:debut]
+        if len(self.noms) > 2 * len(self.domaines) + 1024:
+            self._compacter()
+
+    def _compacter(self):
+        """Reconstruit les tables avec les seuls symboles encore référencés"""
+        noms, adresses = self.noms, self.adresses
+        self.noms, self.adresses = TableSymboles(), TableSymboles()
+        self.domaines = array('I', (self.noms.interner(noms[domaine]) for domaine in self.domaines))
+        self.sources = array('I', (self.adresses.interner(adresses[source])
+                                   for source in self.sources))
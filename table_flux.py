@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""
+Module de table de flux en colonnes (NumPy, optionnel)
+Stocke les conversations sous forme de tableaux et effectue les passes de
+détection (flux persistants, débits, top-N) par opérations vectorisées
+"""
+
+from conversations import (BITS_CLE, VALEURS_CLASSES_IAT, StatsConversation, StatsConversationIAT,
+                           adresses_flux, cle_capture, cle_flux, formater_flux)
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# En dessous de ce nombre de conversations, les boucles Python restent plus rapides
+SEUIL_VECTORISATION = 5000
+
+COLONNES = ('src', 'dst', 'sport', 'dport', 'proto', 'capture',
+            'first_ts', 'last_ts', 'packets', 'bytes',
+            'packets_haut', 'bytes_haut', 'initiateur_bas', 'etat')
+COLONNES_IAT = ('iat_n', 'iat_moyenne', 'iat_m2', 'iat_nb_classes')
+
+
+def numpy_disponible():
+    """Indique si NumPy est installé"""
+    return np is not None
+
+
+def _exiger_numpy():
+    if np is None:
+        raise RuntimeError("NumPy n'est pas installé (pip install numpy)")
+
+
+class TableFlux:
+    """
+    Table de flux en colonnes
+
+    Les adresses (entiers jusqu'à 129 bits) sont stockées une seule fois dans
+    `adresses`; les colonnes src et dst contiennent leurs indices. src/sport
+    désignent l'initiateur du flux, dst/dport le répondeur (ports nuls hors
+    TCP/UDP). La colonne capture conserve l'indice de la capture d'origine
+    des flux d'une synthèse de lot (0 sinon, voir conversations.cle_capture).
+    Un horodatage absent est représenté par NaN.
+
+    Les esquisses d'intervalles entre salves (flux avec inter-arrivées) sont
+    concaténées ligne après ligne dans `esquisse_iat` = (classes, effectifs),
+    la colonne iat_nb_classes donnant le nombre de classes de chaque ligne.
+    """
+
+    def __init__(self, adresses, colonnes, esquisse_iat=None):
+        self.adresses = adresses
+        self.colonnes = colonnes
+        self.esquisse_iat = esquisse_iat
+
+    def __len__(self):
+        return len(self.colonnes['packets'])
+
+    def __getitem__(self, nom):
+        return self.colonnes[nom]
+
+    @classmethod
+    def depuis_conversations(cls, conversations):
+        """Construit la table à partir du dictionnaire de flux de l'analyseur"""
+        _exiger_numpy()
+        nombre = len(conversations)
+        indices = {}
+        adresses = []
+
+        def indice(adresse):
+            position = indices.get(adresse)
+            if position is None:
+                position = indices[adresse] = len(adresses)
+                adresses.append(adresse)
+            return position
+
+        src = np.empty(nombre, dtype=np.int32)
+        dst = np.empty(nombre, dtype=np.int32)
+        sport = np.empty(nombre, dtype=np.uint16)
+        dport = np.empty(nombre, dtype=np.uint16)
+        proto = np.empty(nombre, dtype=np.uint8)
+        for i, (cle, s) in enumerate(conversations.items()):
+            proto[i], adresse_src, sport[i], adresse_dst, dport[i] = adresses_flux(cle, s.initiateur_bas)
+            src[i] = indice(adresse_src)
+            dst[i] = indice(adresse_dst)
+
+        stats = list(conversations.values())
+        nan = float('nan')
+        colonnes = {
+            'src': src,
+            'dst': dst,
+            'sport': sport,
+            'dport': dport,
+            'proto': proto,
+            'capture': np.fromiter((cle >> BITS_CLE for cle in conversations), dtype=np.uint32,
+                                   count=nombre),
+            'first_ts': np.fromiter((nan if s.premier_ts is None else s.premier_ts for s in stats),
+                                    dtype=np.float64, count=nombre),
+            'last_ts': np.fromiter((nan if s.dernier_ts is None else s.dernier_ts for s in stats),
+                                   dtype=np.float64, count=nombre),
+            'packets': np.fromiter((s.paquets for s in stats), dtype=np.int64, count=nombre),
+            'bytes': np.fromiter((s.bytes for s in stats), dtype=np.int64, count=nombre),
+            'packets_haut': np.fromiter((s.paquets_haut for s in stats), dtype=np.int64, count=nombre),
+            'bytes_haut': np.fromiter((s.bytes_haut for s in stats), dtype=np.int64, count=nombre),
+            'initiateur_bas': np.fromiter((s.initiateur_bas for s in stats), dtype=np.bool_, count=nombre),
+            'etat': np.fromiter((s.etat for s in stats), dtype=np.uint16, count=nombre),
+        }
+        esquisse = None
+        if stats and isinstance(stats[0], StatsConversationIAT):
+            colonnes['iat_n'] = np.fromiter((s.iat_n for s in stats), dtype=np.int64, count=nombre)
+            colonnes['iat_moyenne'] = np.fromiter((s.iat_moyenne for s in stats),
+                                                  dtype=np.float64, count=nombre)
+            colonnes['iat_m2'] = np.fromiter((s.iat_m2 for s in stats), dtype=np.float64, count=nombre)
+            colonnes['iat_nb_classes'] = np.fromiter((len(s.iat_classes or ()) for s in stats),
+                                                     dtype=np.int32, count=nombre)
+            # Classes triées dans chaque ligne: les cumuls sont croissants par ligne
+            paires = [paire for s in stats for paire in sorted((s.iat_classes or {}).items())]
+            esquisse = (np.fromiter((classe for classe, _ in paires), dtype=np.int16, count=len(paires)),
+                        np.fromiter((effectif for _, effectif in paires), dtype=np.int64,
+                                    count=len(paires)))
+        return cls(adresses, colonnes, esquisse)
+
+    def vers_conversations(self):
+        """Reconstruit le dictionnaire de flux (clé entière -> StatsConversation)"""
+        _exiger_numpy()
+        iat = 'iat_n' in self.colonnes
+        classe = StatsConversationIAT if iat else StatsConversation
+        c = self.colonnes
+        conversations = {}
+        premiers = c['first_ts'].tolist()
+        derniers = c['last_ts'].tolist()
+        paquets = c['packets'].tolist()
+        octets = c['bytes'].tolist()
+        paquets_haut = c['packets_haut'].tolist()
+        octets_haut = c['bytes_haut'].tolist()
+        initiateurs = c['initiateur_bas'].tolist()
+        etats = c['etat'].tolist()
+        if iat:
+            classes, effectifs = (valeurs.tolist() for valeurs in self.esquisse_iat)
+            debut = 0
+        for i in range(len(self)):
+            stats = classe()
+            stats.premier_ts = None if premiers[i] != premiers[i] else premiers[i]
+            stats.dernier_ts = None if derniers[i] != derniers[i] else derniers[i]
+            stats.paquets = paquets[i]
+            stats.bytes = octets[i]
+            stats.paquets_haut = paquets_haut[i]
+            stats.bytes_haut = octets_haut[i]
+            stats.initiateur_bas = initiateurs[i]
+            stats.etat = etats[i]
+            if iat:
+                stats.iat_n = int(c['iat_n'][i])
+                stats.iat_moyenne = float(c['iat_moyenne'][i])
+                stats.iat_m2 = float(c['iat_m2'][i])
+                nb_classes = int(c['iat_nb_classes'][i])
+                if nb_classes:
+                    stats.iat_classes = dict(zip(classes[debut:debut + nb_classes],
+                                                 effectifs[debut:debut + nb_classes]))
+                    debut += nb_classes
+            conversations[self.cle(i)] = stats
+        return conversations
+
+    def cle(self, i):
+        """Clé de flux de la ligne i"""
+        c = self.colonnes
+        cle = cle_flux(int(c['proto'][i]), self.adresses[c['src'][i]], int(c['sport'][i]),
+                       self.adresses[c['dst'][i]], int(c['dport'][i]))[0]
+        return cle_capture(cle, int(c['capture'][i]))
+
+    def libelle(self, i):
+        """Texte 'initiateur → répondeur' du flux de la ligne i"""
+        return formater_flux(self.cle(i), bool(self.colonnes['initiateur_bas'][i]))
+
+    def quantiles_iat(self, quantiles):
+        """
+        Quantiles approchés des intervalles entre salves de chaque flux, en une
+        passe vectorisée sur les esquisses (même définition que
+        conversations.quantile_classes; NaN pour un flux sans intervalle)
+
+        Returns:
+            Liste de tableaux, un par quantile demandé
+        """
+        _exiger_numpy()
+        classes, effectifs = self.esquisse_iat
+        totaux = self.colonnes['iat_n']
+        # Cumul global des effectifs: la ligne i occupe ]base_i, base_i + total_i]
+        cumul = np.cumsum(effectifs)
+        debuts = np.cumsum(self.colonnes['iat_nb_classes']) - self.colonnes['iat_nb_classes']
+        bases = np.concatenate(([0], cumul))[debuts]
+        valeurs = np.asarray(VALEURS_CLASSES_IAT)
+        avec_intervalles = totaux > 0
+        resultats = []
+        for q in quantiles:
+            rangs = np.maximum(1, np.ceil(q * totaux)).astype(np.int64)
+            positions = np.searchsorted(cumul, bases + rangs, side='left')
+            positions = np.minimum(positions, max(len(cumul) - 1, 0))
+            resultat = np.full(len(self), np.nan)
+            if len(cumul):
+                resultat[avec_intervalles] = valeurs[classes[positions[avec_intervalles]]]
+            resultats.append(resultat)
+        return resultats
+
+    def durees(self):
+        """Durée de chaque flux (0 si non horodaté)"""
+        durees = self.colonnes['last_ts'] - self.colonnes['first_ts']
+        return np.nan_to_num(durees, nan=0.0)
+
+    def debits(self, durees=None):
+        """Débit moyen en octets/s de chaque flux (0 pour une durée nulle)"""
+        durees = self.durees() if durees is None else durees
+        debits = np.zeros(len(self), dtype=np.float64)
+        np.divide(self.colonnes['bytes'], durees, out=debits, where=durees > 0)
+        return debits
+
+    def masque_persistants(self, seuil_paquets, seuil_duree, durees=None):
+        """Masque des flux de plus de `seuil_paquets` paquets durant plus de `seuil_duree` secondes"""
+        durees = self.durees() if durees is None else durees
+        return (self.colonnes['packets'] > seuil_paquets) & (durees > seuil_duree)
+
+
+def indices_top(valeurs, n):
+    """
+    Indices des n plus grandes valeurs, par ordre décroissant
+    (à égalité, l'ordre d'origine est conservé comme avec sorted())
+    """
+    _exiger_numpy()
+    valeurs = np.asarray(valeurs)
+    if n <= 0 or len(valeurs) == 0:
+        return np.empty(0, dtype=np.intp)
+    if n < len(valeurs):
+        # Seuil du n-ième plus grand, puis tri stable des candidats
+        seuil = valeurs[np.argpartition(-valeurs, n - 1)[n - 1]]
+        candidats = np.flatnonzero(valeurs >= seuil)
+    else:
+        candidats = np.arange(len(valeurs))
+    ordre = np.argsort(-valeurs[candidats], kind='stable')
+    return candidats[ordre][:n]
+
@@ -0,0 +1,309 @@
+#!/usr/bin/env python3
+"""
+Module d'analyse en flux (mode live)
+Lit une capture en cours d'écriture, un pipe (stdin) ou un jeu de fichiers
+tournants, met à jour les détecteurs au fil de l'eau et émet les alertes dès
+qu'un seuil est franchi
+"""
+
+import glob
+import os
+import sys
+import time
+from collections import deque
+from analyseur import (AnalyseurTraficSuspect, DELAI_INACTIVITE, SEUIL_DUREE_PERSISTANT,
+                       SEUIL_FREQUENCE_DNS, SEUIL_PAQUETS_PERSISTANT)
+from decodeur import decoder_trame
+from filtre_domaines import domaine_parent
+from lecteur_pcap import lire_flux_enregistrements
+
+# Paramètres par défaut du mode live (secondes de capture)
+FENETRE_DNS = 300
+INTERVALLE_MAINTENANCE = 10
+MAX_ALERTES = 10000
+
+
+class FichierSuivi:
+    """
+    Fichier lu pendant son écriture (équivalent de tail -f)
+
+    read(n) attend que n octets soient disponibles. L'attente s'interrompt
+    lorsque `doit_changer()` indique qu'un fichier plus récent a pris le
+    relais, ou après `arret_inactivite` secondes sans nouvelle donnée.
+    """
+
+    def __init__(self, chemin, intervalle=0.2, arret_inactivite=None, doit_changer=None):
+        self.chemin = chemin
+        self._fichier = open(chemin, 'rb')
+        self.intervalle = intervalle
+        self.arret_inactivite = arret_inactivite
+        self.doit_changer = doit_changer or (lambda: False)
+
+    def read(self, n):
+        morceaux = []
+        manquant = n
+        attente = 0.0
+        while manquant > 0:
+            donnees = self._fichier.read(manquant)
+            if donnees:
+                morceaux.append(donnees)
+                manquant -= len(donnees)
+                attente = 0.0
+                continue
+            if self.doit_changer():
+                break
+            if self.arret_inactivite is not None and attente >= self.arret_inactivite:
+                break
+            time.sleep(self.intervalle)
+            attente += self.intervalle
+        return b''.join(morceaux)
+
+    def close(self):
+        self._fichier.close()
+
+
+def enregistrements_stdin():
+    """Enregistrements lus sur l'entrée standard (tcpdump -w - | python main.py --live -)"""
+    yield from lire_flux_enregistrements(sys.stdin.buffer, '<stdin>')
+
+
+def enregistrements_fichier_suivi(chemin, arret_inactivite=None):
+    """Enregistrements d'un fichier en cours d'écriture"""
+    fichier = FichierSuivi(chemin, arret_inactivite=arret_inactivite)
+    try:
+        yield from lire_flux_enregistrements(fichier, chemin)
+    finally:
+        fichier.close()
+
+
+def enregistrements_tournants(motif, arret_inactivite=None):
+    """
+    Enregistrements d'un jeu de fichiers tournants (tcpdump -C/-G/-W)
+
+    Les fichiers sont lus par date de modification croissante; le fichier
+    courant est suivi jusqu'à ce qu'un fichier plus récent apparaisse.
+    """
+    def lister():
+        if os.path.isdir(motif):
+            chemins = [os.path.join(motif, nom) for nom in os.listdir(motif)]
+        else:
+            chemins = glob.glob(motif)
+        fichiers = []
+        for chemin in chemins:
+            try:
+                fichiers.append((os.path.getmtime(chemin), chemin))
+            except OSError:
+                pass  # Supprimé entre-temps par la rotation
+        return sorted(fichiers)
+
+    courant = None
+    mtime_courant = float('-inf')
+    while True:
+        suivants = [(mtime, chemin) for mtime, chemin in lister()
+                    if mtime > mtime_courant and chemin != courant]
+        if not suivants:
+            if arret_inactivite is not None:
+                return
+            time.sleep(1)
+            continue
+        mtime_courant, courant = suivants[0]
+
+        def plus_recent(courant=courant):
+            return any(chemin != courant and mtime > os.path.getmtime(courant)
+                       for mtime, chemin in lister())
+
+        fichier = FichierSuivi(courant, arret_inactivite=arret_inactivite, doit_changer=plus_recent)
+        try:
+            yield from lire_flux_enregistrements(fichier, courant)
+        finally:
+            fichier.close()
+        try:
+            mtime_courant = os.path.getmtime(courant)
+        except OSError:
+            pass
+        if arret_inactivite is not None and not plus_recent():
+            return
+
+
+def ouvrir_source(source, arret_inactivite=None):
+    """
+    Retourne le générateur d'enregistrements correspondant à la source
+
+    Args:
+        source: '-' (stdin), un fichier, ou un répertoire / motif glob de fichiers tournants
+    """
+    if source == '-':
+        return enregistrements_stdin()
+    if os.path.isfile(source):
+        return enregistrements_fichier_suivi(source, arret_inactivite)
+    return enregistrements_tournants(source, arret_inactivite)
+
+
+class AnalyseurTempsReel(AnalyseurTraficSuspect):
+    """
+    Analyseur incrémental
+
+    - les flux persistants sont signalés dès qu'ils franchissent les seuils
+    - le beaconing (inter_arrivees) est évalué à l'expiration de chaque flux
+    - la fréquence DNS est évaluée sur une fenêtre glissante, les tunnels DNS
+      à chaque maintenance
+    - les flux inactifs ou fermés sont expirés (voir AnalyseurTraficSuspect)
+      pour borner la mémoire
+    """
+
+    def __init__(self, source, fenetre_dns=FENETRE_DNS, delai_inactivite=DELAI_INACTIVITE,
+                 sur_alerte=None, **kwargs):
+        super().__init__(source, delai_inactivite=delai_inactivite, **kwargs)
+        self.fenetre_dns = fenetre_dns
+        self.sur_alerte = sur_alerte or afficher_alerte
+        self.horloge = 0.0
+        self._prochaine_maintenance = None
+        # Horodatages récents par domaine, bornés au seuil de fréquence
+        self._fenetres_dns = {}
+        # Domaines parents interrogés depuis la dernière évaluation des tunnels DNS
+        self._parents_dns_recents = set()
+        # Domaine parent -> dernière requête, pour expirer ses esquisses et son signalement
+        self._derniers_parents_dns = {}
+        self._tunnels_signales = set()
+        # Flux en table déjà signalés -> leur entrée dans flux_arriere_plan
+        self._conversations_signalees = {}
+        self._dernieres_emissions = {}
+        self.flux_suspects.rappel = self._sur_occurrence_alerte
+
+    def analyser_flux(self, enregistrements):
+        """Consomme les enregistrements jusqu'à la fin du flux ou Ctrl+C"""
+        print(f"[*] Analyse en flux de: {self.fichier_pcap}")
+        decoder, traiter = decoder_trame, self._analyser_paquet
+        if self.instrumentation is not None:
+            # L'attente de nouvelles données n'est pas comptée dans le décodage
+            decoder = self.instrumentation.envelopper('decodage', decoder_trame)
+            traiter = self.instrumentation.envelopper_paquet(self._analyser_paquet)
+        try:
+            for timestamp, linktype, donnees, longueur in enregistrements:
+                self.nb_paquets += 1
+                self.horloge = max(self.horloge, timestamp)
+                paquet = decoder(linktype, donnees, timestamp, longueur, self.prefiltre)
+                if paquet is None:
+                    self.nb_rejetes += 1
+                else:
+                    traiter(paquet)
+                if self._prochaine_maintenance is None:
+                    self._prochaine_maintenance = self.horloge + INTERVALLE_MAINTENANCE
+                elif self.horloge >= self._prochaine_maintenance:
+                    self.maintenance()
+                    self._prochaine_maintenance = self.horloge + INTERVALLE_MAINTENANCE
+        except KeyboardInterrupt:
+            print("\n[*] Arrêt demandé")
+        except Exception as e:
+            print(f"[!] Erreur lors de l'analyse: {e}")
+        if self.inter_arrivees:
+            # Flux encore actifs à l'arrêt
+            for cle, stats in self.conversations.items():
+                self._retenir_beaconing(cle, stats)
+        self._signaler_tunnels_dns()
+        print(f"[✓] Flux terminé: {self.nb_paquets} paquets traités")
+
+    def _analyser_conversation(self, paquet):
+        resultat = super()._analyser_conversation(paquet)
+        if resultat is None:
+            return None
+        # Signalement immédiat des flux persistants (mêmes seuils qu'en fin d'analyse)
+        cle, stats = resultat
+        if stats.paquets > SEUIL_PAQUETS_PERSISTANT and stats.duree > SEUIL_DUREE_PERSISTANT \
+           and cle not in self._conversations_signalees:
+            flux = self._conversations_signalees[cle] = self._decrire_flux(cle, stats)
+            self.flux_arriere_plan.append(flux)
+            self.sur_alerte({
+                'type': 'Flux persistant',
+                'detail': f"{flux['conversation']}: {flux['paquets']} paquets en {flux['duree']}s",
+                'severite': 'MOYENNE',
+                'timestamp': self.horloge,
+            })
+        return resultat
+
+    def _cloturer_flux(self, cle, stats, evaluer=True):
+        flux = self._conversations_signalees.pop(cle, None)
+        if flux is None:
+            super()._cloturer_flux(cle, stats, evaluer)
+            return
+        # Flux déjà signalé: son entrée reçoit les statistiques finales
+        self.nb_flux_termines += 1
+        flux.update(self._decrire_flux(cle, stats))
+        if self.inter_arrivees:
+            self._retenir_beaconing(cle, stats)
+
+    def _retenir_beaconing(self, cle, stats):
+        # Alerte émise dès l'expiration du flux
+        balise = super()._retenir_beaconing(cle, stats)
+        if balise is not None:
+            self._alerter_beaconing(balise)
+        return balise
+
+    def _analyser_dns(self, paquet):
+        super()._analyser_dns(paquet)
+        try:
+            domaine = paquet.dns.qry_name
+        except AttributeError:
+            return
+        parent = domaine_parent(domaine)
+        self._parents_dns_recents.add(parent)
+        self._derniers_parents_dns[parent] = self.horloge
+        # Seuil identique à analyser_frequence_dns, appliqué à la fenêtre glissante
+        fenetre = self._fenetres_dns.get(domaine)
+        if fenetre is None:
+            fenetre = self._fenetres_dns[domaine] = deque(maxlen=SEUIL_FREQUENCE_DNS + 1)
+        fenetre.append(self.horloge)
+        if len(fenetre) == fenetre.maxlen and self.horloge - fenetre[0] <= self.fenetre_dns:
+            self.flux_suspects.ajouter(('DNS Fréquent', None, domaine, None), {
+                'type': 'DNS Fréquent',
+                'detail': f"{domaine} contacté plus de {SEUIL_FREQUENCE_DNS} fois en {self.fenetre_dns}s "
+                          "(possible DNS tunneling)",
+                'severite': 'MOYENNE',
+                'timestamp': self.horloge,
+            }, occurrences=len(fenetre))
+            fenetre.clear()
+
+    def _sur_occurrence_alerte(self, cle):
+        """Transmet une alerte à sa première occurrence, puis au plus une fois par fenêtre"""
+        derniere = self._dernieres_emissions.get(cle)
+        if derniere is None or self.horloge - derniere > self.fenetre_dns:
+            self._dernieres_emissions[cle] = self.horloge
+            self.sur_alerte(self.flux_suspects.alerte(cle))
+
+    def _signaler_tunnels_dns(self):
+        """Évalue les domaines parents interrogés récemment et signale les nouveaux tunnels DNS"""
+        for tunnel in self._evaluer_tunnels_dns(self._parents_dns_recents):
+            if tunnel['domaine'] not in self._tunnels_signales:
+                self._tunnels_signales.add(tunnel['domaine'])
+                self._alerter_tunnel_dns(tunnel, self.horloge)
+        self._parents_dns_recents.clear()
+
+    def maintenance(self):
+        """Expire les états inactifs pour borner la mémoire"""
+        self.expirer_flux(self.horloge)
+        self._signaler_tunnels_dns()
+
+        limite_dns = self.horloge - self.fenetre_dns
+        for domaine in [d for d, f in self._fenetres_dns.items() if not f or f[-1] < limite_dns]:
+            del self._fenetres_dns[domaine]
+        self.requetes_dns.supprimer_avant(limite_dns)
+        # Parents sans requête depuis une fenêtre: un tunnel qui reprend est signalé à nouveau
+        for parent in [p for p, t in self._derniers_parents_dns.items() if t < limite_dns]:
+            del self._derniers_parents_dns[parent]
+            self.sous_domaines_dns.pop(parent, None)
+            self.echantillons_dns.pop(parent, None)
+            self._tunnels_signales.discard(parent)
+
+        for cle in [c for c, t in self._dernieres_emissions.items() if t < limite_dns]:
+            del self._dernieres_emissions[cle]
+        self.flux_suspects.limiter(MAX_ALERTES)
+        # Flux persistants et de beaconing: seuls les plus récemment signalés sont conservés
+        for flux in (self.flux_arriere_plan, self.flux_beaconing):
+            del flux[:-MAX_ALERTES]
+
+
+def afficher_alerte(alerte):
+    """Affichage par défaut d'une alerte dans le terminal"""
+    horodatage = time.strftime('%H:%M:%S', time.localtime(alerte['timestamp'])) \
+        if alerte['timestamp'] else '--:--:--'
+    print(f"[ALERTE {alerte['severite']}] {horodatage} {alerte['type']}: {alerte['detail']}")
@@ -0,0 +1,26 @@
+"""Configuration commune des tests: modules du dépôt et générateur de captures importables"""
+
+import os
+import sys
+
+RACINE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for chemin in (RACINE, os.path.join(RACINE, 'bench')):
+    if chemin not in sys.path:
+        sys.path.insert(0, chemin)
+
+
+def resultats(analyseur):
+    """Résultats comparables d'une analyse (après détection des flux persistants et DNS)"""
+    analyseur.detecter_flux_persistants()
+    analyseur.analyser_frequence_dns()
+    return {
+        'nb_paquets': analyseur.nb_paquets,
+        'stats_protocoles': dict(analyseur.stats_protocoles),
+        'nb_flux': analyseur.nb_flux(),
+        'conversations': {cle: (stats.paquets, stats.bytes, stats.premier_ts, stats.dernier_ts)
+                          for cle, stats in analyseur.conversations.items()},
+        'flux_arriere_plan': analyseur.flux_arriere_plan,
+        'nb_requetes_dns': analyseur.nb_requetes_dns,
+        'flux_suspects': sorted(list(analyseur.flux_suspects),
+                                key=lambda alerte: (alerte['type'], str(alerte['dst']))),
+    }
@@ -0,0 +1,48 @@
+"""Captures compressées: zstd à plusieurs trames découpé en shards"""
+
+import pytest
+
+from analyseur import AnalyseurTraficSuspect
+from compression import trame_pour_offset, trames_zstd
+from conftest import resultats
+from generateur_pcap import generer_capture
+from lecteur_pcap import acces_direct
+from parallele import analyser_en_parallele
+
+zstandard = pytest.importorskip('zstandard')
+
+TAILLE_TRAME = 64 << 10
+
+
+@pytest.fixture(scope='module')
+def captures(tmp_path_factory):
+    dossier = tmp_path_factory.mktemp('zstd')
+    brut = dossier / 'capture.pcap'
+    generer_capture(brut, 20000, nb_flux=64, graine=7)
+    donnees = brut.read_bytes()
+    compresseur = zstandard.ZstdCompressor(write_content_size=True)
+    multi = dossier / 'multi.pcap.zst'
+    multi.write_bytes(b''.join(compresseur.compress(donnees[i:i + TAILLE_TRAME])
+                               for i in range(0, len(donnees), TAILLE_TRAME)))
+    unique = dossier / 'unique.pcap.zst'
+    unique.write_bytes(compresseur.compress(donnees))
+    return brut, multi, unique
+
+
+def test_trames(captures):
+    brut, multi, unique = captures
+    taille = brut.stat().st_size
+    trames = trames_zstd(multi)
+    assert [decompresse for _, decompresse in trames] == list(range(0, taille, TAILLE_TRAME))
+    assert trame_pour_offset(trames, TAILLE_TRAME + 1) == trames[1]
+    assert acces_direct(str(multi))
+    assert not acces_direct(str(unique))
+
+
+def test_shards_identiques_a_l_analyse_sequentielle(captures):
+    brut, multi, _ = captures
+    sequentiel = AnalyseurTraficSuspect(str(brut))
+    sequentiel.analyser()
+    parallele = AnalyseurTraficSuspect(str(multi))
+    analyser_en_parallele(parallele, nb_workers=2)
+    assert resultats(parallele) == resultats(sequentiel)
@@ -0,0 +1,73 @@
+"""Analyse par shards: états partiels (etat_partiel) fusionnés dans l'ordre du fichier"""
+
+import pickle
+
+import pytest
+
+from analyseur import AnalyseurTraficSuspect
+from conftest import resultats
+from conversations import StatsConversationIAT
+from generateur_pcap import generer_capture
+from parallele import analyser_en_parallele, decouper_capture
+
+
+@pytest.fixture(scope='module')
+def capture(tmp_path_factory):
+    chemin = str(tmp_path_factory.mktemp('fusion') / 'capture.pcapng')
+    generer_capture(chemin, 30000, nb_flux=48, graine=11, pcapng=True)
+    return chemin
+
+
+def _resultats_complets(analyseur):
+    resume = resultats(analyseur)
+    if analyseur.inter_arrivees:
+        analyseur.detecter_beaconing()
+        resume['flux_beaconing'] = analyseur.flux_beaconing
+    return resume
+
+
+@pytest.mark.parametrize('parametres', [
+    {},
+    {'inter_arrivees': True},
+    # Expirations en cours de shard: les flux coupés sont recollés à la fusion
+    {'inter_arrivees': True, 'delai_inactivite': 2},
+])
+def test_fusion_des_shards(capture, parametres):
+    sequentiel = AnalyseurTraficSuspect(capture, **parametres)
+    sequentiel.analyser()
+
+    fusion = AnalyseurTraficSuspect(capture, **parametres)
+    shards = decouper_capture(capture, 7)
+    assert len(shards) == 7
+    for segments in shards:
+        shard = AnalyseurTraficSuspect(capture, **dict(parametres, backend='natif'))
+        shard.analyser_segments(segments)
+        # États transmis entre processus: sérialisables
+        fusion.fusionner(pickle.loads(pickle.dumps(shard.etat_partiel())))
+
+    attendu = _resultats_complets(sequentiel)
+    assert attendu['flux_arriere_plan']
+    assert _resultats_complets(fusion) == attendu
+
+
+def test_fusion_d_un_flux_coupe():
+    entier, debut, fin = StatsConversationIAT(), StatsConversationIAT(), StatsConversationIAT()
+    for i in range(40):
+        timestamp = 100.0 + i * 1.5 + (i % 3) * 0.1
+        taille, haut, drapeaux = 60 + i, bool(i % 2), 0x02 if i == 0 else 0x10
+        entier.ajouter(timestamp, taille, haut, drapeaux)
+        (debut if i < 17 else fin).ajouter(timestamp, taille, haut, drapeaux)
+    debut.fusionner(fin)
+    for attribut in ('premier_ts', 'dernier_ts', 'paquets', 'bytes', 'paquets_haut', 'bytes_haut',
+                     'initiateur_bas', 'etat', 'iat_n', 'iat_classes'):
+        assert getattr(debut, attribut) == getattr(entier, attribut), attribut
+    assert debut.iat_moyenne == pytest.approx(entier.iat_moyenne)
+    assert debut.iat_m2 == pytest.approx(entier.iat_m2)
+
+
+def test_analyse_parallele(capture):
+    sequentiel = AnalyseurTraficSuspect(capture)
+    sequentiel.analyser()
+    parallele = AnalyseurTraficSuspect(capture)
+    analyser_en_parallele(parallele, nb_workers=2)
+    assert resultats(parallele) == resultats(sequentiel)
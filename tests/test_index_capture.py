@@ -0,0 +1,71 @@
+"""Index annexe (.idx) des captures: construction, persistance et lectures partielles"""
+
+import itertools
+import os
+
+import pytest
+
+from generateur_pcap import generer_capture
+from lecteur_pcap import PAS_INDEX, IndexCapture, ouvrir_lecteur
+
+NOMBRE = 5000
+
+
+@pytest.fixture(params=['pcap', 'pcapng'])
+def capture(request, tmp_path):
+    chemin = str(tmp_path / f"capture.{request.param}")
+    generer_capture(chemin, NOMBRE, nb_flux=32, graine=3, pcapng=request.param == 'pcapng')
+    return chemin
+
+
+def _tous(chemin):
+    with ouvrir_lecteur(chemin) as lecteur:
+        return list(lecteur.enregistrements())
+
+
+def test_construction_et_persistance(capture):
+    with ouvrir_lecteur(capture) as lecteur:
+        index = IndexCapture.obtenir(lecteur)
+    assert os.path.exists(IndexCapture.chemin_pour(capture))
+    assert index.nombre_enregistrements == NOMBRE
+    assert len(index.offsets) == -(-NOMBRE // PAS_INDEX)
+
+    charge = IndexCapture.charger(IndexCapture.chemin_pour(capture), capture)
+    assert (charge.offsets, charge.ts_min, charge.ts_max) == (index.offsets, index.ts_min, index.ts_max)
+    assert charge.nombre_enregistrements == NOMBRE
+
+
+def test_index_perime(capture):
+    with ouvrir_lecteur(capture) as lecteur:
+        IndexCapture.obtenir(lecteur)
+    stat = os.stat(capture)
+    os.utime(capture, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    assert IndexCapture.charger(IndexCapture.chemin_pour(capture), capture) is None
+
+
+def test_plage_temporelle(capture):
+    tous = _tous(capture)
+    plage = (tous[1500][0], tous[3200][0])
+    attendus = [enregistrement for enregistrement in tous if plage[0] <= enregistrement[0] <= plage[1]]
+    with ouvrir_lecteur(capture) as lecteur:
+        index = IndexCapture.obtenir(lecteur)
+        assert len(index.segments_pour_plage(*plage)) == 1
+        assert sum(nombre for _, nombre in index.segments_pour_plage(*plage)) < NOMBRE
+        assert list(lecteur.enregistrements(plage, index)) == attendus
+
+
+def test_decoupage_et_position(capture):
+    tous = _tous(capture)
+    with ouvrir_lecteur(capture) as lecteur:
+        index = IndexCapture.obtenir(lecteur)
+        shards = index.decouper(3)
+        assert len(shards) == 3
+        lus = [enregistrement for segments in shards
+               for enregistrement in lecteur.enregistrements(segments=segments)]
+        assert lus == tous
+
+        offset, saut = index.position_paquet(2000)
+        _, timestamp, _, donnees, _ = next(itertools.islice(lecteur.parcourir(offset), saut, None))
+        assert (timestamp, donnees) == tous[2000][0:3:2]
+        with pytest.raises(IndexError):
+            index.position_paquet(NOMBRE)
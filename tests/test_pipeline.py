@@ -0,0 +1,29 @@
+"""Pipeline pyshark: ordre des paquets, erreurs du producteur, décodeur natif"""
+
+import pytest
+
+from analyseur import AnalyseurTraficSuspect
+from generateur_pcap import generer_capture
+from pipeline import paquets_en_pipeline
+
+
+def test_ordre_et_lots_partiels():
+    assert list(paquets_en_pipeline(range(1300), taille_lot=512, profondeur=1)) == list(range(1300))
+
+
+def test_erreur_du_producteur():
+    def source():
+        yield from range(10)
+        raise ValueError("capture tronquée")
+
+    with pytest.raises(ValueError, match="capture tronquée"):
+        list(paquets_en_pipeline(source(), taille_lot=4))
+
+
+def test_ignore_avec_le_decodeur_natif(tmp_path, capsys):
+    chemin = str(tmp_path / 'capture.pcap')
+    generer_capture(chemin, 2000, graine=2)
+    analyseur = AnalyseurTraficSuspect(chemin, pipeline=True)
+    analyseur.analyser()
+    assert analyseur.nb_paquets == 2000
+    assert "--pipeline est sans effet avec le décodeur natif" in capsys.readouterr().out
@@ -0,0 +1,79 @@
+"""Reprise incrémentale (--checkpoint): même résultat qu'une analyse complète"""
+
+import pytest
+
+from analyseur import AnalyseurTraficSuspect
+from conftest import resultats
+from generateur_pcap import ecrire_pcap, generer_paquets
+from reprise import analyser_avec_reprise, charger_point
+
+NOMBRE = 30000
+
+
+@pytest.fixture(scope='module')
+def paquets():
+    return list(generer_paquets(NOMBRE, nb_flux=48, graine=5))
+
+
+def _reprise(source, point, **parametres):
+    analyseur = AnalyseurTraficSuspect(str(source), **parametres)
+    analyser_avec_reprise(analyseur, str(point))
+    return analyseur
+
+
+def _complet(source, **parametres):
+    analyseur = AnalyseurTraficSuspect(str(source), **parametres)
+    analyseur.analyser()
+    return analyseur
+
+
+@pytest.mark.parametrize('parametres', [{}, {'inter_arrivees': True}])
+def test_fichier_qui_grossit(tmp_path, paquets, parametres):
+    capture, point = tmp_path / 'capture.pcap', tmp_path / 'capture.ckpt'
+    ecrire_pcap(capture, paquets[:NOMBRE // 2])
+    assert _reprise(capture, point, **parametres).nb_paquets == NOMBRE // 2
+
+    ecrire_pcap(capture, paquets)
+    reprise = _reprise(capture, point, **parametres)
+    assert charger_point(str(point))['fichiers'][0]['taille'] == capture.stat().st_size
+    assert resultats(reprise) == resultats(_complet(capture, **parametres))
+
+
+def test_fichiers_tournants(tmp_path, paquets, capsys):
+    dossier = tmp_path / 'ring'
+    dossier.mkdir()
+    point = tmp_path / 'ring.ckpt'
+    ecrire_pcap(dossier / 'trace_1.pcap', paquets[:NOMBRE // 3])
+    _reprise(dossier, point)
+    ecrire_pcap(dossier / 'trace_2.pcap', paquets[NOMBRE // 3:])
+    capsys.readouterr()
+    reprise = _reprise(dossier, point)
+    assert f"{NOMBRE // 3} paquets déjà analysés" in capsys.readouterr().out
+
+    ecrire_pcap(tmp_path / 'complet.pcap', paquets)
+    assert resultats(reprise) == resultats(_complet(tmp_path / 'complet.pcap'))
+
+
+def test_point_invalide(tmp_path, paquets, capsys):
+    dossier = tmp_path / 'ring'
+    dossier.mkdir()
+    point = tmp_path / 'ring.ckpt'
+    ecrire_pcap(dossier / 'trace_1.pcap', paquets[:1000])
+    _reprise(dossier, point)
+
+    # Autres paramètres d'analyse: analyse complète
+    capsys.readouterr()
+    assert _reprise(dossier, point, inter_arrivees=True).nb_paquets == 1000
+    assert "autres paramètres" in capsys.readouterr().out
+
+    # Nom réutilisé par la rotation (début différent): nouvelle capture, l'état est conservé
+    ecrire_pcap(dossier / 'trace_1.pcap', paquets[1000:3000])
+    assert _reprise(dossier, point, inter_arrivees=True).nb_paquets == 3000
+
+    # Un fichier analysé qui grossit alors qu'il n'est plus le dernier: analyse complète
+    ecrire_pcap(dossier / 'trace_2.pcap', paquets[3000:4000])
+    _reprise(dossier, point, inter_arrivees=True)
+    ecrire_pcap(dossier / 'trace_1.pcap', paquets[1000:3500])
+    capsys.readouterr()
+    assert _reprise(dossier, point, inter_arrivees=True).nb_paquets == 3500
+    assert "ne prolonge plus" in capsys.readouterr().out
@@ -0,0 +1,40 @@
+"""Mode live: états bornés par la maintenance"""
+
+from types import SimpleNamespace
+
+from temps_reel import AnalyseurTempsReel
+
+
+def _requete(domaine):
+    return SimpleNamespace(dns=SimpleNamespace(qry_name=domaine), sniff_timestamp='0')
+
+
+def _analyseur():
+    return AnalyseurTempsReel('-', fenetre_dns=60, sur_alerte=lambda alerte: None)
+
+
+def test_parents_dns_expires_apres_la_fenetre():
+    analyseur = _analyseur()
+    for i in range(300):
+        analyseur._analyser_dns(_requete(f"{i:032x}{i:016x}.tunnel.example"))
+    analyseur.horloge = 30.0
+    analyseur._analyser_dns(_requete('www.actif.example'))
+    analyseur.maintenance()
+    assert analyseur._tunnels_signales == {'tunnel.example'}
+
+    analyseur.horloge = 61.0
+    analyseur.maintenance()
+    assert 'tunnel.example' not in analyseur.sous_domaines_dns
+    assert 'tunnel.example' not in analyseur.echantillons_dns
+    assert not analyseur._tunnels_signales
+    assert set(analyseur.sous_domaines_dns) == {'actif.example'}
+
+
+def test_flux_signales_bornes(monkeypatch):
+    monkeypatch.setattr('temps_reel.MAX_ALERTES', 5)
+    analyseur = _analyseur()
+    analyseur.flux_arriere_plan.extend({'conversation': i} for i in range(12))
+    analyseur.flux_beaconing.extend({'conversation': i} for i in range(3))
+    analyseur.maintenance()
+    assert [flux['conversation'] for flux in analyseur.flux_arriere_plan] == list(range(7, 12))
+    assert [flux['conversation'] for flux in analyseur.flux_beaconing] == list(range(3))
@@ -0,0 +1,56 @@
+"""Synthèse du traitement par lot: flux distincts par capture, détections DNS sur tout le lot"""
+
+import socket
+
+import pytest
+
+from analyseur import AnalyseurTraficSuspect
+from generateur_pcap import _question_dns, _trame, ecrire_pcap
+from table_flux import np
+from traitement_lot import analyser_lot
+
+CLIENT = socket.inet_aton('10.0.0.1')
+SERVEUR = socket.inet_aton('10.0.0.2')
+RESOLVEUR = socket.inet_aton('10.0.0.53')
+
+
+def _capture(chemin, debut, premier_sous_domaine):
+    """Un flux TCP persistant (même 5-tuple dans chaque capture) et 12 requêtes d'un tunnel hex"""
+    paquets = [(debut + i * 0.5, _trame(CLIENT, SERVEUR, 6, 40000, 443, b'x' * 64)) for i in range(60)]
+    for i in range(premier_sous_domaine, premier_sous_domaine + 12):
+        domaine = f"{i:032x}{i * 7919:016x}.tunnel.example"
+        paquets.append((debut + i, _trame(CLIENT, RESOLVEUR, 17, 50000 + i, 53, _question_dns(i, domaine))))
+    ecrire_pcap(chemin, sorted(paquets, key=lambda paquet: paquet[0]))
+
+
+def test_synthese(tmp_path):
+    _capture(tmp_path / 'a.pcap', 1_700_000_000.0, 0)
+    _capture(tmp_path / 'b.pcap', 1_700_000_100.0, 12)
+    synthese = analyser_lot(str(tmp_path), str(tmp_path / 'rapports'), nb_workers=1, formats=())
+
+    # Le flux TCP de chaque capture reste distinct: 2 flux TCP et 24 flux DNS
+    assert synthese.nb_flux() == len(synthese.conversations) == 26
+    assert [flux['paquets'] for flux in synthese.flux_arriere_plan] == [60, 60]
+
+    # 12 sous-domaines par capture: sous le seuil d'un fichier, tunnel sur le lot
+    alertes = [alerte for alerte in synthese.flux_suspects if alerte['type'] == 'DNS Tunneling']
+    assert [alerte['dst'] for alerte in alertes] == ['tunnel.example']
+    assert alertes[0]['occurrences'] == 1
+
+
+@pytest.mark.skipif(np is None, reason="NumPy n'est pas installé")
+def test_table_de_flux_de_la_synthese(tmp_path):
+    _capture(tmp_path / 'a.pcap', 1_700_000_000.0, 0)
+    analyseur = AnalyseurTraficSuspect(str(tmp_path / 'a.pcap'))
+    analyseur.analyser()
+    synthese = AnalyseurTraficSuspect('synthese')
+    for capture in range(2):
+        synthese.fusionner(analyseur.etat_partiel(), capture)
+    assert len(synthese.conversations) == 2 * len(analyseur.conversations)
+
+    # Aller-retour par la table en colonnes: les flux des deux captures restent distincts
+    attendu = {cle: (stats.paquets, stats.bytes, stats.premier_ts, stats.dernier_ts)
+               for cle, stats in synthese.conversations.items()}
+    synthese.from_numpy(synthese.to_numpy())
+    assert {cle: (stats.paquets, stats.bytes, stats.premier_ts, stats.dernier_ts)
+            for cle, stats in synthese.conversations.items()} == attendu
@@ -0,0 +1,97 @@
+"""Détection des tunnels DNS: calibrage des critères et accord des passes vectorisée et nom par nom"""
+
+import random
+from types import SimpleNamespace
+
+import pytest
+
+import analyseur as module_analyseur
+from analyseur import AnalyseurTraficSuspect, SCORE_TUNNEL, score_tunnel
+from table_flux import np
+from tunnel_dns import caracteriser, caracteriser_lot
+
+BASE32 = 'abcdefghijklmnopqrstuvwxyz234567'
+HEX = '0123456789abcdef'
+BASE64 = 'ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789'
+ALPHANUMERIQUE = 'abcdefghijklmnopqrstuvwxyz0123456789'
+
+
+def _noms(alphabet, longueurs, nombre, parent, graine):
+    """`nombre` noms distincts dont les étiquettes aléatoires ont les longueurs données"""
+    aleatoire = random.Random(graine)
+    noms = set()
+    while len(noms) < nombre:
+        etiquettes = [''.join(aleatoire.choice(alphabet) for _ in range(longueur))
+                      for longueur in longueurs]
+        noms.add('.'.join(etiquettes + [parent]))
+    return sorted(noms)
+
+
+FAMILLES = {
+    # iodine: base32 minuscule, 48 caractères en étiquettes de 30 et 18
+    'iodine.example': (BASE32, (30, 18), True),
+    'hex.example': (HEX, (32, 16), True),
+    'b64.example': (BASE64, (30, 12), True),
+    # Noms de CDN légitimes (a1b2c3.cloudfront.net)
+    'cloudfront.net': (ALPHANUMERIQUE, (6,), False),
+    'akamaiedge.net': (ALPHANUMERIQUE, (5, 4), False),
+}
+
+
+def _requete(domaine):
+    return SimpleNamespace(dns=SimpleNamespace(qry_name=domaine), sniff_timestamp='0')
+
+
+def _analyseur(nombre):
+    analyseur = AnalyseurTraficSuspect('absent.pcap')
+    for graine, (parent, (alphabet, longueurs, _)) in enumerate(FAMILLES.items()):
+        for domaine in _noms(alphabet, longueurs, nombre, parent, graine):
+            analyseur._analyser_dns(_requete(domaine))
+    return analyseur
+
+
+def _tunnels(analyseur, vectoriser, monkeypatch):
+    monkeypatch.setattr(analyseur, '_vectoriser', lambda taille: vectoriser)
+    return {tunnel['domaine']: tunnel for tunnel in analyseur._evaluer_tunnels_dns()}
+
+
+def test_sous_domaine_iodine_remplit_deux_criteres():
+    nom = _noms(BASE32, (30, 18), 1, 'x', 0)[0].rsplit('.', 1)[0]
+    caracteristiques = caracteriser(nom)
+    assert caracteristiques[0] == 48
+    assert score_tunnel(*caracteristiques) >= 2
+
+
+@pytest.mark.parametrize('nombre', [60, 300])
+@pytest.mark.parametrize('vectoriser', [False, True])
+def test_familles_de_tunnels(nombre, vectoriser, monkeypatch):
+    if vectoriser and np is None:
+        pytest.skip("NumPy n'est pas installé")
+    tunnels = _tunnels(_analyseur(nombre), vectoriser, monkeypatch)
+    for parent, (_, _, tunnel) in FAMILLES.items():
+        assert (parent in tunnels) == tunnel, parent
+
+
+@pytest.mark.skipif(np is None, reason="NumPy n'est pas installé")
+def test_passes_vectorisee_et_nom_par_nom_identiques(monkeypatch):
+    analyseur = _analyseur(300)
+    assert _tunnels(analyseur, True, monkeypatch) == _tunnels(analyseur, False, monkeypatch)
+
+
+@pytest.mark.skipif(np is None, reason="NumPy n'est pas installé")
+def test_caracteristiques_par_lot():
+    noms = []
+    for graine, (alphabet, longueurs, _) in enumerate(FAMILLES.values()):
+        noms += [nom.rsplit('.', 2)[0] for nom in _noms(alphabet, longueurs, 20, 'x.example', graine)]
+    noms += ['', 'a', 'a..b', 'été.xn--caf-dma']
+    lot = caracteriser_lot(noms)
+    for nom, ligne in zip(noms, lot):
+        attendu = caracteriser(nom) if nom else (0, 0.0, 0, 0, 0, 0)
+        assert ligne.tolist() == pytest.approx(list(attendu)), nom
+    assert (score_tunnel(*lot.T) >= SCORE_TUNNEL).tolist() == \
+        [score_tunnel(*caracteriser(nom)) >= SCORE_TUNNEL if nom else False for nom in noms]
+
+
+def test_seuil_abaisse_au_dela_de_200_sous_domaines():
+    assert module_analyseur.score_requis_tunnel(199) == SCORE_TUNNEL
+    assert module_analyseur.score_requis_tunnel(200) == SCORE_TUNNEL - 1
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+Module de traitement par lot
+Analyse un ensemble de captures sur un pool de processus, génère un rapport
+par capture et un rapport de synthèse agrégé
+"""
+
+import contextlib
+import glob
+import io
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from analyseur import TYPES_ALERTES_DNS, AnalyseurTraficSuspect
+from cache_analyse import analyser_avec_cache
+from compression import EXTENSIONS_COMPRESSION
+from exports import exporter
+
+# Extensions reconnues lorsqu'un répertoire est fourni (captures compressées comprises)
+EXTENSIONS_CAPTURE = ('.pcap', '.pcapng', '.cap')
+EXTENSIONS_CAPTURE += tuple(extension + compression for extension in EXTENSIONS_CAPTURE
+                            for compression in EXTENSIONS_COMPRESSION)
+
+
+def lister_captures(motif):
+    """
+    Liste les captures désignées par un répertoire ou un motif glob
+
+    Returns:
+        Liste triée des chemins de fichiers
+    """
+    if os.path.isdir(motif):
+        return sorted(os.path.join(motif, nom) for nom in os.listdir(motif)
+                      if nom.lower().endswith(EXTENSIONS_CAPTURE))
+    return sorted(chemin for chemin in glob.glob(motif, recursive=True) if os.path.isfile(chemin))
+
+
+def _noms_rapports(captures, dossier_sortie):
+    """Associe un nom de rapport HTML unique à chaque capture"""
+    noms = {}
+    utilises = set()
+    for capture in captures:
+        base = os.path.basename(capture)
+        if base.lower().endswith(EXTENSIONS_COMPRESSION):
+            base = os.path.splitext(base)[0]  # capture.pcap.gz -> capture
+        base = os.path.splitext(base)[0]
+        nom, suffixe = base, 1
+        while nom in utilises:
+            suffixe += 1
+            nom = f"{base}_{suffixe}"
+        utilises.add(nom)
+        noms[capture] = os.path.join(dossier_sortie, nom + '.html')
+    return noms
+
+
+def _traiter_capture(fichier_pcap, fichier_rapport, parametres, cache=None, rapport_complet=False,
+                     formats=('html',)):
+    """
+    Analyse complète d'une capture dans un worker (sortie terminal supprimée)
+
+    Returns:
+        Dictionnaire avec l'état de l'analyse, les flux persistants et les durées
+    """
+    debut = time.perf_counter()
+    analyseur = AnalyseurTraficSuspect(fichier_pcap, **parametres)
+    sortie = io.StringIO()
+    try:
+        with contextlib.redirect_stdout(sortie):
+            if cache is None:
+                analyseur.analyser()
+            else:
+                analyser_avec_cache(analyseur, cache)
+            duree_analyse = time.perf_counter() - debut
+            analyseur.detecter_flux_persistants()
+            if analyseur.inter_arrivees:
+                analyseur.detecter_beaconing()
+            analyseur.analyser_frequence_dns()
+            if 'html' in formats:
+                analyseur.generer_rapport_html(fichier_rapport, rapport_complet)
+            exporter(analyseur, os.path.splitext(fichier_rapport)[0], formats)
+    except SystemExit:
+        # analyser() termine le processus en cas d'erreur: on le signale au parent
+        erreurs = [ligne for ligne in sortie.getvalue().splitlines() if ligne.startswith('[!]')]
+        return {'fichier': fichier_pcap, 'erreur': erreurs[-1] if erreurs else '[!] Erreur inconnue',
+                'duree': time.perf_counter() - debut}
+
+    # Flux persistants déjà évalués: la synthèse ne fait que les reprendre
+    etat = analyseur.etat_partiel()
+    return {
+        'fichier': fichier_pcap,
+        'rapport': fichier_rapport,
+        'erreur': False,
+        'etat': etat,
+        'duree_analyse': duree_analyse,
+        'duree': time.perf_counter() - debut,
+    }
+
+
+def _sans_alertes_dns(etat):
+    """État d'une capture sans ses alertes DNS, recalculées sur la synthèse (TYPES_ALERTES_DNS)"""
+    return dict(etat, flux_suspects=[(cle, alerte) for cle, alerte in etat['flux_suspects']
+                                     if cle[0] not in TYPES_ALERTES_DNS])
+
+
+def analyser_lot(motif, dossier_sortie='rapports', nb_workers=None, parametres=None, cache=None,
+                 rapport_complet=False, formats=('html',)):
+    """
+    Analyse toutes les captures correspondant au motif
+
+    Les workers du pool sont réutilisés d'une capture à l'autre (interpréteur
+    et modules déjà chargés). Un rapport HTML est écrit par capture ainsi
+    qu'une synthèse (synthese.html) construite à partir des résultats fusionnés:
+    les flux de captures différentes y restent distincts, et les alertes DNS
+    (fréquences, sous-domaines, tunnels) sont réévaluées sur l'ensemble du lot.
+
+    Args:
+        parametres: Arguments nommés transmis à chaque AnalyseurTraficSuspect
+        cache: CacheAnalyse partagé par les workers (None pour toujours analyser)
+        rapport_complet: Rapports sans limite de lignes par section
+        formats: Sorties par capture et pour la synthèse (voir exports.FORMATS)
+
+    Returns:
+        AnalyseurTraficSuspect agrégé, ou None si aucune capture n'a été trouvée
+    """
+    parametres = parametres or {}
+    captures = lister_captures(motif)
+    if not captures:
+        print(f"[!] Aucune capture trouvée pour: {motif}")
+        return None
+
+    nb_workers = nb_workers or os.cpu_count() or 1
+    os.makedirs(dossier_sortie, exist_ok=True)
+    rapports = _noms_rapports(captures, dossier_sortie)
+    print(f"[*] {len(captures)} captures à analyser sur {nb_workers} processus...")
+
+    debut = time.perf_counter()
+    resultats = {}
+    with ProcessPoolExecutor(max_workers=nb_workers) as executeur:
+        futures = [executeur.submit(_traiter_capture, capture, rapports[capture], parametres, cache,
+                                   rapport_complet, formats)
+                   for capture in captures]
+        for termine, future in enumerate(as_completed(futures), 1):
+            resultat = future.result()
+            resultats[resultat['fichier']] = resultat
+            statut = "ERREUR" if resultat['erreur'] else f"{resultat['etat']['nb_paquets']} paquets"
+            print(f"[*] [{termine}/{len(captures)}] {resultat['fichier']}: {statut} "
+                  f"({resultat['duree']:.2f}s)")
+    duree_totale = time.perf_counter() - debut
+
+    # Synthèse: fusion des résultats dans l'ordre des fichiers, chaque capture
+    # gardant ses propres flux (voir AnalyseurTraficSuspect.fusionner)
+    synthese = AnalyseurTraficSuspect(
+        f"{len(captures)} captures ({motif})",
+        conserver_requetes_dns=parametres.get('conserver_requetes_dns', False))
+    for indice, capture in enumerate(captures):
+        resultat = resultats[capture]
+        if not resultat['erreur']:
+            synthese.fusionner(_sans_alertes_dns(resultat['etat']), indice)
+    # Fréquences DNS et tunnels réévalués sur les esquisses fusionnées de tout le lot
+    with contextlib.redirect_stdout(io.StringIO()):
+        synthese.analyser_frequence_dns()
+
+    fichier_synthese = os.path.join(dossier_sortie, 'synthese.html')
+    if 'html' in formats:
+        synthese.generer_rapport_html(fichier_synthese, rapport_complet)
+    exporter(synthese, os.path.splitext(fichier_synthese)[0], formats)
+
+    afficher_durees(captures, resultats, duree_totale)
+    return synthese
+
+
+def afficher_durees(captures, resultats, duree_totale):
+    """Affiche les durées par fichier et le débit global du lot"""
+    print("\n" + "="*70)
+    print("                  TRAITEMENT PAR LOT")
+    print("="*70)
+    for capture in captures:
+        resultat = resultats[capture]
+        if resultat['erreur']:
+            print(f"   - {capture}: ERREUR ({resultat['duree']:.2f}s) {resultat['erreur']}")
+        else:
+            print(f"   - {capture}: {resultat['etat']['nb_paquets']:,} paquets, "
+                  f"analyse {resultat['duree_analyse']:.2f}s, total {resultat['duree']:.2f}s")
+
+    reussis = sum(1 for r in resultats.values() if not r['erreur'])
+    debit = len(captures) / duree_totale * 60 if duree_totale > 0 else 0
+    print(f"\n⏱  {len(captures)} fichiers ({reussis} réussis) en {duree_totale:.2f}s "
+          f"- {debit:.1f} fichiers/minute")
+    print("="*70 + "\n")
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Module de caractérisation des noms de domaine (tunnels DNS)
+Calcule pour chaque sous-domaine d'une table de noms sa longueur, son
+entropie de Shannon, sa plus longue étiquette et la répartition de ses
+classes de caractères: par lots vectorisés (NumPy) ou nom par nom
+"""
+
+import math
+from collections import Counter
+from table_flux import np
+
+# Noms traités par lot vectorisé (matrice d'octets et histogrammes par nom)
+TAILLE_LOT = 4096
+
+# Colonnes des caractéristiques, comptées sur les octets UTF-8 hors points
+CARACTERISTIQUES = ('longueur', 'entropie', 'etiquette_max', 'chiffres', 'majuscules', 'minuscules')
+
+_POINT = ord('.')
+
+
+def sous_domaine(domaine, parent):
+    """Partie d'un nom de domaine à gauche de son domaine parent ('' si aucune)"""
+    etiquettes = domaine.strip().strip('.').split('.')
+    return '.'.join(etiquettes[:len(etiquettes) - parent.count('.') - 1])
+
+
+def caracteriser(nom):
+    """Caractéristiques d'un nom, dans l'ordre de CARACTERISTIQUES"""
+    donnees = nom.encode('utf-8', 'surrogateescape')
+    etiquette_max = max(len(etiquette) for etiquette in donnees.split(b'.'))
+    effectifs = Counter(donnees)
+    effectifs.pop(_POINT, None)
+    longueur = sum(effectifs.values())
+    entropie = 0.0
+    chiffres = majuscules = minuscules = 0
+    for octet, effectif in sorted(effectifs.items()):
+        p = effectif / longueur
+        entropie -= p * math.log2(p)
+        if 48 <= octet <= 57:
+            chiffres += effectif
+        elif 65 <= octet <= 90:
+            majuscules += effectif
+        elif 97 <= octet <= 122:
+            minuscules += effectif
+    return longueur, entropie, etiquette_max, chiffres, majuscules, minuscules
+
+
+def caracteriser_lot(noms):
+    """Caractéristiques d'une liste de noms: tableau NumPy (len(noms), len(CARACTERISTIQUES))"""
+    resultat = np.empty((len(noms), len(CARACTERISTIQUES)))
+    for debut in range(0, len(noms), TAILLE_LOT):
+        resultat[debut:debut + TAILLE_LOT] = _caracteriser_bloc(noms[debut:debut + TAILLE_LOT])
+    return resultat
+
+
+def _caracteriser_bloc(noms):
+    donnees = [nom.encode('utf-8', 'surrogateescape') for nom in noms]
+    n = len(donnees)
+    longueurs = np.fromiter(map(len, donnees), dtype=np.int64, count=n)
+    largeur = int(longueurs.max()) if n else 0
+
+    # Matrice des octets, une ligne par nom (complétée par des zéros)
+    octets = np.frombuffer(b''.join(donnees), dtype=np.uint8)
+    lignes = np.repeat(np.arange(n), longueurs)
+    colonnes = np.arange(len(octets)) - np.repeat(np.cumsum(longueurs) - longueurs, longueurs)
+    matrice = np.zeros((n, largeur), dtype=np.uint8)
+    matrice[lignes, colonnes] = octets
+    positions = np.arange(largeur)
+    separateurs = (positions >= longueurs[:, None]) | (matrice == _POINT)
+    caracteres = ~separateurs
+
+    # Plus longue étiquette: distance au dernier séparateur
+    dernier = np.maximum.accumulate(np.where(separateurs, positions, -1), axis=1)
+    etiquette_max = np.where(separateurs, 0, positions - dernier).max(axis=1, initial=0)
+
+    # Entropie: histogramme des octets de chaque nom
+    retenus = octets != _POINT
+    effectifs = np.bincount(lignes[retenus] * 256 + octets[retenus],
+                            minlength=n * 256).reshape(n, 256)
+    longueur = caracteres.sum(axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        p = effectifs / longueur[:, None]
+        entropie = -np.where(effectifs > 0, p * np.log2(p), 0.0).sum(axis=1)
+
+    resultat = np.empty((n, len(CARACTERISTIQUES)))
+    resultat[:, 0] = longueur
+    resultat[:, 1] = entropie
+    resultat[:, 2] = etiquette_max
+    resultat[:, 3] = effectifs[:, 48:58].sum(axis=1)
+    resultat[:, 4] = effectifs[:, 65:91].sum(axis=1)
+    resultat[:, 5] = effectifs[:, 97:123].sum(axis=1)
+    return resultat